@@ -0,0 +1,284 @@
+import ast
+import math
+import operator
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy is the "fast" extra: pip install "multi-task[fast]"
+    np = None
+
+# ----------------------------
+# Whole-array math for the math agent
+# ----------------------------
+# One tool call per question instead of one add(a, b) per pair:
+#
+#   aggregate(values, ["sum", "mean"])       # any number of values
+#   elementwise("mul", prices, quantities)  # a op b, a op scalar, or op(a)
+#   evaluate("sum(x * y) / sum(y)", x=prices, y=quantities)
+#
+# Everything is float64 (numpy when installed, plain lists + math.fsum
+# otherwise). evaluate() parses with ast and only allows numbers, x / y,
+# arithmetic operators and the functions below, with a cap on expression
+# size, so a prompt can't run code or ask for a 10**10**10.
+
+MAX_EXPRESSION_CHARS = 500
+MAX_EXPRESSION_NODES = 200
+MAX_EXPONENT = 1024
+RETURN_LIMIT = 1000
+
+AGGREGATES = ("count", "sum", "mean", "product", "min", "max", "median", "std", "var")
+UNARY_OPS = ("neg", "abs", "sqrt", "square", "exp", "log", "log10", "round", "floor", "ceil", "cumsum")
+BINARY_OPS = ("add", "sub", "mul", "div", "floordiv", "mod", "pow", "min", "max")
+
+Values = Union[Sequence[float], "np.ndarray"]
+
+
+class MathInputError(ValueError):
+    """Bad op name, mismatched lengths or a disallowed expression; the message is safe to show the model."""
+
+
+# ----------------------------
+# Backend helpers (numpy or plain Python)
+# ----------------------------
+
+def _array(values: Values) -> Any:
+    if np is not None:
+        return np.asarray(values, dtype=np.float64)
+    return [float(v) for v in values]
+
+
+def _is_array(value: Any) -> bool:
+    return isinstance(value, list) or (np is not None and isinstance(value, np.ndarray))
+
+
+def _clean(x: float) -> Optional[float]:
+    # JSON has no inf/nan
+    return x if math.isfinite(x) else None
+
+
+def _median(values: List[float]) -> float:
+    s = sorted(values)
+    mid = len(s) // 2
+    return s[mid] if len(s) % 2 else (s[mid - 1] + s[mid]) / 2
+
+
+def _aggregate_one(a: Any, stat: str) -> float:
+    n = len(a)
+    if stat == "count":
+        return float(n)
+    if n == 0:
+        if stat == "sum":
+            return 0.0
+        if stat == "product":
+            return 1.0
+        raise MathInputError(f"{stat} of an empty list")
+    if np is not None:
+        with np.errstate(over="ignore", invalid="ignore"):
+            return float({
+                "sum": np.sum, "mean": np.mean, "product": np.prod, "min": np.min, "max": np.max,
+                "median": np.median, "std": np.std, "var": np.var,
+            }[stat](a))
+    if stat == "sum":
+        return math.fsum(a)
+    if stat == "mean":
+        return math.fsum(a) / n
+    if stat == "product":
+        try:
+            return math.prod(a)
+        except OverflowError:
+            return math.inf
+    if stat == "min":
+        return min(a)
+    if stat == "max":
+        return max(a)
+    if stat == "median":
+        return _median(a)
+    mean = math.fsum(a) / n
+    var = math.fsum((v - mean) ** 2 for v in a) / n
+    return var if stat == "var" else math.sqrt(var)
+
+
+_PY_BINARY: Dict[str, Callable[[float, float], float]] = {
+    "add": operator.add, "sub": operator.sub, "mul": operator.mul, "div": operator.truediv,
+    "floordiv": operator.floordiv, "mod": operator.mod, "pow": operator.pow, "min": min, "max": max,
+}
+_PY_UNARY: Dict[str, Callable[[float], float]] = {
+    "neg": operator.neg, "abs": abs, "sqrt": math.sqrt, "square": lambda v: v * v, "exp": math.exp,
+    "log": math.log, "log10": math.log10, "round": lambda v: float(round(v)),
+    "floor": lambda v: float(math.floor(v)), "ceil": lambda v: float(math.ceil(v)),
+}
+
+
+def _py_safe(fn: Callable[..., float], *args: float) -> float:
+    try:
+        return float(fn(*args))
+    except OverflowError:
+        return math.inf
+    except (ZeroDivisionError, ValueError, TypeError):  # TypeError: (-8) ** 0.5 is complex
+        return math.nan
+
+
+def _binary(op: str, a: Any, b: Any) -> Any:
+    if np is not None:
+        fn = {
+            "add": np.add, "sub": np.subtract, "mul": np.multiply, "div": np.divide,
+            "floordiv": np.floor_divide, "mod": np.mod, "pow": np.power, "min": np.minimum, "max": np.maximum,
+        }[op]
+        with np.errstate(all="ignore"):
+            try:
+                return fn(a, b)
+            except ValueError as exc:
+                raise MathInputError(f"length mismatch: {exc}") from None
+    fn = _PY_BINARY[op]
+    if _is_array(a) and _is_array(b):
+        if len(a) != len(b):
+            raise MathInputError(f"length mismatch: {len(a)} vs {len(b)}")
+        return [_py_safe(fn, x, y) for x, y in zip(a, b)]
+    if _is_array(a):
+        return [_py_safe(fn, x, b) for x in a]
+    if _is_array(b):
+        return [_py_safe(fn, a, y) for y in b]
+    return _py_safe(fn, a, b)
+
+
+def _unary(op: str, a: Any) -> Any:
+    if op == "cumsum":
+        if not _is_array(a):
+            return a
+        if np is not None:
+            return np.cumsum(a)
+        out, total = [], 0.0
+        for v in a:
+            total += v
+            out.append(total)
+        return out
+    if np is not None:
+        fn = {
+            "neg": np.negative, "abs": np.abs, "sqrt": np.sqrt, "square": np.square, "exp": np.exp,
+            "log": np.log, "log10": np.log10, "round": np.round, "floor": np.floor, "ceil": np.ceil,
+        }[op]
+        with np.errstate(all="ignore"):
+            out = fn(a)
+        return out if _is_array(out) else float(out)
+    fn = _PY_UNARY[op]
+    if _is_array(a):
+        return [_py_safe(fn, v) for v in a]
+    return _py_safe(fn, a)
+
+
+# ----------------------------
+# Public API (the tools in math_function_tool.py are thin wrappers)
+# ----------------------------
+
+def describe(value: Any, limit: int = RETURN_LIMIT) -> Dict[str, Any]:
+    """JSON-friendly result: scalars as-is, arrays as values (first ``limit``) plus summary stats."""
+    if not _is_array(value):
+        return {"result": _clean(float(value))}
+    values = value.tolist() if np is not None and isinstance(value, np.ndarray) else list(value)
+    out: Dict[str, Any] = {
+        "count": len(values),
+        "values": [_clean(v) for v in values[:limit]],
+        "truncated": len(values) > limit,
+    }
+    if values:
+        out.update({s: _clean(_aggregate_one(value, s)) for s in ("sum", "mean", "min", "max")})
+    return out
+
+
+def aggregate(values: Values, stats: Optional[Sequence[str]] = None) -> Dict[str, Optional[float]]:
+    stats = list(stats or ("count", "sum", "mean", "min", "max"))
+    unknown = [s for s in stats if s not in AGGREGATES]
+    if unknown:
+        raise MathInputError(f"unknown stats {unknown}; allowed: {', '.join(AGGREGATES)}")
+    a = _array(values)
+    return {s: _clean(_aggregate_one(a, s)) for s in stats}
+
+
+def elementwise(op: str, a: Values, b: Optional[Values] = None, scalar: Optional[float] = None) -> Any:
+    """``op(a)``, ``a op b`` (same length) or ``a op scalar``; returns an array."""
+    x = _array(a)
+    if op in UNARY_OPS and b is None and scalar is None:
+        return _unary(op, x)
+    if op not in BINARY_OPS:
+        raise MathInputError(f"unknown op {op!r}; unary: {', '.join(UNARY_OPS)}; binary: {', '.join(BINARY_OPS)}")
+    if (b is None) == (scalar is None):
+        raise MathInputError(f"{op} needs exactly one of b (a list) or scalar")
+    other = _array(b) if b is not None else float(scalar)
+    if op == "pow" and not _is_array(other) and abs(other) > MAX_EXPONENT:
+        raise MathInputError(f"exponent above {MAX_EXPONENT}")
+    return _binary(op, x, other)
+
+
+# ----------------------------
+# Bounded expression evaluator
+# ----------------------------
+
+_AST_BINARY = {
+    ast.Add: "add", ast.Sub: "sub", ast.Mult: "mul", ast.Div: "div",
+    ast.FloorDiv: "floordiv", ast.Mod: "mod", ast.Pow: "pow",
+}
+_FUNCTIONS = {
+    **{name: ("aggregate", name) for name in ("sum", "mean", "product", "median", "std", "var", "count")},
+    "len": ("aggregate", "count"),
+    "prod": ("aggregate", "product"),
+    **{name: ("unary", name) for name in ("abs", "sqrt", "exp", "log", "log10", "round", "floor", "ceil", "cumsum")},
+}
+_CONSTANTS = {"pi": math.pi, "e": math.e}
+
+
+def _eval(node: ast.AST, names: Dict[str, Any]) -> Any:
+    if isinstance(node, ast.Expression):
+        return _eval(node.body, names)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        try:
+            return float(node.value)
+        except OverflowError:
+            raise MathInputError("number too large") from None
+    if isinstance(node, ast.Name):
+        if node.id in names:
+            return names[node.id]
+        if node.id in _CONSTANTS:
+            return _CONSTANTS[node.id]
+        raise MathInputError(f"unknown name {node.id!r}; use x, y, pi or e")
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _eval(node.operand, names)
+        return _unary("neg", value) if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.BinOp) and type(node.op) in _AST_BINARY:
+        op = _AST_BINARY[type(node.op)]
+        left, right = _eval(node.left, names), _eval(node.right, names)
+        if op == "pow" and not _is_array(right) and abs(right) > MAX_EXPONENT:
+            raise MathInputError(f"exponent above {MAX_EXPONENT}")
+        return _binary(op, left, right)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id
+        args = [_eval(arg, names) for arg in node.args]
+        if name in ("min", "max"):
+            if len(args) == 1:
+                return _aggregate_one(args[0], name) if _is_array(args[0]) else args[0]
+            if len(args) == 2:
+                return _binary(name, args[0], args[1])
+            raise MathInputError(f"{name}() takes one list or two arguments")
+        if name not in _FUNCTIONS:
+            raise MathInputError(f"unknown function {name!r}; allowed: min, max, {', '.join(_FUNCTIONS)}")
+        if len(args) != 1:
+            raise MathInputError(f"{name}() takes exactly one argument")
+        kind, op = _FUNCTIONS[name]
+        if kind == "aggregate":
+            return _aggregate_one(args[0] if _is_array(args[0]) else [args[0]], op)
+        return _unary(op, args[0])
+    raise MathInputError(f"not allowed in an expression: {ast.dump(node)[:60]}")
+
+
+def evaluate(expression: str, **variables: Optional[Values]) -> Any:
+    """Evaluate arithmetic over scalars and the given arrays, e.g. ``sum(x * y) / sum(y)``."""
+    if len(expression) > MAX_EXPRESSION_CHARS:
+        raise MathInputError(f"expression longer than {MAX_EXPRESSION_CHARS} characters")
+    try:
+        tree = ast.parse(expression.replace("^", "**"), mode="eval")
+    except SyntaxError as exc:
+        raise MathInputError(f"invalid expression: {exc.msg}") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_EXPRESSION_NODES:
+        raise MathInputError(f"expression has more than {MAX_EXPRESSION_NODES} parts")
+    names = {name: _array(values) for name, values in variables.items() if values is not None}
+    return _eval(tree, names)
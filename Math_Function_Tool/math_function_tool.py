@@ -4,7 +4,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 from agents import Agent, ModelSettings, function_tool, Runner
 import asyncio
+from typing import Any, Dict, List, Optional
 from config.config import model
+from Math_Function_Tool import array_math
+from Math_Function_Tool.array_math import MathInputError
+from metrics.usage import scoped_tool
 
 # Define math function
 @function_tool
@@ -12,19 +16,76 @@ async def add(a: int, b: int) -> int:
     """Return the sum of two numbers"""
     return a + b
 
+
+# Whole lists in one call (Math_Function_Tool/array_math.py); errors come back as {"error": ...}
+@function_tool
+def aggregate_numbers(values: List[float], stats: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Statistics over a whole list of numbers in one call.
+
+    stats: any of count, sum, mean, product, min, max, median, std, var (default: count, sum, mean, min, max).
+    """
+    try:
+        return array_math.aggregate(values, stats)
+    except MathInputError as exc:
+        return {"error": str(exc)}
+
+
+@function_tool
+def elementwise_numbers(
+    op: str,
+    a: List[float],
+    b: Optional[List[float]] = None,
+    scalar: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Apply an operation to every element: op(a), a op b (same length) or a op scalar.
+
+    Unary ops: neg, abs, sqrt, square, exp, log, log10, round, floor, ceil, cumsum.
+    Binary ops: add, sub, mul, div, floordiv, mod, pow, min, max.
+    Returns up to the first 1000 values plus count/sum/mean/min/max of the full result.
+    """
+    try:
+        return array_math.describe(array_math.elementwise(op, a, b, scalar))
+    except MathInputError as exc:
+        return {"error": str(exc)}
+
+
+@function_tool
+def evaluate_expression(
+    expression: str,
+    x: Optional[List[float]] = None,
+    y: Optional[List[float]] = None,
+) -> Dict[str, Any]:
+    """Evaluate an arithmetic expression over numbers and the lists x and y.
+
+    Allowed: + - * / // % ** (or ^), parentheses, pi, e, and the functions sum, mean, product, median,
+    std, var, count, len, min, max, abs, sqrt, exp, log, log10, round, floor, ceil, cumsum.
+    Example: "sum(x * y) / sum(y)" for a weighted average. Arithmetic between lists is element-wise.
+    """
+    try:
+        return array_math.describe(array_math.evaluate(expression, x=x, y=y))
+    except MathInputError as exc:
+        return {"error": str(exc)}
+
 # Create Math Agent
 math_agent = Agent(
     name="MathAgent",
-    instructions="You are a math expert. You will be given two numbers and you must return their sum.",
+    instructions=(
+        "You are a math expert. Always compute with the tools, never in your head. "
+        "Use add for two numbers. For a list of numbers (sum, average, product, min/max, ...) pass the "
+        "whole list to aggregate_numbers or elementwise_numbers in ONE call, and use evaluate_expression "
+        "for formulas, passing lists as x and y."
+    ),
     model=model,
-    tools=[add],
-    model_settings=ModelSettings(max_retries=2)
+    tools=[add, aggregate_numbers, elementwise_numbers, evaluate_expression],
+    # retries (with backoff under the shared rate limiter) live in config.model, not ModelSettings
+    model_settings=ModelSettings()
 )
 
-math_tool = math_agent.as_tool(
+# scoped_tool: the nested math_agent run's tokens are booked under tool=math_tool (model_layer/usage.py)
+math_tool = scoped_tool(math_agent.as_tool(
     tool_name="math_tool",
-    tool_description="Solve addition questions."
-)
+    tool_description="Solve arithmetic: sums of two numbers, statistics over whole lists, element-wise list math and formulas."
+))
 # Main function with 3 test questions
 async def main():
     questions = [
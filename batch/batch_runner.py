@@ -0,0 +1,336 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from collections import deque
+from importlib import import_module
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, Set, Tuple
+
+from agents import RunConfig, Runner
+
+import customer_support_bot
+from metrics.metrics import metrics
+from metrics.profiler import profiler
+from metrics.usage import usage_ledger, usage_scope
+from model_layer.usage import UsageModel
+
+# ----------------------------
+# Streaming JSONL batch runner
+# ----------------------------
+# Reads an input JSONL one line at a time, runs each record through
+# handle_message (or any Agent) with bounded concurrency and appends one
+# result line per record to the output JSONL.
+#
+# Resume: every result line carries the input byte offset of its record.
+# A checkpoint file (<output>.ckpt) stores the "watermark" -- the offset
+# below which every record is finished -- so a restarted run seeks straight
+# past completed work and only skips the few out-of-order finishes recorded
+# after the watermark. Completed model calls are never paid for twice.
+# --retry-errors re-runs every record whose last result failed, wherever it is.
+
+ID_FIELDS = ("id", "request_id", "message_id")
+TEXT_FIELDS = ("text", "message", "body")
+FINGERPRINT_BYTES = 64 * 1024
+
+# (text, customer_id) -> output; customer_id is "" when the record has none
+Handler = Callable[[str, str], Awaitable[Any]]
+
+
+# ----------------------------
+# Handlers
+# ----------------------------
+async def support_handler(text: str, customer_id: str) -> str:
+    replies = []
+    await customer_support_bot.handle_message(text, customer_id or "batch", send=replies.append)
+    return "\n".join(replies)
+
+
+def agent_handler(target: str, run_config: Optional[RunConfig] = None) -> Handler:
+    """``target`` is "module:attribute" naming an Agent."""
+    module, attr = target.split(":")
+    agent = getattr(import_module(module), attr)
+
+    async def run(text: str, customer_id: str) -> Any:
+        tags = {"customer": customer_id or "batch", "agent": agent.name}
+        with profiler.profile("batch", **tags), usage_scope(**tags):
+            result = await Runner.run(agent, text, context={"customer_id": customer_id or "batch"}, run_config=run_config)
+        out = result.final_output
+        return out.model_dump() if hasattr(out, "model_dump") else out
+
+    return run
+
+
+# ----------------------------
+# Input / checkpoint helpers
+# ----------------------------
+def _pick(record: Dict[str, Any], fields: Tuple[str, ...]) -> Optional[Any]:
+    for f in fields:
+        if record.get(f) is not None:
+            return record[f]
+    return None
+
+
+def iter_records(path: str, start: int = 0) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (offset, record, error) per non-blank line, starting at byte ``start``."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            here = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                yield here, json.loads(line), None
+            except json.JSONDecodeError as e:
+                yield here, None, f"invalid JSON: {e}"
+
+
+def fingerprint(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(FINGERPRINT_BYTES)).hexdigest()
+
+
+class Checkpoint:
+    def __init__(self, path: str, input_path: str):
+        self.path = path
+        self.input_path = input_path
+        self.watermark = 0
+        self.completed = 0
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("fingerprint") != fingerprint(self.input_path):
+            raise ValueError(f"checkpoint {self.path} was written for a different input file")
+        self.watermark = int(data.get("watermark", 0))
+        self.completed = int(data.get("completed", 0))
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "input": os.path.abspath(self.input_path),
+                    "fingerprint": fingerprint(self.input_path),
+                    "watermark": self.watermark,
+                    "completed": self.completed,
+                    "saved_at": time.time(),
+                },
+                f,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def recover_output(path: str, watermark: int, retry_errors: bool) -> Tuple[int, Set[int]]:
+    """(start, done): where to start reading the input, and offsets from there on not to run again.
+
+    The last result line per offset wins (a retried record appends a new one).
+    With ``retry_errors`` failed records anywhere in the file -- below the
+    watermark too -- are run again, so ``start`` moves back to the first one.
+    A torn last line (crash mid-write) is truncated away so appends stay valid JSONL.
+    """
+    if not os.path.exists(path):
+        return watermark, set()
+    ok: Dict[int, bool] = {}
+    good_end = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            good_end += len(line)
+            ok[row.get("offset", -1)] = bool(row.get("ok"))
+    if good_end != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_end)
+    start = watermark
+    if retry_errors:
+        start = min([watermark, *(offset for offset, good in ok.items() if not good and offset >= 0)])
+    done = {offset for offset, good in ok.items() if offset >= start and (good or not retry_errors)}
+    return start, done
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+class BatchRunner:
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        handler: Handler,
+        concurrency: int = 8,
+        checkpoint_every: int = 50,
+        retry_errors: bool = False,
+        fsync: bool = False,
+    ):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.retry_errors = retry_errors
+        self.fsync = fsync
+        self.checkpoint = Checkpoint(output_path + ".ckpt", input_path)
+        self.stats = {"processed": 0, "skipped": 0, "failed": 0}
+
+        # dispatched offsets in input order + which of them are finished -> watermark
+        self._dispatched: Deque[int] = deque()
+        self._finished: Set[int] = set()
+        self._since_checkpoint = 0
+
+    def _advance_watermark(self, reader_position: int) -> None:
+        while self._dispatched and self._dispatched[0] in self._finished:
+            self._finished.discard(self._dispatched.popleft())
+        self.checkpoint.watermark = self._dispatched[0] if self._dispatched else reader_position
+
+    async def _process(self, offset: int, record: Optional[Dict[str, Any]], error: Optional[str]) -> Dict[str, Any]:
+        record = record or {}
+        rid = _pick(record, ID_FIELDS)
+        row: Dict[str, Any] = {"offset": offset, "id": rid if rid is not None else offset}
+        text = _pick(record, TEXT_FIELDS)
+        started = time.perf_counter()
+        if error is None and not isinstance(text, str):
+            error = f"record has none of the text fields {TEXT_FIELDS}"
+        if error is not None:
+            row.update(ok=False, error=error)
+        else:
+            try:
+                row.update(ok=True, output=await self.handler(text, str(record.get("customer_id") or "")))
+            except Exception as e:
+                row.update(ok=False, error=f"{type(e).__name__}: {e}")
+        elapsed = time.perf_counter() - started
+        row["latency_ms"] = round(elapsed * 1000, 2)
+        metrics.observe("batch_record_latency_s", elapsed)
+        metrics.incr("batch_records_total", status="ok" if row["ok"] else "error")
+        return row
+
+    async def run(self) -> Dict[str, int]:
+        self.checkpoint.load()
+        start, already_done = recover_output(self.output_path, self.checkpoint.watermark, self.retry_errors)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        position = start
+
+        with open(self.output_path, "ab") as out:
+
+            def write(row: Dict[str, Any]) -> None:
+                out.write(json.dumps(row, ensure_ascii=False, default=str).encode() + b"\n")
+                out.flush()
+                if self.fsync:
+                    os.fsync(out.fileno())
+
+            async def worker() -> None:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        queue.task_done()
+                        return
+                    row = await self._process(*item)
+                    # result line first, then watermark -> a crash in between only re-checks, never re-runs
+                    write(row)
+                    self.stats["processed"] += 1
+                    if not row["ok"]:
+                        self.stats["failed"] += 1
+                    self._finished.add(item[0])
+                    self.checkpoint.completed += 1
+                    self._since_checkpoint += 1
+                    if self._since_checkpoint >= self.checkpoint_every:
+                        self._since_checkpoint = 0
+                        self._advance_watermark(position)
+                        self.checkpoint.save()
+                    queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                for offset, record, error in iter_records(self.input_path, start):
+                    position = offset
+                    if offset in already_done:
+                        self.stats["skipped"] += 1
+                        continue
+                    self._dispatched.append(offset)
+                    await queue.put((offset, record, error))
+                position = os.path.getsize(self.input_path)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for w in workers:
+                    w.cancel()
+                self._advance_watermark(position)
+                self.checkpoint.save()
+        return self.stats
+
+
+# ----------------------------
+# CLI: python batch/batch_runner.py in.jsonl out.jsonl [--agent module:attr] [--mock]
+# ----------------------------
+async def amain(args: argparse.Namespace) -> None:
+    run_config = None
+    if args.mock:
+        from model_layer.mock_model import MockModel
+
+        mock = UsageModel(MockModel())
+        customer_support_bot.use_model(mock)
+        run_config = RunConfig(model=mock, tracing_disabled=True)
+
+    pool = None
+    if args.workers:
+        from workers.pool import WorkerPool
+
+        pool = await WorkerPool(args.workers, args.agent or "support", mock=args.mock).start()
+        handler = pool.submit
+    else:
+        handler = agent_handler(args.agent, run_config) if args.agent else support_handler
+    runner = BatchRunner(
+        args.input,
+        args.output,
+        handler,
+        concurrency=args.concurrency,
+        checkpoint_every=args.checkpoint_every,
+        retry_errors=args.retry_errors,
+        fsync=args.fsync,
+    )
+    started = time.perf_counter()
+    try:
+        stats = await runner.run()
+    finally:
+        if pool is not None:
+            await pool.close()
+    if args.usage_out:
+        # in-process runs only; with --workers each worker keeps its own ledger (USAGE_LOG per call)
+        usage_ledger.export_jsonl(args.usage_out)
+    print(json.dumps({**stats, "elapsed_s": round(time.perf_counter() - started, 2)}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a JSONL file of messages through the support bot or an agent")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--agent", help='"module:attribute" of an Agent; default is customer_support_bot.handle_message')
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=0, help="spread records over N worker processes (workers/pool.py)")
+    parser.add_argument("--checkpoint-every", type=int, default=50)
+    parser.add_argument("--retry-errors", action="store_true", help="on resume, re-run records that previously failed")
+    parser.add_argument("--fsync", action="store_true", help="fsync every result line (slower, crash-proof)")
+    parser.add_argument("--usage-out", help="append token usage totals per agent/guardrail/tool/customer (JSONL) here")
+    parser.add_argument(
+        "--mock", action="store_true", help="use MockModel instead of Gemini (no network; GEMINI_API_KEY must still be set, any value)"
+    )
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
-from agents import  AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig
+from agents import  AsyncOpenAI, Model, OpenAIChatCompletionsModel, RunConfig
 # 
 import os
+from typing import Dict, Optional, Tuple
 from dotenv import load_dotenv
 
+from config.model_tiers import TIERS, TierMetricsModel, tier_for
+from metrics.metrics import metrics
+from model_layer.circuit_breaker import CircuitBreaker, CircuitBreakerModel, CircuitGateModel
+from model_layer.hedging import HedgedModel
+from model_layer.rate_limiter import AdaptiveLimiter, RateLimitedModel
+from model_layer.usage import UsageModel
+
 # Load .env environment variables if needed
 load_dotenv()
 
@@ -14,15 +22,83 @@ if not gemini_api_key:
     raise ValueError("GEMINI_API_KEY not found in environment variables.")
 
 # Reference: https://ai.google.dev/gemini-api/docs/openai
+# max_retries=0: retries happen in RateLimitedModel so the limiter sees (and paces) them
 external_client = AsyncOpenAI(
     api_key=gemini_api_key,
     base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+    max_retries=0,
 )
 
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
+# One model per tier (config/model_tiers.py): fast / default / strong, names overridable via env
+tier_models = {
+    name: OpenAIChatCompletionsModel(model=spec.model, openai_client=external_client)
+    for name, spec in TIERS.items()
+}
+base_model = tier_models["default"]
+
+# Shared client-side limiter for every agent (model_layer/rate_limiter.py).
+# Weight = share of concurrency slots a priority class gets while calls are queued.
+AGENT_PRIORITY_WEIGHTS = {
+    "guardrail": 4.0,
+    "triage": 2.0,
+    "default": 1.0,
+}
+
+limiter = AdaptiveLimiter(
+    rpm=float(os.getenv("GEMINI_RPM", "1000")),
+    tpm=float(os.getenv("GEMINI_TPM", "1000000")),
+    initial_concurrency=int(os.getenv("GEMINI_CONCURRENCY", "8")),
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "64")),
+    weights=AGENT_PRIORITY_WEIGHTS,
 )
+metrics.register_collector("limiter", limiter.stats)
+
+
+# One breaker for the Gemini provider (model_layer/circuit_breaker.py). While it is
+# open every model call fails fast and callers switch to their degraded paths.
+breaker = CircuitBreaker(
+    "gemini",
+    failure_rate=float(os.getenv("GEMINI_BREAKER_FAILURE_RATE", "0.5")),
+    slow_call_seconds=float(os.getenv("GEMINI_BREAKER_SLOW_S", "10")),
+    open_seconds=float(os.getenv("GEMINI_BREAKER_OPEN_S", "30")),
+)
+MODEL_CALL_TIMEOUT = float(os.getenv("GEMINI_CALL_TIMEOUT_S", "30"))
+
+# Hedging (model_layer/hedging.py) is opt-in per agent via model_for(..., hedge=True)
+HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "0.95"))
+HEDGE_BUDGET_RATIO = float(os.getenv("GEMINI_HEDGE_BUDGET", "0.05"))
+
+
+_models: Dict[Tuple[str, str, bool, str], Model] = {}
+
+
+def model_for(agent: str, priority: str = "default", hedge: bool = False, tier: Optional[str] = None) -> Model:
+    """Model for one agent: same Gemini client, own metrics label and priority class.
+
+    ``tier`` ("fast" / "default" / "strong") defaults to the agent's entry in model_tiers.AGENT_TIERS.
+    Models are cached, so hedging latency history is shared per (agent, priority, hedge, tier).
+    """
+    tier = tier or tier_for(agent)
+    key = (agent, priority, hedge, tier)
+    if key in _models:
+        return _models[key]
+    # innermost: latency / cost of the provider call itself, per tier
+    m: Model = TierMetricsModel(tier_models[tier], tier)
+    # inside the limiter: latency and timeout cover the provider call only, and every retry is recorded
+    m = CircuitBreakerModel(m, breaker, call_timeout=MODEL_CALL_TIMEOUT)
+    m = RateLimitedModel(m, limiter, agent=agent, priority=priority)
+    # outside the limiter: an open circuit rejects before a call queues for a slot
+    m = CircuitGateModel(m, breaker)
+    if hedge:
+        # outside the limiter: the duplicate call is paced like any other
+        m = HedgedModel(m, agent=agent, percentile=HEDGE_PERCENTILE, budget_ratio=HEDGE_BUDGET_RATIO)
+    # outermost: token accounting per agent / customer, and over-budget customers never reach the limiter
+    m = UsageModel(m, agent=agent, pricing=TIERS[tier])
+    _models[key] = m
+    return m
+
+
+model = model_for("default")
 
 config = RunConfig(
     model=model,
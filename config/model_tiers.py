@@ -0,0 +1,259 @@
+import os
+import re
+import time
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence, Tuple
+
+from openai.types.responses import ResponseCompletedEvent
+
+from agents import Agent, ModelBehaviorError, ModelResponse, Runner
+from metrics.metrics import metrics
+from model_layer.base import ModelWrapper
+
+# ----------------------------
+# Model tiers
+# ----------------------------
+# Three tiers on the same Gemini client, each with its own model and price:
+#   fast     classification, routing, guardrails (short structured answers)
+#   default  customer chat
+#   strong   escalations and retries when a cheaper tier wasn't good enough
+# config.model_for(agent, tier=...) builds the model; without tier= the
+# agent's entry in AGENT_TIERS (or TASK_TIERS) is used.
+#
+# run_with_escalation() starts on the agent's tier and retries one tier up
+# when structured output fails validation (ModelBehaviorError) or the answer
+# looks uncertain. The per-tier copy of an agent is cloned once and reused
+# (agents are not mutated after they are built). Calls, latency, tokens and cost are reported per tier
+# (collector "model_tiers", metrics model_tier_*{tier=...}).
+
+TIER_ORDER = ("fast", "default", "strong")
+
+
+class TierSpec:
+    __slots__ = ("name", "model", "input_per_m", "output_per_m")
+
+    def __init__(self, name: str, model: str, input_per_m: float, output_per_m: float):
+        """Prices are USD per 1M input / output tokens."""
+        self.name = name
+        self.model = model
+        self.input_per_m = input_per_m
+        self.output_per_m = output_per_m
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.input_per_m + output_tokens * self.output_per_m) / 1_000_000
+
+
+def _spec(name: str, model: str, input_per_m: float, output_per_m: float) -> TierSpec:
+    env = name.upper()
+    return TierSpec(
+        name,
+        os.getenv(f"GEMINI_{env}_MODEL", model),
+        float(os.getenv(f"GEMINI_{env}_INPUT_PER_M", input_per_m)),
+        float(os.getenv(f"GEMINI_{env}_OUTPUT_PER_M", output_per_m)),
+    )
+
+
+TIERS: Dict[str, TierSpec] = {
+    "fast": _spec("fast", "gemini-2.0-flash-lite", 0.075, 0.30),
+    "default": _spec("default", "gemini-2.0-flash", 0.10, 0.40),
+    "strong": _spec("strong", "gemini-2.5-pro", 1.25, 10.0),
+}
+
+# Task types -> tier, and agents (the model_for label) -> task type or tier
+TASK_TIERS = {
+    "classification": "fast",
+    "routing": "fast",
+    "chat": "default",
+    "tools": "default",
+    "escalation": "strong",
+}
+AGENT_TIERS = {
+    "guardrail": "classification",
+    "TriageAgent": "routing",
+    "hotel_classifier": "classification",
+    "bot": "chat",
+    "BotAgent": "chat",
+    "human": "chat",
+    "HumanAgent": "chat",
+    "default": "chat",
+}
+
+
+def tier_for(agent_or_task: str) -> str:
+    """Tier name for an agent label, a task type or a tier name (unknown -> "default")."""
+    name = AGENT_TIERS.get(agent_or_task, agent_or_task)
+    name = TASK_TIERS.get(name, name)
+    return name if name in TIERS else "default"
+
+
+def next_tier(tier: str) -> Optional[str]:
+    i = TIER_ORDER.index(tier)
+    return TIER_ORDER[i + 1] if i + 1 < len(TIER_ORDER) else None
+
+
+# ----------------------------
+# Per-tier latency / cost
+# ----------------------------
+class _TierStats:
+    __slots__ = ("calls", "errors", "seconds", "input_tokens", "output_tokens", "cost", "escalated_from")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.escalated_from = 0
+
+
+_stats: Dict[str, _TierStats] = {name: _TierStats() for name in TIERS}
+
+
+def tier_stats() -> Dict[str, Any]:
+    out = {}
+    for name, s in _stats.items():
+        out[name] = {
+            "model": TIERS[name].model,
+            "calls": s.calls,
+            "errors": s.errors,
+            "avg_latency_ms": round(s.seconds / s.calls * 1000, 2) if s.calls else 0.0,
+            "input_tokens": s.input_tokens,
+            "output_tokens": s.output_tokens,
+            "cost_usd": round(s.cost, 6),
+            "avg_cost_usd": round(s.cost / s.calls, 8) if s.calls else 0.0,
+            "escalated_from": s.escalated_from,
+        }
+    return out
+
+
+metrics.register_collector("model_tiers", tier_stats)
+
+
+class TierMetricsModel(ModelWrapper):
+    """Records latency, tokens and cost of every call under the tier's label."""
+
+    def __init__(self, inner: Any, tier: str):
+        super().__init__(inner)
+        self.tier = tier
+        self.spec = TIERS[tier]
+
+    def _record(self, started: float, usage: Any, error: bool = False) -> None:
+        s = _stats[self.tier]
+        elapsed = time.perf_counter() - started
+        s.calls += 1
+        s.seconds += elapsed
+        metrics.observe("model_tier_latency_s", elapsed, tier=self.tier)
+        if error:
+            s.errors += 1
+            metrics.incr("model_tier_errors_total", tier=self.tier)
+            return
+        inp = getattr(usage, "input_tokens", 0) or 0
+        out = getattr(usage, "output_tokens", 0) or 0
+        cost = self.spec.cost(inp, out)
+        s.input_tokens += inp
+        s.output_tokens += out
+        s.cost += cost
+        metrics.incr("model_tier_cost_usd_total", cost, tier=self.tier)
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        started = time.perf_counter()
+        try:
+            response = await self.inner.get_response(*args, **kwargs)
+        except Exception:
+            self._record(started, None, error=True)
+            raise
+        self._record(started, response.usage)
+        return response
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        started = time.perf_counter()
+        usage = None
+        try:
+            async for event in self.inner.stream_response(*args, **kwargs):
+                if isinstance(event, ResponseCompletedEvent):
+                    usage = event.response.usage
+                yield event
+        except Exception:
+            self._record(started, None, error=True)
+            raise
+        self._record(started, usage)
+
+
+# ----------------------------
+# Confidence-based escalation
+# ----------------------------
+_UNCERTAIN = re.compile(
+    r"\b(i'?m not (sure|certain)|i am not (sure|certain)|i don'?t know|not sure|unsure|cannot determine|"
+    r"can'?t determine|unclear|i'?m unable to|mujhe nahi pata|pata nahi)\b",
+    re.IGNORECASE,
+)
+CONFIDENCE_FLOOR = float(os.getenv("MODEL_TIER_CONFIDENCE_FLOOR", "0.6"))
+
+
+def looks_uncertain(output: Any) -> bool:
+    """Hedging phrases in text, or a structured output whose ``confidence`` is below the floor."""
+    if output is None:
+        return True
+    confidence = getattr(output, "confidence", None)
+    if isinstance(confidence, (int, float)):
+        return confidence < CONFIDENCE_FLOOR
+    if isinstance(output, str):
+        return not output.strip() or bool(_UNCERTAIN.search(output))
+    return False
+
+
+# id(agent) -> {(label, priority, hedge, tier): clone}; the entry goes away with the agent
+_clones: Dict[int, Dict[Tuple[str, str, bool, str], Agent]] = {}
+
+
+def tier_clone(agent: Agent, label: str, priority: str, hedge: bool, tier: str) -> Agent:
+    """``agent`` on ``tier``'s model, cloned on first use."""
+    from config.config import model_for  # config.config imports this module
+
+    per_agent = _clones.get(id(agent))
+    if per_agent is None:
+        per_agent = _clones[id(agent)] = {}
+        weakref.finalize(agent, _clones.pop, id(agent), None)
+    key = (label, priority, hedge, tier)
+    clone = per_agent.get(key)
+    if clone is None:
+        clone = per_agent[key] = agent.clone(model=model_for(label, priority, hedge, tier=tier))
+    return clone
+
+
+async def run_with_escalation(
+    agent: Agent,
+    input: Any,
+    label: Optional[str] = None,
+    priority: str = "default",
+    hedge: bool = False,
+    tier: Optional[str] = None,
+    uncertain: Callable[[Any], bool] = looks_uncertain,
+    tiers: Sequence[str] = TIER_ORDER,
+    **run_kwargs: Any,
+):
+    """Runner.run on ``label``'s tier; on a validation failure or uncertain answer, again one tier up.
+
+    Returns the last RunResult (the strongest tier's answer is kept even if it still looks uncertain).
+    A validation failure on the strongest tier is raised.
+    """
+    label = label or agent.name
+    current: Optional[str] = tier or tier_for(label)
+    while True:
+        upper = next_tier(current)
+        while upper is not None and upper not in tiers:
+            upper = next_tier(upper)
+        try:
+            result = await Runner.run(tier_clone(agent, label, priority, hedge, current), input, **run_kwargs)
+        except ModelBehaviorError:
+            if upper is None:
+                raise
+            reason = "validation"
+        else:
+            if upper is None or not uncertain(result.final_output):
+                return result
+            reason = "uncertain"
+        _stats[current].escalated_from += 1
+        metrics.incr("model_tier_escalations_total", agent=label, reason=reason, to=upper)
+        current = upper
@@ -1,32 +1,52 @@
 
 
 import asyncio
-from typing import Optional, Dict, Any
+import itertools
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Deque, List
+
+from guardrail.pipeline import LOCAL, Guard, GuardrailPipeline
+from guardrail.word_lists import NEGATIVE_MARKERS, ORDER_KEYWORDS, SUPPORT_OFFENSIVE_WORDS
+from metrics.metrics import metrics
+from metrics.profiler import profiler
+from metrics.usage import HARD, OK, SOFT, usage_ledger, usage_scope
+from serving.coalesce import RecordingSink, SingleFlight, coalesce_key, replay
+from serving.deadline import StageTimeout, message_deadline, stage
+from serving.sinks import Send, StreamStats, as_sink, emit
+from tools.tool_cache import tool_cache
 
 # === Assume these come from your OpenAI Agent SDK ===
 # Aapke project me ye paths different ho sakte hain (e.g., from agents import Agent, Runner, function_tool, guardrail, ItemHelpers)
 try:
-    from agents import Agent, Runner, function_tool, guardrail, ItemHelpers
-    from config.config import model
-except Exception:
+    from agents import Agent, Runner, function_tool, ItemHelpers, ModelSettings, RunConfig
+    from openai.types.responses import ResponseCompletedEvent, ResponseTextDeltaEvent
+except ImportError:
     # Fallback mock (sirf editor warnings se bachne ke liye). Actual run ke liye asli SDK required hoga.
     class Agent:  # type: ignore
-        def __init__(self, name: str, instructions: str, model: Optional[str] = None, tools: Optional[list] = None):
+        def __init__(self, name: str, instructions: str, model: Optional[str] = None, tools: Optional[list] = None, **kwargs: Any):
             self.name = name
             self.instructions = instructions
             self.model = model
             self.tools = tools or []
 
-    class Runner:  # type: ignore
-        def __init__(self, agent: Agent):
-            self.agent = agent
+    class ModelSettings:  # type: ignore
+        def __init__(self, **kwargs: Any):
+            self.__dict__.update(kwargs)
+
+    class RunConfig:  # type: ignore
+        def __init__(self, model: Any = None, model_settings: Optional[ModelSettings] = None, **kwargs: Any):
+            self.model = model
+            self.model_settings = model_settings
 
-        async def run_streamed(self, input: str, *, metadata: Optional[Dict[str, Any]] = None, model_settings: Optional[Dict[str, Any]] = None):
+    class Runner:  # type: ignore
+        @classmethod
+        def run_streamed(cls, agent: Agent, input: str, *, context: Optional[Dict[str, Any]] = None, run_config: Optional[RunConfig] = None):
             # Dummy async generator for demonstration
             class _Dummy:
                 async def stream_events(self):
                     # In real SDK, yahan events aate hain (tool calls, messages, handoffs, etc.)
-                    yield type("Evt", (), {"item": type("It", (), {"type": "message", "content": f"(MOCK) {input}"})})
+                    yield type("Evt", (), {"item": type("It", (), {"type": "message_output_item", "content": f"(MOCK) {input}"})})
             return _Dummy()
 
     def function_tool(*dargs, **dkwargs):  # type: ignore
@@ -36,15 +56,49 @@ except Exception:
             return fn
         return deco
 
-    def guardrail(fn):  # type: ignore
-        fn._is_guardrail = True
-        return fn
-
     class ItemHelpers:  # type: ignore
         @staticmethod
         def text_message_output(item):
             return getattr(item, "content", "")
 
+    class ResponseTextDeltaEvent:  # type: ignore
+        delta = ""
+
+    class ResponseCompletedEvent:  # type: ignore
+        response = None
+
+    model_breaker = None
+
+    def model_for(agent: str, *args: Any, **kwargs: Any) -> Any:  # type: ignore
+        return None
+else:
+    # Fallback ke bahar: GEMINI_API_KEY na ho to yahin error aaye, chupke se mock classes na lagen
+    from config.config import breaker as model_breaker, model_for
+
+
+# SDK me plain-function guardrail decorator nahi hai; ye sirf marker hai
+def guardrail(fn):
+    fn._is_guardrail = True
+    return fn
+
+
+# model=None: har agent apne tier ka model use karta hai (config/model_tiers.py); use_model() sab ko override karta hai
+run_config = RunConfig(tracing_disabled=True)
+
+# Customer ne token budget ka soft hissa (metrics/usage.py) cross kar liya -> chhote jawab
+SOFT_BUDGET_MAX_TOKENS = 256
+
+
+def use_model(model: Any, breaker: Any = None) -> None:
+    """Swap the model every agent in this module runs on (e.g. MockModel for local serving).
+
+    Pass the CircuitBreaker wrapping ``model`` (if any) so degraded mode follows it.
+    """
+    global run_config, model_breaker
+    run_config = RunConfig(model=model, tracing_disabled=True)
+    if breaker is not None:
+        model_breaker = breaker
+
 # === Simple in-memory order DB (simulate API) ===
 FAKE_ORDERS: Dict[str, Dict[str, str]] = {
     "123": {"status": "Shipped", "eta": "2-3 days", "carrier": "FastEx"},
@@ -56,27 +110,37 @@ FAKE_ORDERS: Dict[str, Dict[str, str]] = {
 def log_event(event_type: str, details: Dict[str, Any]):
     print(f"[LOG] {event_type}: {details}")
 
+
+# === Reply channel ===
+# send=None -> stdout (demo). Server/batch callers pass a Sink (serving/sinks.py) or a plain callable per connection.
+
 # === Guardrail: Offensive / Negative language detection ===
 @guardrail
 def language_guardrail(user_text: str) -> bool:
     """True = allowed, False = blocked"""
-    bad_words = ["idiot", "stupid", "bkwas", "lanat", "gali", "bewaqoof"]
     text = (user_text or "").lower()
-    if any(w in text for w in bad_words):
+    if any(w in text for w in SUPPORT_OFFENSIVE_WORDS):
         return False
     return True
 
+BLOCKED_REPLY = "⚠️ Barah-e-karam guftagu me respect barqarar rakhein. Meherbani karke apna message rephrase karein."
+
+# Saare blocking guards ek pipeline me (guardrail/pipeline.py): local checks pehle, model wale baad me concurrently
+guardrails = GuardrailPipeline(
+    [Guard("language", lambda text: None if language_guardrail(text) else BLOCKED_REPLY, cost=LOCAL)],
+    name="support",
+)
+
 # === Utility: basic sentiment check ===
 def is_negative_sentiment(user_text: str) -> bool:
-    neg_markers = ["refund now", "very bad", "worst", "angry", "nonsense", "bkwas", "ghalat", "cancel karo"]
     t = (user_text or "").lower()
-    return any(m in t for m in neg_markers)
+    return any(m in t for m in NEGATIVE_MARKERS)
 
 # === Function Tool: get_order_status with is_enabled + error_function ===
 
 def _is_order_query(user_text: str) -> bool:
     t = (user_text or "").lower()
-    return any(k in t for k in ["order", "status", "tracking", "track", "order id", "meray order ka", "mera order", "id "])
+    return any(k in t for k in ORDER_KEYWORDS)
 
 
 def _friendly_order_not_found(order_id: str) -> str:
@@ -86,23 +150,59 @@ def _friendly_order_not_found(order_id: str) -> str:
     )
 
 
-@function_tool(
-    name="get_order_status",
-    description="Simulated order status checker",
-    is_enabled=lambda query: _is_order_query(query.get("user_text", "")),
-    error_function=lambda *args, **kwargs: _friendly_order_not_found(kwargs.get("order_id", "(missing)")),
-)
-def get_order_status(order_id: str) -> str:
+class OrderNotFound(ValueError):
+    def __init__(self, order_id: str):
+        super().__init__("ORDER_NOT_FOUND")
+        self.order_id = order_id
+
+
+# Order status kabhi bhi bahar se badal sakta hai: cache sirf 30s
+@tool_cache.cached(depends_on=lambda order_id: [f"order:{order_id}"], name="get_order_status", ttl=30.0)
+def lookup_order_status(order_id: str) -> str:
     # Roman Urdu: Yahan normally API/database call hoti. Hum fake dict use kar rahe hain.
     log_event("tool_invocation", {"tool": "get_order_status", "order_id": order_id})
     data = FAKE_ORDERS.get(order_id)
     if not data:
-        # Real SDK error_function ko trigger karne ke liye exception
-        raise ValueError("ORDER_NOT_FOUND")
+        # Real SDK failure_error_function ko trigger karne ke liye exception
+        raise OrderNotFound(order_id)
     return (
         f"Order {order_id}: Status = {data['status']}, ETA = {data['eta']}, Carrier = {data['carrier']}"
     )
 
+
+get_order_status = function_tool(
+    name_override="get_order_status",
+    description_override="Simulated order status checker",
+    is_enabled=lambda ctx, agent: _is_order_query((ctx.context or {}).get("user_text", "")),
+    failure_error_function=lambda ctx, error: _friendly_order_not_found(getattr(error, "order_id", "(missing)")),
+)(lookup_order_status)
+
+# === Degraded mode: provider down -> no model calls, human queue ===
+HUMAN_QUEUE: Deque[Dict[str, Any]] = deque(maxlen=10_000)
+_ticket_ids = itertools.count(1)
+
+
+def provider_degraded() -> bool:
+    """True while the model circuit breaker is open (see config/config.py)."""
+    return model_breaker is not None and model_breaker.is_open()
+
+
+async def queue_for_human(user_text: str, customer_id: str, reason: str, send: Optional[Send] = None) -> str:
+    ticket = f"HQ-{next(_ticket_ids)}"
+    HUMAN_QUEUE.append(
+        {"ticket": ticket, "customer_id": customer_id, "text": user_text, "reason": reason, "queued_at": time.time()}
+    )
+    metrics.incr("support_human_queued_total", reason=reason)
+    metrics.set_gauge("support_human_queue_depth", len(HUMAN_QUEUE))
+    log_event("human_queue", {"ticket": ticket, "customer_id": customer_id, "reason": reason})
+    await emit(
+        send,
+        f"🙏 (Bot) Is waqt hamara system masroof hai. Aapka message human agent ki queue me daal diya gaya hai "
+        f"(ticket {ticket}). Jald aap se rabta kiya jayega.",
+    )
+    return ticket
+
+
 # === FAQs (simple hard-coded) ===
 FAQS: Dict[str, str] = {
     "return policy": "Hamari return policy 30 din ki hai. Item unused ho aur receipt ho to asani se return ho jata hai.",
@@ -137,56 +237,109 @@ HUMAN_INSTRUCTIONS = (
 )
 
 
-bot_agent = Agent(
-    name="BotAgent",
-    instructions=BOT_INSTRUCTIONS,
-    model="gpt-5-mini",  # aap apna model yahan set kar sakte hain
-    tools=[get_order_status],
-    gemini_model=model
-)
-
+# Model tiers (config/model_tiers.py): bot aur HumanAgent dono "default" tier par (pehle jaisa model);
+# "strong" sirf run_with_escalation ke retries ke liye.
+# use_model() (e.g. MockModel) run_config.model se dono ko override karta hai.
 human_agent = Agent(
     name="HumanAgent",
     instructions=HUMAN_INSTRUCTIONS,
-    gemini_model=model,
-
+    model=model_for("HumanAgent"),
 )
 
-
+# handoff ko SDK khud nahi chalata: run_with_agent handoff dekhte hi bot run cancel karke human_agent start karta hai
 bot_agent = Agent(
     name="BotAgent",
     instructions=BOT_INSTRUCTIONS,
-    model="gpt-5-mini",  # aap apna model yahan set kar sakte hain
+    model=model_for("BotAgent"),
     tools=[get_order_status],
-    gemini_model=model
+    handoffs=[human_agent],
 )
 
 # === Orchestrator ===
-async def handle_message(user_text: str, customer_id: str) -> None:
-    # 1) Guardrail
-    if not language_guardrail(user_text):
-        print(
-            "⚠️ Barah-e-karam guftagu me respect barqarar rakhein. Meherbani karke apna message rephrase karein."
-        )
-        log_event("guardrail_block", {"text": user_text})
+# Ek jaise concurrent sawal ("return policy", incident ke waqt "where is my order") ek hi run share karte hain.
+# Order / negative-sentiment paths personal hain (order ID, human queue per customer): woh kabhi share nahi hote.
+support_flight = SingleFlight("support")
+
+
+def _coalesce_key(user_text: str) -> Optional[str]:
+    if _is_order_query(user_text) or extract_order_id(user_text) or is_negative_sentiment(user_text):
+        return None
+    return coalesce_key(user_text, degraded=provider_degraded())
+
+
+async def handle_message(
+    user_text: str, customer_id: str, send: Optional[Send] = None, deadline: Optional[float] = None
+) -> None:
+    """``deadline``: seconds for the whole message (default MESSAGE_DEADLINE_S, or the caller's running deadline)."""
+    sink = RecordingSink(as_sink(send))  # to know if a full reply already went out
+    with (
+        message_deadline(deadline),
+        usage_scope(customer=customer_id),
+        profiler.profile("handle_message", customer=customer_id, agent="support"),
+    ):
+        try:
+            async with stage("message"):
+                await _handle_message(user_text, customer_id, sink)
+        except StageTimeout:
+            if any(kind in ("message", "end") for kind, _ in sink.frames):
+                return  # customer ko jawab (ya ticket) mil chuka hai
+            # reserve ka waqt abhi baqi hai: deadline se pehle customer ko jawab + human queue
+            log_event("deadline_fallback", {"customer_id": customer_id, "text": user_text})
+            await queue_for_human(user_text, customer_id, "deadline", sink)
+
+
+async def _handle_message(user_text: str, customer_id: str, send: Optional[Send] = None) -> None:
+    key = _coalesce_key(user_text)
+    if key is None:
+        await support_flight.do(None, lambda: _respond(user_text, customer_id, send))  # counted as bypass
         return
 
+    leader_sink = RecordingSink(as_sink(send))
+
+    async def lead():
+        generic = await _respond(user_text, customer_id, leader_sink)
+        return generic, leader_sink.frames
+
+    _, frames = await support_flight.do(key, lead, share=lambda result: result[0])
+    if frames is not leader_sink.frames:
+        # follower: leader ka jawab is customer ko replay
+        log_event("coalesced", {"customer_id": customer_id, "text": user_text})
+        await replay(frames, send)
+
+
+async def _respond(user_text: str, customer_id: str, send: Optional[Send] = None) -> bool:
+    """Handle one message. Returns True when the reply is generic (same for any customer asking the same)."""
+    # 1) Guardrail
+    verdict = await guardrails.run(user_text)
+    if not verdict:
+        await emit(send, verdict.message)
+        log_event("guardrail_block", {"guard": verdict.guard, "text": user_text})
+        return True
+
     # 2) Handoff check (negative sentiment or complex)
     # Pehle check karte hain ke FAQs ya orders ke ilawa kuch bohat complex to nahi
     faq = try_faq_answer(user_text)
     order_like = _is_order_query(user_text)
+    # Circuit open ya customer ka token budget khatam -> FAQ/order fast paths still answer,
+    # baqi sab human queue (no model calls). Soft budget -> chhote jawab, HumanAgent run nahi.
+    budget = usage_ledger.budget_status(customer_id)
+    degraded = provider_degraded() or budget == HARD
+    degraded_reason = "token_budget" if budget == HARD else "provider_degraded"
+    if budget != OK:
+        metrics.incr("support_budget_degraded_total", level=budget)
 
     if is_negative_sentiment(user_text):
         # Negative tone -> HumanAgent
         log_event("handoff", {"reason": "negative_sentiment", "to": "HumanAgent"})
-        await run_with_agent(human_agent, user_text, customer_id, tool_choice="auto")
-        return
+        if degraded or budget == SOFT or not await run_with_agent(human_agent, user_text, customer_id, send=send, tool_choice="auto"):
+            await queue_for_human(user_text, customer_id, "negative_sentiment", send)
+        return False
 
     # 3) Agar FAQ match ho to direct jawab
     if faq and not order_like:
-        print(f"🤖 (Bot) FAQ: {faq}")
+        await emit(send, f"🤖 (Bot) FAQ: {faq}")
         log_event("faq_answered", {"faq": faq})
-        return
+        return True
 
     # 4) Agar order query lag rahi ho, tool try karo
     if order_like:
@@ -194,70 +347,186 @@ async def handle_message(user_text: str, customer_id: str) -> None:
         # For clarity, hum direct tool ko call kar rahe hain (SDK ke mutabiq aap LLM-run me bhi chalwa sakte hain).
         order_id = extract_order_id(user_text)
         if not order_id:
-            print("🤖 (Bot) Meherbani karke apni order ID share karein (e.g., 123, 456, 789).")
-            return
+            await emit(send, "🤖 (Bot) Meherbani karke apni order ID share karein (e.g., 123, 456, 789).")
+            return False
         try:
-            result = get_order_status(order_id=order_id)  # SDK: tool will validate via is_enabled
-            print(f"📦 (Bot) {result}")
-            return
+            result = lookup_order_status(order_id=order_id)  # SDK: tool will validate via is_enabled
+            await emit(send, f"📦 (Bot) {result}")
+            return False
         except Exception:
             # error_function ka friendly output
-            print(_friendly_order_not_found(order_id))
-            return
+            await emit(send, _friendly_order_not_found(order_id))
+            return False
+
+    if degraded:
+        await queue_for_human(user_text, customer_id, degraded_reason, send)
+        return False
 
     # 5) Agar na FAQ na order, to try bot via LLM; agar still ambiguous -> handoff
     model_settings = {
         "tool_choice": "auto",  # "required" bhi try karke dikha sakte hain
         "metadata": {"customer_id": customer_id, "channel": "chat"},
     }
+    if budget == SOFT:
+        model_settings["max_tokens"] = SOFT_BUDGET_MAX_TOKENS
 
     # Bot se try karein
-    ok = await run_with_agent(bot_agent, user_text, customer_id, **model_settings)
-
-    if not ok:
-        # Agar bot confident nahi, to human ko de dein
-        log_event("handoff", {"reason": "no_clear_answer", "to": "HumanAgent"})
-        await run_with_agent(human_agent, user_text, customer_id, tool_choice="auto")
-
-
-async def run_with_agent(agent: Agent, user_text: str, customer_id: str, **model_settings):
-    print(f"\n--- {agent.name} ko message diya gaya ---")
-    print(f"👤 (User-{customer_id}): {user_text}")
+    outcome = await run_with_agent(bot_agent, user_text, customer_id, send=send, stage_name="bot_agent", **model_settings)
+    if outcome:
+        return True
+    if outcome is None:
+        # run_with_agent ko hamesha RunOutcome dena chahiye; phir bhi crash ke bajaye handoff
+        outcome = RunOutcome(False, "no_outcome")
+
+    if provider_degraded():
+        # Bot run ne breaker trip kar diya: HumanAgent bhi usi model par hai, seedha queue
+        await queue_for_human(user_text, customer_id, "provider_degraded", send)
+        return False
+    if budget == SOFT:
+        # budget ke aakhri hisse me HumanAgent ka lamba run nahi: seedha queue
+        await queue_for_human(user_text, customer_id, "token_budget", send)
+        return False
+    # Agar bot confident nahi, to human ko de dein (bot ke tool results saath jate hain, dobara nahi chalte)
+    log_event("handoff", {"reason": outcome.reason or "no_clear_answer", "to": "HumanAgent"})
+    if not await run_with_agent(
+        human_agent, user_text, customer_id, send=send, history=outcome.history, tool_choice="auto"
+    ):
+        await queue_for_human(user_text, customer_id, "agent_failed", send)
+    return False
+
+
+class RunOutcome:
+    """What run_with_agent saw; truthy when the agent answered confidently.
+
+    On an early stop ``reason`` says why ("handoff", "error", "exception") and
+    ``history`` holds the input plus the bot's completed tool calls/messages,
+    ready to be the next agent's input.
+    """
+
+    __slots__ = ("ok", "reason", "history")
+
+    def __init__(self, ok: bool, reason: Optional[str] = None, history: Optional[List[Any]] = None):
+        self.ok = ok
+        self.reason = reason
+        self.history = history
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+def _call_id(raw: Any) -> Optional[str]:
+    return raw.get("call_id") if isinstance(raw, dict) else getattr(raw, "call_id", None)
+
+
+def _partial_history(agent_input: Any, items: List[Any]) -> List[Any]:
+    """Input + finished items, dropping tool calls whose output never arrived (and the handoff call)."""
+    history = list(agent_input) if isinstance(agent_input, list) else [{"role": "user", "content": agent_input}]
+    answered = {_call_id(i.raw_item) for i in items if i.type == "tool_call_output_item"}
+    for item in items:
+        if item.type == "tool_call_item" and _call_id(item.raw_item) not in answered:
+            continue
+        history.append(item.to_input_item())
+    return history
+
+
+async def run_with_agent(
+    agent: Agent,
+    user_text: str,
+    customer_id: str,
+    send: Optional[Send] = None,
+    history: Optional[List[Any]] = None,
+    stage_name: str = "agent",
+    **model_settings,
+) -> RunOutcome:
+    """Stream one agent run. Stops (and cancels the run) at the first handoff or error event."""
+    if send is None:
+        print(f"\n--- {agent.name} ko message diya gaya ---")
+        print(f"👤 (User-{customer_id}): {user_text}")
+
+    agent_input = history or user_text
+    sink = as_sink(send)
+    stats = StreamStats(agent.name)
+    started = time.monotonic()
+    seen: List[Any] = []
+    result = None
+
+    def stop_early(reason: str) -> RunOutcome:
+        # Baqi stream ka intezar nahi: run yahin cancel, human_agent foran start ho sakta hai
+        if result is not None and hasattr(result, "cancel"):
+            result.cancel()
+        metrics.observe("support_time_to_handoff_s", time.monotonic() - started, agent=agent.name, reason=reason)
+        metrics.incr("support_early_stops_total", agent=agent.name, reason=reason)
+        return RunOutcome(False, reason, _partial_history(agent_input, seen))
 
-    runner = Runner(agent)
     try:
-        result = await runner.run_streamed(
-            input=user_text,
-            metadata={"customer_id": customer_id},
-            model_settings=model_settings or {"tool_choice": "auto"},
-        )
-
-        confident = False
-        async for event in result.stream_events():
-            # Roman Urdu: SDK ke events me alag types ho sakte hain (message, tool_call, tool_result, handoff, error, etc.)
-            item = event.item
-            itype = getattr(item, "type", "message")
-
-            if itype == "message":
-                print(f"💬 ({agent.name}): {ItemHelpers.text_message_output(item)}")
-                confident = True
-
-            elif itype == "tool_call_item":
-                log_event("tool_call", {"agent": agent.name, "tool": getattr(item, "name", "unknown")})
-            elif itype == "tool_result_item":
-                log_event("tool_result", {"agent": agent.name, "result": getattr(item, "output", "")})
-            elif itype == "handoff_item":
-                log_event("handoff_event", {"from": agent.name, "to": "HumanAgent"})
-                confident = False
-            elif itype == "error":
-                log_event("agent_error", {"agent": agent.name})
-                confident = False
-
-        return confident
-
+        settings = dict(model_settings or {"tool_choice": "auto"})
+        settings.setdefault("metadata", {"customer_id": customer_id})
+        # Deadline (serving/deadline.py): budget khatam -> stream cancel, jo ho chuka woh history me
+        async with stage(stage_name):
+            with usage_scope(agent=agent.name):  # run ka task yehi context copy karta hai
+                result = Runner.run_streamed(
+                    agent,
+                    input=agent_input,
+                    context={"customer_id": customer_id, "user_text": user_text},
+                    run_config=RunConfig(
+                        model=run_config.model,
+                        model_settings=ModelSettings(**settings),
+                        tracing_disabled=True,
+                    ),
+                )
+
+            confident = False
+            streaming = False  # is a message being delivered delta-by-delta right now?
+            async for event in result.stream_events():
+                # Roman Urdu: SDK ke events me alag types ho sakte hain (message, tool_call, tool_result, handoff, error, etc.)
+                if getattr(event, "type", None) == "raw_response_event":
+                    data = event.data
+                    if isinstance(data, ResponseTextDeltaEvent) and sink.streams_deltas:
+                        # token aate hi user tak: perceived latency pehle token se hai, aakhri se nahi
+                        stats.on_delta(data.delta)
+                        await sink.delta(agent.name, data.delta)
+                        streaming = True
+                    elif isinstance(data, ResponseCompletedEvent) and data.response.usage:
+                        stats.on_usage(data.response.usage.output_tokens)
+                    continue
+                item = getattr(event, "item", None)
+                if item is None:
+                    # agent_updated_stream_event
+                    continue
+                itype = getattr(item, "type", "message_output_item")
+
+                if itype == "message_output_item":
+                    if streaming:
+                        await sink.end(agent.name)
+                        streaming = False
+                    else:
+                        await sink.message(f"💬 ({agent.name}): {ItemHelpers.text_message_output(item)}")
+                    confident = True
+                    seen.append(item)
+
+                elif itype == "tool_call_item":
+                    log_event("tool_call", {"agent": agent.name, "tool": getattr(getattr(item, "raw_item", item), "name", "unknown")})
+                    seen.append(item)
+                elif itype == "tool_call_output_item":
+                    log_event("tool_result", {"agent": agent.name, "result": getattr(item, "output", "")})
+                    seen.append(item)
+                elif itype in ("handoff_call_item", "handoff_output_item"):
+                    log_event("handoff_event", {"from": agent.name, "to": "HumanAgent"})
+                    return stop_early("handoff")
+                elif itype == "error":
+                    log_event("agent_error", {"agent": agent.name})
+                    return stop_early("error")
+
+            return RunOutcome(confident)
+
+    except StageTimeout as e:
+        log_event("stage_timeout", {"agent": agent.name, "stage": e.stage, "budget_s": round(e.budget, 2)})
+        return stop_early("timeout")
     except Exception as e:
         log_event("runner_exception", {"agent": agent.name, "error": str(e)})
-        return False
+        return stop_early("exception")
+    finally:
+        stats.finish()
 
 
 # === Helpers ===
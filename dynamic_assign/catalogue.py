@@ -0,0 +1,219 @@
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+# ----------------------------
+# Columnar hotel catalogue
+# ----------------------------
+# One list/array per field instead of one dict per hotel:
+#   * strings in plain lists; owner/address interned (they repeat a lot)
+#   * total_rooms / blocked_rooms in array('i') (-1 = unknown)
+#   * amenities as ids into a shared, interned vocabulary, stored in one
+#     flat array('H') with per-row start/length
+# A row costs a few array slots plus its unique strings, so a million hotels
+# fit in a worker without a dict-of-dicts per hotel. get()/items() still hand
+# out plain dicts in the old HOTEL_DB shape for code that wants them.
+
+UNKNOWN = -1
+STRING_FIELDS = ("name", "owner", "address", "phone", "notes")
+INT_FIELDS = ("total_rooms", "blocked_rooms")
+_INTERNED = ("owner", "address")
+
+
+class HotelRecord(BaseModel):
+    name: str
+    owner: Optional[str] = None
+    total_rooms: Optional[int] = None
+    blocked_rooms: Optional[int] = None
+    amenities: Optional[List[str]] = None
+    address: Optional[str] = None
+    phone: Optional[str] = None
+    notes: Optional[str] = None
+
+
+def normalize_key(text: str) -> str:
+    return " ".join(text.strip().lower().split())
+
+
+class HotelCatalogue:
+    def __init__(self, records: Iterable[Dict[str, Any]] = ()):
+        self._rows: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._str: Dict[str, List[Optional[str]]] = {f: [] for f in STRING_FIELDS}
+        self._int: Dict[str, array] = {f: array("i") for f in INT_FIELDS}
+        self._amenity_ids: Dict[str, int] = {}
+        self.amenity_vocab: List[str] = []
+        self._amenity_flat = array("H")
+        self._amenity_start = array("I")
+        self._amenity_len = array("B")
+        self._listeners: List[Any] = []
+        for rec in records:
+            self.upsert(rec)
+
+    # --- mapping-style reads (old HOTEL_DB interface) ---
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        return self.row_dict(self._rows[key])
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._rows.get(key)
+        return default if row is None else self.row_dict(row)
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for row, key in enumerate(self._keys):
+            yield key, self.row_dict(row)
+
+    def row_of(self, key: str) -> Optional[int]:
+        return self._rows.get(key)
+
+    def key_at(self, row: int) -> str:
+        return self._keys[row]
+
+    def name_at(self, row: int) -> str:
+        return self._str["name"][row] or self._keys[row]
+
+    def str_at(self, field: str, row: int) -> Optional[str]:
+        return self._str[field][row]
+
+    def int_at(self, field: str, row: int) -> Optional[int]:
+        value = self._int[field][row]
+        return None if value == UNKNOWN else value
+
+    def public_capacity_at(self, row: int) -> Optional[int]:
+        total = self._int["total_rooms"][row]
+        if total == UNKNOWN:
+            return None
+        blocked = self._int["blocked_rooms"][row]
+        return total - (0 if blocked == UNKNOWN else blocked)
+
+    def amenity_ids_at(self, row: int) -> array:
+        start = self._amenity_start[row]
+        return self._amenity_flat[start:start + self._amenity_len[row]]
+
+    def row_dict(self, row: int) -> Dict[str, Any]:
+        """The hotel as a plain dict; unknown fields are left out, like the old HOTEL_DB entries."""
+        out: Dict[str, Any] = {}
+        for f in STRING_FIELDS:
+            value = self._str[f][row]
+            if value is not None:
+                out[f] = value
+        for f in INT_FIELDS:
+            value = self._int[f][row]
+            if value != UNKNOWN:
+                out[f] = value
+        if self._amenity_len[row]:
+            out["amenities"] = [self.amenity_vocab[i] for i in self.amenity_ids_at(row)]
+        return out
+
+    def iter_names(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[str]:
+        """Hotel names in insertion order, without building the whole list."""
+        end = len(self._keys) if limit is None else min(len(self._keys), offset + limit)
+        for row in range(max(0, offset), end):
+            yield self.name_at(row)
+
+    # --- HotelRecord conversion ---
+
+    def to_record(self, key: str) -> HotelRecord:
+        return HotelRecord(**self[key])
+
+    def to_records(self) -> Iterator[HotelRecord]:
+        for row in range(len(self._keys)):
+            yield HotelRecord(**self.row_dict(row))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any]) -> "HotelCatalogue":
+        cat = cls()
+        for rec in records:
+            cat.upsert(rec.model_dump(exclude_none=True) if isinstance(rec, BaseModel) else rec)
+        return cat
+
+    # --- writes ---
+
+    def subscribe(self, listener: Any) -> None:
+        """``listener(row, old_dict_or_None)`` after every upsert (indexes stay in sync this way)."""
+        self._listeners.append(listener)
+
+    def _amenity_id(self, amenity: str) -> int:
+        aid = self._amenity_ids.get(amenity)
+        if aid is None:
+            aid = len(self.amenity_vocab)
+            if aid > 0xFFFF:
+                raise ValueError("too many distinct amenities")
+            self.amenity_vocab.append(sys.intern(amenity))
+            self._amenity_ids[amenity] = aid
+        return aid
+
+    def _set_amenities(self, row: int, amenities: List[str]) -> None:
+        ids = [self._amenity_id(a) for a in dict.fromkeys(amenities)][:255]
+        if len(ids) <= self._amenity_len[row]:
+            # fits in the old slot: rewrite in place
+            start = self._amenity_start[row]
+            self._amenity_flat[start:start + len(ids)] = array("H", ids)
+        else:
+            self._amenity_start[row] = len(self._amenity_flat)
+            self._amenity_flat.extend(ids)
+        self._amenity_len[row] = len(ids)
+
+    def upsert(self, fields: Dict[str, Any]) -> str:
+        """Insert or merge (fields set to None are ignored). Returns the hotel key."""
+        if not fields.get("name"):
+            raise ValueError("hotel name is required")
+        key = normalize_key(fields["name"])
+        row = self._rows.get(key)
+        old = None
+        if row is None:
+            row = len(self._keys)
+            self._rows[key] = row
+            self._keys.append(key)
+            for col in self._str.values():
+                col.append(None)
+            for col in self._int.values():
+                col.append(UNKNOWN)
+            self._amenity_start.append(len(self._amenity_flat))
+            self._amenity_len.append(0)
+        elif self._listeners:
+            old = self.row_dict(row)
+
+        for f in STRING_FIELDS:
+            value = fields.get(f)
+            if value is not None:
+                self._str[f][row] = sys.intern(value) if f in _INTERNED else value
+        for f in INT_FIELDS:
+            value = fields.get(f)
+            if value is not None:
+                self._int[f][row] = int(value)
+        if fields.get("amenities") is not None:
+            self._set_amenities(row, list(fields["amenities"]))
+
+        for listener in self._listeners:
+            listener(row, old)
+        return key
+
+    def nbytes(self) -> int:
+        """Rough resident size of the columns (unique strings included once)."""
+        seen = set()
+        total = 0
+        for col in self._str.values():
+            total += sys.getsizeof(col)
+            for s in col:
+                if s is not None and id(s) not in seen:
+                    seen.add(id(s))
+                    total += sys.getsizeof(s)
+        total += sum(sys.getsizeof(c) for c in self._int.values())
+        total += sys.getsizeof(self._amenity_flat) + sys.getsizeof(self._amenity_start) + sys.getsizeof(self._amenity_len)
+        total += sys.getsizeof(self._rows) + sys.getsizeof(self._keys) + sum(sys.getsizeof(k) for k in self._keys)
+        return total
@@ -1,21 +1,31 @@
 
 
 
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
 from typing import Dict, Optional, Any, List, Tuple
 from pydantic import BaseModel
 import re
-from guardrail.input_guardrail import guardrial_input_function
 
 from agents import Agent, function_tool, Runner, RunContextWrapper
-from config.config import MODEL
+from config.config import model_for
+from guardrail.input_guardrail import offensive_language
+from guardrail.pipeline import LOCAL, Guard, GuardrailPipeline
+from dynamic_assign.catalogue import HotelCatalogue, HotelRecord
+from dynamic_assign.hotel_index import SORTS, HotelIndex
+from tools.tool_cache import tool_cache
 
 
 # ----------------------------
 # In-memory multi-hotel storage
 # ----------------------------
 # You can replace this with a DB later; keep the same interface.
-HOTEL_DB: Dict[str, Dict[str, Any]] = {
-    "hotel sannata": {
+# Columnar storage (dynamic_assign/catalogue.py); HOTEL_DB.get(key) still returns a plain dict.
+HOTEL_DB = HotelCatalogue([
+    {
         "name": "Hotel Sannata",
         "owner": "Mr. Ratan Lal",
         "total_rooms": 200,
@@ -25,7 +35,7 @@ HOTEL_DB: Dict[str, Dict[str, Any]] = {
         "phone": "+92-300-1234567",
         "notes": "20 rooms reserved for special guests.",
     },
-    "hotel blue bay": {
+    {
         "name": "Hotel Blue Bay",
         "owner": "Ayesha Khan",
         "total_rooms": 120,
@@ -35,7 +45,7 @@ HOTEL_DB: Dict[str, Dict[str, Any]] = {
         "phone": "+92-311-1111111",
         "notes": "Popular for sea-facing rooms.",
     },
-    "hotel grand palace": {
+    {
         "name": "Hotel Grand Palace",
         "owner": "Mr. Ahmed Ali",
         "total_rooms": 300,
@@ -44,8 +54,14 @@ HOTEL_DB: Dict[str, Dict[str, Any]] = {
         "address": "Mall Road, Lahore",
         "phone": "+92-321-2222222",
         "notes": "Luxury hotel in the heart of the city.",
-    }
-}
+    },
+])
+
+# City / amenity / capacity indexes; add_or_update_hotel keeps them current through HOTEL_DB.upsert
+HOTEL_INDEX = HotelIndex(HOTEL_DB)
+
+# Cached tool results ("hotel:<key>" = one hotel, "hotels" = anything listing/searching all of them)
+HOTEL_DB.subscribe(lambda row, old: tool_cache.invalidate(f"hotel:{HOTEL_DB.key_at(row)}", "hotels"))
 
 # ----------------------------
 # Utility helpers
@@ -62,8 +78,9 @@ def _find_hotel_candidates(message: str) -> List[Tuple[str, float]]:
     msg = _normalize(message)
     candidates: List[Tuple[str, float]] = []
     msg_tokens = set(re.findall(r"[a-z0-9']+", msg))
-    for key, data in HOTEL_DB.items():
-        name_tokens = set(re.findall(r"[a-z0-9']+", _normalize(data.get("name", key))))
+    for row in range(len(HOTEL_DB)):
+        key = HOTEL_DB.key_at(row)
+        name_tokens = set(re.findall(r"[a-z0-9']+", _normalize(HOTEL_DB.name_at(row))))
         overlap = len(msg_tokens & name_tokens)
         score = overlap / max(1, len(name_tokens))
         if overlap > 0:
@@ -73,23 +90,30 @@ def _find_hotel_candidates(message: str) -> List[Tuple[str, float]]:
     return candidates
 
 
+def _state(context: Optional[RunContextWrapper]) -> Dict[str, Any]:
+    """The run's context dict (Runner.run(..., context={...})); session state lives in it."""
+    state = getattr(context, "context", None)
+    return state if isinstance(state, dict) else {}
+
+
 def _pick_active_hotel(context: RunContextWrapper) -> Optional[str]:
     """Decide which hotel is active based on:
-    1) Previously set context.state["active_hotel"].
-    2) Latest user message text.
+    1) Previously set context["active_hotel"].
+    2) Latest user message text (context["user_text"]).
     """
+    state = _state(context)
     # 1) Persisted in state?
-    active = context.state.get("active_hotel")
+    active = state.get("active_hotel")
     if active:
         return active if active in HOTEL_DB else None
 
     # 2) Infer from the latest user message
-    last_user = context.latest_user_message or ""
+    last_user = state.get("user_text") or ""
     if last_user:
         cands = _find_hotel_candidates(last_user)
         if cands:
             key = cands[0][0]
-            context.state["active_hotel"] = key
+            state["active_hotel"] = key
             return key
 
     return None
@@ -99,17 +123,6 @@ def _pick_active_hotel(context: RunContextWrapper) -> Optional[str]:
 # Tools (function_tool) — allow updating/reading hotel data
 # ----------------------------
 
-class HotelRecord(BaseModel):
-    name: str
-    owner: Optional[str] = None
-    total_rooms: Optional[int] = None
-    blocked_rooms: Optional[int] = None
-    amenities: Optional[List[str]] = None
-    address: Optional[str] = None
-    phone: Optional[str] = None
-    notes: Optional[str] = None
-
-
 @function_tool
 def add_or_update_hotel(payload: HotelRecord) -> str:
     """Create or update a hotel's profile. Returns a confirmation string.
@@ -125,44 +138,87 @@ def add_or_update_hotel(payload: HotelRecord) -> str:
       "notes": "Sea view."
     }
     """
-    key = _normalize(payload.name)
-    existing = HOTEL_DB.get(key, {})
-    updated = {**existing}
+    # Merge: sirf diye gaye fields update hote hain, canonical name hamesha save hota hai
+    key = HOTEL_DB.upsert(payload.model_dump(exclude_none=True))
+    return f"Saved hotel: {payload.name} (key: {key})."
 
-    for field, value in payload.model_dump(exclude_none=True).items():
-        updated[field] = value
 
-    # Ensure canonical name always saved
-    updated["name"] = payload.name
+LIST_PAGE_MAX = 200
+
+
+@function_tool
+@tool_cache.cached(depends_on=["hotels"])
+def list_hotels(offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+    """List registered hotel names one page at a time. Call again with next_offset for more (null = no more)."""
+    limit = max(1, min(limit, LIST_PAGE_MAX))
+    names = list(HOTEL_DB.iter_names(offset, limit))
+    next_offset = offset + len(names)
+    return {
+        "hotels": names,
+        "total": len(HOTEL_DB),
+        "next_offset": next_offset if next_offset < len(HOTEL_DB) else None,
+    }
+
 
-    HOTEL_DB[key] = updated
-    return f"Saved hotel: {updated['name']} (key: {key})."
+SEARCH_LIMIT_MAX = 25
 
 
 @function_tool
-def list_hotels() -> List[str]:
-    """List all hotel names currently registered."""
-    return [data.get("name", key) for key, data in HOTEL_DB.items()]
+@tool_cache.cached(depends_on=["hotels"])
+def search_hotels(
+    city: Optional[str] = None,
+    amenities: Optional[List[str]] = None,
+    min_capacity: Optional[int] = None,
+    max_capacity: Optional[int] = None,
+    match_all_amenities: bool = True,
+    sort_by: str = "capacity",
+    limit: int = 5,
+) -> Dict[str, Any]:
+    """Find hotels by city, amenities and bookable (public) capacity.
+
+    Use this instead of list_hotels for questions like "hotels in Karachi with a pool and Wi-Fi".
+    sort_by: "capacity" (largest first), "capacity_asc" or "name". With match_all_amenities=false,
+    hotels having more of the requested amenities rank first. "more" is true when results were cut at limit.
+    """
+    if sort_by not in SORTS:
+        return {"error": f"sort_by must be one of {', '.join(SORTS)}"}
+    return HOTEL_INDEX.search(
+        city=city,
+        amenities=amenities or (),
+        min_capacity=min_capacity,
+        max_capacity=max_capacity,
+        match_all_amenities=match_all_amenities,
+        sort_by=sort_by,
+        limit=max(1, min(limit, SEARCH_LIMIT_MAX)),
+    )
 
 
 @function_tool
-def get_hotel_info(name: Optional[str] = None, use_active_if_missing: bool = True, context: Optional[RunContextWrapper] = None) -> Dict[str, Any]:
+def get_hotel_info(context: RunContextWrapper, name: Optional[str] = None, use_active_if_missing: bool = True) -> Dict[str, Any]:
     """Get a hotel's info by name. If name is missing and use_active_if_missing=True, use active hotel from context."""
     key: Optional[str] = _normalize(name) if name else None
 
-    if not key and use_active_if_missing and context is not None:
+    if not key and use_active_if_missing:
         key = _pick_active_hotel(context)
 
     if not key:
         return {"error": "No hotel specified. Please provide a hotel name."}
 
-    rec = HOTEL_DB.get(key)
+    rec = _hotel_profile(key)
     if not rec:
         return {"error": f"Hotel not found: {name or key}"}
 
     # Also set it as active in context (session continuity)
-    if context is not None:
-        context.state["active_hotel"] = key
+    _state(context)["active_hotel"] = key
+
+    return rec
+
+
+@tool_cache.cached(depends_on=lambda key: [f"hotel:{key}"], name="get_hotel_info")
+def _hotel_profile(key: str) -> Optional[Dict[str, Any]]:
+    rec = HOTEL_DB.get(key)
+    if not rec:
+        return None
 
     # Compute public availability
     total = rec.get("total_rooms")
@@ -203,7 +259,10 @@ def dynamic_instructions(context: RunContextWrapper, agent: Agent) -> str:
 
     if not active_key:
         # No hotel inferred yet — provide neutral instructions, plus guidance to ask for hotel.
-        hotels = ", ".join(sorted([h.get("name", k) for k, h in HOTEL_DB.items()])) or "(no hotels registered)"
+        # Bara catalogue prompt me nahi jata: chand naam, baqi list_hotels se
+        hotels = ", ".join(HOTEL_DB.iter_names(0, 20)) or "(no hotels registered)"
+        if len(HOTEL_DB) > 20:
+            hotels += f" ... and {len(HOTEL_DB) - 20} more (use list_hotels)"
         return (
             base_rules
             + f"\nCurrently no active hotel is selected. Known hotels: {hotels}. Ask the user which hotel they mean.\n"
@@ -246,43 +305,52 @@ def dynamic_instructions(context: RunContextWrapper, agent: Agent) -> str:
 # Agent definition
 # ----------------------------
 
+# Word list only: the math topic classifier in guardrail/input_guardrail.py would reject every hotel question
+hotel_input_guardrails = GuardrailPipeline(
+    [Guard("offensive_language", offensive_language, cost=LOCAL)],
+    name="hotel_input",
+)
+
 hotel_assistant = Agent(
     name="Hotel Customer Care",
-    model=MODEL,
+    model=model_for("HotelAssistant"),
     instructions=dynamic_instructions,  # <— dynamic
-    tools=[add_or_update_hotel, list_hotels, get_hotel_info],
-    input_guardrails=[guardrial_input_function],
+    tools=[add_or_update_hotel, list_hotels, search_hotels, get_hotel_info],
+    input_guardrails=[hotel_input_guardrails.as_input_guardrail()],
     output_guardrails=[],
-    output_schema=HotelQueryClassification,  # Optional: model can fill this, useful for logging/analytics
 )
 
 
 # ----------------------------
-# Small demo (optional) — run via: `python -m bilal_fareed_code.my_agent.hotel_assistant`
+# Small demo (optional) — run via: `python dynamic_assign/dynamic.py`
 # ----------------------------
-if __name__ == "__main__":
-    # Simple interactive runner for local testing
-    runner = Runner.run(hotel_assistant)
+async def main():
+    # Simple interactive runner for local testing; the context dict carries the active hotel between turns
+    state: Dict[str, Any] = {"customer_id": "local"}
 
     print("Type your messages. Try: 'Tell me about Hotel Sannata availability' or 'Add Hotel Blue Bay'\n")
+    while True:
+        msg = input("You: ")
+        if not msg:
+            continue
+        if msg.lower() in {"exit", "quit"}:
+            break
+
+        # Lightweight command to show how to add quickly without JSON tool call
+        if msg.lower().startswith("add hotel "):
+            name = msg[10:].strip()
+            HOTEL_DB.upsert({"name": name})
+            print(f"[Local] Added with defaults: {name}")
+            continue
+
+        # Normal LLM turn
+        state["user_text"] = msg
+        result = await Runner.run(hotel_assistant, msg, context=state)
+        print(f"Assistant: {result.final_output}")
+
+
+if __name__ == "__main__":
     try:
-        while True:
-            msg = input("You: ")
-            if not msg:
-                continue
-            if msg.lower() in {"exit", "quit"}:
-                break
-
-            # Lightweight command to show how to add quickly without JSON tool call
-            if msg.lower().startswith("add hotel "):
-                name = msg[10:].strip()
-                add_or_update_hotel(HotelRecord(name=name))
-                print(f"[Local] Added with defaults: {name}")
-                continue
-
-            # Normal LLM turn
-            resp = runner.run(msg)
-            print(f"Assistant: {resp.output_text}")
-
-    except KeyboardInterrupt:
+        asyncio.run(main())
+    except (KeyboardInterrupt, EOFError):
         pass
@@ -0,0 +1,214 @@
+import heapq
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from dynamic_assign.catalogue import HotelCatalogue
+from metrics.metrics import metrics
+
+# ----------------------------
+# Search indexes over HotelCatalogue
+# ----------------------------
+#   amenities -> one bitmask per hotel ("Free Wi-Fi", "Wi‑Fi" and "wifi" share a bit)
+#   city      -> rows per city, city = last comma part of the address
+#   capacity  -> public capacity (total - blocked) kept sorted with its rows
+# All three are updated from the catalogue's upsert hook, so add_or_update_hotel
+# never triggers a rebuild. A query walks whichever candidate list is smaller
+# and stops at ``limit`` when the order allows it.
+
+_AMENITY_ALIASES = {
+    "swimmingpool": "pool",
+    "internet": "wifi",
+    "wireless": "wifi",
+    "gymnasium": "gym",
+    "fitnesscenter": "gym",
+    "breakfastincluded": "breakfast",
+}
+NO_CAPACITY = -1
+SORTS = ("capacity", "capacity_asc", "name")
+
+
+def amenity_tag(text: str) -> str:
+    tag = re.sub(r"[^a-z0-9]", "", text.lower())
+    if tag.startswith("free") and len(tag) > 4:
+        tag = tag[4:]
+    return _AMENITY_ALIASES.get(tag, tag)
+
+
+def city_of(address: Optional[str]) -> str:
+    if not address:
+        return ""
+    return " ".join(address.rsplit(",", 1)[-1].lower().split())
+
+
+class HotelIndex:
+    def __init__(self, catalogue: HotelCatalogue):
+        self.catalogue = catalogue
+        self._bits: Dict[str, int] = {}
+        self._masks: List[int] = []
+        self._city: List[str] = []
+        self._by_city: Dict[str, Set[int]] = {}
+        self._capacity = array("i")
+        # (capacity, row) sorted by capacity, as two parallel arrays
+        self._sorted_cap = array("i")
+        self._sorted_row = array("I")
+        rows = range(len(catalogue))
+        for row in rows:
+            self._append(row)
+        order = sorted(rows, key=self._capacity.__getitem__)
+        self._sorted_cap = array("i", (self._capacity[r] for r in order))
+        self._sorted_row = array("I", order)
+        catalogue.subscribe(self._on_upsert)
+
+    # --- maintenance ---
+
+    def _bit(self, tag: str, create: bool = True) -> int:
+        bit = self._bits.get(tag)
+        if bit is None:
+            if not create:
+                return 0
+            bit = self._bits[tag] = 1 << len(self._bits)
+        return bit
+
+    def _row_values(self, row: int):
+        mask = 0
+        for aid in self.catalogue.amenity_ids_at(row):
+            mask |= self._bit(amenity_tag(self.catalogue.amenity_vocab[aid]))
+        cap = self.catalogue.public_capacity_at(row)
+        return mask, sys.intern(city_of(self.catalogue.str_at("address", row))), NO_CAPACITY if cap is None else cap
+
+    def _append(self, row: int) -> None:
+        mask, city, cap = self._row_values(row)
+        self._masks.append(mask)
+        self._city.append(city)
+        self._by_city.setdefault(city, set()).add(row)
+        self._capacity.append(cap)
+
+    def _on_upsert(self, row: int, old: Optional[Dict[str, Any]]) -> None:
+        if row == len(self._masks):
+            self._append(row)
+            cap = self._capacity[row]
+            pos = bisect_right(self._sorted_cap, cap)
+            self._sorted_cap.insert(pos, cap)
+            self._sorted_row.insert(pos, row)
+            return
+
+        mask, city, cap = self._row_values(row)
+        self._masks[row] = mask
+        if city != self._city[row]:
+            self._by_city[self._city[row]].discard(row)
+            self._by_city.setdefault(city, set()).add(row)
+            self._city[row] = city
+        old_cap = self._capacity[row]
+        if cap != old_cap:
+            lo, hi = bisect_left(self._sorted_cap, old_cap), bisect_right(self._sorted_cap, old_cap)
+            pos = lo + self._sorted_row[lo:hi].index(row)
+            del self._sorted_cap[pos]
+            del self._sorted_row[pos]
+            pos = bisect_right(self._sorted_cap, cap)
+            self._sorted_cap.insert(pos, cap)
+            self._sorted_row.insert(pos, row)
+            self._capacity[row] = cap
+
+    # --- queries ---
+
+    def search(
+        self,
+        city: Optional[str] = None,
+        amenities: Iterable[str] = (),
+        min_capacity: Optional[int] = None,
+        max_capacity: Optional[int] = None,
+        match_all_amenities: bool = True,
+        sort_by: str = "capacity",
+        limit: int = 10,
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        if sort_by not in SORTS:
+            raise ValueError(f"sort_by must be one of {SORTS}")
+        tags = [amenity_tag(a) for a in amenities if a and a.strip()]
+        need = 0
+        for tag in tags:
+            bit = self._bit(tag, create=False)
+            if not bit and match_all_amenities:
+                return self._result([], False, started)  # nobody has it
+            need |= bit
+        if tags and not need:
+            return self._result([], False, started)
+
+        city_rows: Optional[Set[int]] = None
+        if city:
+            city_rows = self._by_city.get(city_of(city), set())
+
+        has_cap_filter = min_capacity is not None or max_capacity is not None
+        if has_cap_filter:
+            # unknown capacity (-1) always falls below the range
+            lo = bisect_left(self._sorted_cap, max(min_capacity or 0, 0))
+            hi = bisect_right(self._sorted_cap, max_capacity) if max_capacity is not None else len(self._sorted_cap)
+        else:
+            lo, hi = 0, len(self._sorted_cap)
+
+        def matches(row: int) -> bool:
+            mask = self._masks[row]
+            if match_all_amenities:
+                return mask & need == need
+            return not need or bool(mask & need)
+
+        def in_range(row: int) -> bool:
+            if not has_cap_filter:
+                return True
+            c = self._capacity[row]
+            return c != NO_CAPACITY and c >= (min_capacity or 0) and (max_capacity is None or c <= max_capacity)
+
+        ranked_by_overlap = need and not match_all_amenities
+        if sort_by == "name" or ranked_by_overlap:
+            # full filter, then top limit + 1 by the requested order
+            source = city_rows if city_rows is not None and len(city_rows) < hi - lo else self._sorted_row[lo:hi]
+            rows = [r for r in source if matches(r) and in_range(r) and (city_rows is None or r in city_rows)]
+            rows = self._top(rows, sort_by, need if ranked_by_overlap else 0, limit + 1)
+            return self._result(rows[:limit], len(rows) > limit, started)
+
+        if city_rows is not None and len(city_rows) * 8 < hi - lo:
+            # rare city: its own rows are the cheaper candidate list
+            rows = [r for r in city_rows if matches(r) and in_range(r)]
+            rows = self._top(rows, sort_by, 0, limit + 1)
+            return self._result(rows[:limit], len(rows) > limit, started)
+
+        # capacity order: walk the sorted column and stop once limit + 1 rows matched
+        walk = range(hi - 1, lo - 1, -1) if sort_by == "capacity" else range(lo, hi)
+        picked: List[int] = []
+        for i in walk:
+            r = self._sorted_row[i]
+            if (city_rows is None or r in city_rows) and matches(r):
+                picked.append(r)
+                if len(picked) > limit:
+                    break
+        return self._result(picked[:limit], len(picked) > limit, started)
+
+    def _top(self, rows: List[int], sort_by: str, overlap_mask: int, n: int) -> List[int]:
+        cap = self._capacity
+        if sort_by == "name":
+            key = lambda r: self.catalogue.name_at(r).lower()
+        elif sort_by == "capacity_asc":
+            key = lambda r: cap[r]
+        else:
+            key = lambda r: -cap[r]
+        if overlap_mask:
+            return heapq.nsmallest(n, rows, key=lambda r: (-bin(self._masks[r] & overlap_mask).count("1"), key(r)))
+        return heapq.nsmallest(n, rows, key=key)
+
+    def _result(self, rows: List[int], more: bool, started: float) -> Dict[str, Any]:
+        cat = self.catalogue
+        results = [
+            {
+                "name": cat.name_at(r),
+                "city": self._city[r].title() or None,
+                "public_capacity": cat.public_capacity_at(r),
+                "amenities": [cat.amenity_vocab[a] for a in cat.amenity_ids_at(r)],
+            }
+            for r in rows
+        ]
+        metrics.observe("hotel_search_s", time.perf_counter() - started)
+        return {"results": results, "more": more}
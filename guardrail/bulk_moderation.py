@@ -0,0 +1,165 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import itertools
+import json
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy is the "fast" extra: pip install "multi-task[fast]"
+    np = None
+
+from guardrail.word_lists import NEGATIVE_MARKERS, ORDER_KEYWORDS, SUPPORT_OFFENSIVE_WORDS
+
+# ----------------------------
+# Bulk moderation
+# ----------------------------
+# Re-moderating transcripts after a word-list change, without calling
+# language_guardrail() once per string:
+#
+#   result = moderate(messages)            # list / numpy array of str
+#   result["offensive"]                    # bool column
+#   result["offensive_score"]              # how many distinct list terms matched
+#   for chunk in moderate_iter(lines): ... # any iterator, fixed-size chunks
+#
+# Same semantics as the live guards (lowercase substring match), but each
+# term is one vectorised numpy.strings.find over the whole column. Columns
+# come back as plain numpy arrays, so pyarrow.table(result.columns) works
+# as-is. Without numpy the same columns are built as Python lists.
+
+DEFAULT_LEXICON: Dict[str, Sequence[str]] = {
+    "offensive": SUPPORT_OFFENSIVE_WORDS,  # transcripts are support bot conversations
+    "negative": NEGATIVE_MARKERS,
+    "order_intent": ORDER_KEYWORDS,
+}
+
+
+class ModerationResult:
+    def __init__(self, columns: Dict[str, Any]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, name: str) -> Any:
+        return self.columns[name]
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            name: int(col.sum()) if hasattr(col, "sum") else sum(col)
+            for name, col in self.columns.items()
+            if not name.endswith("_score")
+        }
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Row dicts (for JSONL output); prefer the columns for anything large."""
+        names = list(self.columns)
+        for values in zip(*(self.columns[n] for n in names)):
+            yield {n: (v.item() if hasattr(v, "item") else v) for n, v in zip(names, values)}
+
+
+def _as_array(messages: Any) -> "np.ndarray":
+    if isinstance(messages, np.ndarray) and messages.dtype.kind == "U":
+        return messages
+    return np.array(["" if m is None else str(m) for m in messages], dtype=str)
+
+
+def _scan_numpy(messages: Any, lexicon: Dict[str, Sequence[str]]) -> Dict[str, Any]:
+    text = np.strings.lower(_as_array(messages))
+    columns: Dict[str, Any] = {}
+    for name, terms in lexicon.items():
+        hits = np.zeros(text.shape[0], dtype=np.int16)
+        for term in dict.fromkeys(t.lower() for t in terms):
+            hits += np.strings.find(text, term) >= 0
+        columns[name] = hits > 0
+        columns[f"{name}_score"] = hits
+    return columns
+
+
+def _scan_python(messages: Iterable[Any], lexicon: Dict[str, Sequence[str]]) -> Dict[str, Any]:
+    text = [("" if m is None else str(m)).lower() for m in messages]
+    columns: Dict[str, Any] = {}
+    for name, terms in lexicon.items():
+        terms = list(dict.fromkeys(t.lower() for t in terms))
+        scores = [sum(1 for t in terms if t in s) for s in text]
+        columns[name] = [n > 0 for n in scores]
+        columns[f"{name}_score"] = scores
+    return columns
+
+
+def moderate(messages: Any, lexicon: Optional[Dict[str, Sequence[str]]] = None) -> ModerationResult:
+    """Flags and scores for a list / array of messages, one column per lexicon entry."""
+    lexicon = lexicon or DEFAULT_LEXICON
+    if np is None:
+        return ModerationResult(_scan_python(messages, lexicon))
+    return ModerationResult(_scan_numpy(messages, lexicon))
+
+
+def moderate_iter(
+    messages: Iterable[Any],
+    chunk_size: int = 100_000,
+    lexicon: Optional[Dict[str, Sequence[str]]] = None,
+) -> Iterator[ModerationResult]:
+    """moderate() over an arbitrarily long iterator, ``chunk_size`` messages at a time."""
+    it = iter(messages)
+    while True:
+        chunk: List[Any] = list(itertools.islice(it, chunk_size))
+        if not chunk:
+            return
+        yield moderate(chunk, lexicon)
+
+
+# ----------------------------
+# CLI: python guardrail/bulk_moderation.py transcripts.jsonl --out flags.jsonl
+# ----------------------------
+def _read_messages(path: str, field: Optional[str]) -> Iterator[str]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if field is None:
+                yield line
+                continue
+            try:
+                yield str(json.loads(line).get(field) or "")
+            except (json.JSONDecodeError, AttributeError):
+                yield ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-moderate stored messages with the current word lists")
+    parser.add_argument("input", help="one message per line, or JSONL with --field")
+    parser.add_argument("--field", help="JSON field holding the message text (e.g. text)")
+    parser.add_argument("--out", help="write one JSON row of flags/scores per input line")
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    args = parser.parse_args()
+
+    totals: Dict[str, int] = {}
+    count = 0
+    started = time.perf_counter()
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    try:
+        for result in moderate_iter(_read_messages(args.input, args.field), args.chunk_size):
+            count += len(result)
+            for name, n in result.summary().items():
+                totals[name] = totals.get(name, 0) + n
+            if out:
+                out.writelines(json.dumps(row) + "\n" for row in result.rows())
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "messages": count,
+        "flagged": totals,
+        "seconds": round(elapsed, 2),
+        "messages_per_minute": int(count / elapsed * 60) if elapsed else None,
+        "backend": "numpy" if np is not None else "python",
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
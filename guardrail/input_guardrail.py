@@ -3,77 +3,57 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
-from typing import Any
+from typing import Optional
 
 from agents import (
     Agent,
-    GuardrailFunctionOutput,
     InputGuardrailTripwireTriggered,
     OutputGuardrailTripwireTriggered,
-    RunContextWrapper,
     Runner,
-    
-    TResponseInputItem,
-    input_guardrail,
-    output_guardrail,
     set_tracing_disabled,
 )
 
 import asyncio
-from pydantic import BaseModel
 
 from config.config import model
+from guardrail.pipeline import LOCAL, MODEL, Guard, GuardrailPipeline
+from guardrail.policy_classifier import Policy, PolicyClassifier, enabled_from_env
+from guardrail.word_lists import MATH_OFFENSIVE_WORDS
+
+set_tracing_disabled(True)  # Disable tracing for guardrails
+
+# Ek hi classifier call har check ke saare policies ka jawab deta hai (input aur output dono isi ko use karte hain).
+# Its model comes from the "guardrail" label's tier: high limiter priority, and hedged so one
+# slow classification doesn't set the p99 of the whole run
+policy_classifier = PolicyClassifier(enabled=enabled_from_env(), name="math", label="guardrail", priority="guardrail")
+INPUT_POLICIES = Policy.MATH_TOPIC | Policy.OFFENSIVE
+OUTPUT_POLICIES = Policy.POLITICAL | Policy.OFFENSIVE
 
 
 # ===================== INPUT GUARDRAIL =====================
-class MathOutPut(BaseModel):
-    is_math: bool
-    reason: str
-set_tracing_disabled(True)  # Disable tracing for guardrails
 
-@input_guardrail
-async def check_input(
-    ctx: RunContextWrapper[Any], agent: Agent[Any], input_data: str | list[TResponseInputItem]
-) -> GuardrailFunctionOutput:
-    input_agent = Agent(
-        "InputGuardrailAgent",
-        instructions="Check if the user input is related to mathematics only.",
-        model=model,
-        output_type=MathOutPut,
-          # Ensure the model is set for the input agent
-    )
-    result = await Runner.run(input_agent, input_data, context=ctx.context)
-    final_output = result.final_output
-
-    return GuardrailFunctionOutput(
-        output_info=final_output, tripwire_triggered=not final_output.is_math
-    )
+
+def offensive_language(text: str) -> Optional[str]:
+    text = text.lower()
+    if any(word in text for word in MATH_OFFENSIVE_WORDS):
+        return "Please keep the conversation respectful."
+    return None
+
+
+# Word list pehle (microseconds), LLM classifier sirf un messages par jo us se guzar jayen.
+# Classifier fail ya timeout ho to message block (model guards fail closed): unchecked math agent tak nahi jata.
+input_guardrails = GuardrailPipeline(
+    [
+        Guard("offensive_language", offensive_language, cost=LOCAL),
+        Guard("policies", policy_classifier.input_check(INPUT_POLICIES), cost=MODEL, depends_on=["offensive_language"]),
+    ],
+    name="math_input",
+)
+check_input = input_guardrails.as_input_guardrail()
 
 
 # ===================== OUTPUT GUARDRAIL =====================
-class PoliticalOutput(BaseModel):
-    is_political: bool
-    reason: str
-
-@output_guardrail
-async def check_output(
-    ctx: RunContextWrapper[Any], agent: Agent[Any], output_data: str
-) -> GuardrailFunctionOutput:
-    output_agent = Agent(
-        "OutputGuardrailAgent",
-        instructions=(
-            "Check if the output contains any political topics, "
-            "political opinions, or references to political figures."
-        ),
-        model=model,
-        output_type=PoliticalOutput,
-    )
-    result = await Runner.run(output_agent, output_data, context=ctx.context)
-    final_output = result.final_output
-
-    return GuardrailFunctionOutput(
-        output_info=final_output, tripwire_triggered=final_output.is_political
-    )
+check_output = policy_classifier.as_output_guardrail(OUTPUT_POLICIES, name="check_output")
 
 
 # ===================== AGENTS =====================
@@ -102,10 +82,12 @@ async def main():
         result = await Runner.run(math_agent, msg)
         print(f"\nFinal Output: {result.final_output}")
 
-    except InputGuardrailTripwireTriggered:
-        print("Error: Invalid prompt (Not math related).")
+    except InputGuardrailTripwireTriggered as e:
+        print(f"Error: Invalid prompt ({e.guardrail_result.output.output_info.message}).")
     except OutputGuardrailTripwireTriggered:
         print("Error: Output contains political content.")
 
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
+
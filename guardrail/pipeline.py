@@ -0,0 +1,228 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from metrics.metrics import metrics
+from serving.deadline import StageTimeout, stage
+
+# ----------------------------
+# Guardrail pipeline
+# ----------------------------
+# Each Guard says what it costs and which guards must pass before it runs.
+#   1) local guards (cost < MODEL): cheapest first, inline, no tasks; the
+#      first trip rejects the message before anything expensive starts
+#   2) expensive guards (LLM classifiers): started together as soon as their
+#      dependencies passed; the first trip cancels the rest
+# So a blocked message costs a few string checks, and an allowed one waits
+# only for the slowest expensive guard it actually needs.
+#
+# A check takes the message text and returns None (pass) or the reply to
+# send back (block). Sync and async checks both work.
+#
+# A guard that raises is handled by its fail_closed flag: model-backed guards
+# (cost >= MODEL) fail closed by default -- the message is blocked with
+# FAIL_CLOSED_REPLY -- and local ones fail open (skipped, counted as an
+# error). Pass fail_closed= to a Guard, or to the pipeline for every guard,
+# to choose otherwise. Under a message deadline (serving/deadline.py) the
+# expensive guards run as stage "guardrails"; running out of budget blocks
+# the message if any expensive guard is fail-closed.
+
+LOCAL = 1.0    # word lists, regexes
+MODEL = 100.0  # anything that calls a model
+
+FAIL_CLOSED_REPLY = "Is waqt aapka message check nahi ho saka. Thori der baad dobara koshish karein."
+
+Check = Callable[[str], Union[Optional[str], Awaitable[Optional[str]]]]
+
+
+class Guard:
+    def __init__(
+        self,
+        name: str,
+        check: Check,
+        cost: float = LOCAL,
+        depends_on: Sequence[str] = (),
+        fail_closed: Optional[bool] = None,
+    ):
+        """``fail_closed``: block when the check raises (default: only for model-backed guards)."""
+        self.name = name
+        self.check = check
+        self.cost = cost
+        self.depends_on = tuple(depends_on)
+        self.fail_closed = cost >= MODEL if fail_closed is None else fail_closed
+        self.is_async = inspect.iscoroutinefunction(check)
+        self.calls = 0
+        self.trips = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cost": self.cost,
+            "fail_closed": self.fail_closed,
+            "calls": self.calls,
+            "trips": self.trips,
+            "errors": self.errors,
+            "trip_rate": round(self.trips / self.calls, 4) if self.calls else 0.0,
+            "avg_ms": round(self.seconds / self.calls * 1000, 4) if self.calls else 0.0,
+        }
+
+
+class Verdict:
+    __slots__ = ("allowed", "guard", "message", "checked")
+
+    def __init__(self, allowed: bool, guard: Optional[str] = None, message: Optional[str] = None, checked: int = 0):
+        self.allowed = allowed
+        self.guard = guard
+        self.message = message
+        self.checked = checked
+
+    def __bool__(self) -> bool:
+        return self.allowed
+
+    def __repr__(self) -> str:
+        return f"Verdict(allowed={self.allowed}, guard={self.guard!r})"
+
+
+class GuardrailPipeline:
+    def __init__(self, guards: Iterable[Guard], name: str = "default", fail_closed: Optional[bool] = None):
+        """``fail_closed``: overrides every guard's own setting (None: each guard decides)."""
+        self.name = name
+        self.fail_closed = fail_closed
+        self.guards: Dict[str, Guard] = {}
+        for g in guards:
+            if g.name in self.guards:
+                raise ValueError(f"duplicate guard '{g.name}'")
+            self.guards[g.name] = g
+        for g in self.guards.values():
+            missing = [d for d in g.depends_on if d not in self.guards]
+            if missing:
+                raise ValueError(f"guard '{g.name}' depends on unknown guard(s) {missing}")
+        self._local, self._expensive = self._plan()
+        metrics.register_collector(f"guardrails:{name}", self.stats)
+
+    def _plan(self):
+        """Local guards in dependency-then-cost order; expensive guards keep their deps for run time."""
+        ordered: List[Guard] = []
+        done: set = set()
+        pending = sorted(self.guards.values(), key=lambda g: g.cost)
+        while pending:
+            ready = [g for g in pending if all(d in done for d in g.depends_on)]
+            if not ready:
+                raise ValueError(f"guard dependency cycle among {[g.name for g in pending]}")
+            g = ready[0]
+            ordered.append(g)
+            done.add(g.name)
+            pending.remove(g)
+        local = [g for g in ordered if g.cost < MODEL and not any(self.guards[d].cost >= MODEL for d in g.depends_on)]
+        expensive = [g for g in ordered if g not in local]
+        return local, expensive
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: g.stats() for name, g in self.guards.items()}
+
+    def _closed(self, guard: Guard) -> bool:
+        return guard.fail_closed if self.fail_closed is None else self.fail_closed
+
+    def _record(self, guard: Guard, started: float, result: Optional[str], error: bool = False) -> None:
+        elapsed = time.perf_counter() - started
+        guard.calls += 1
+        guard.seconds += elapsed
+        if error:
+            guard.errors += 1
+            outcome = "error"
+        elif result:
+            guard.trips += 1
+            outcome = "trip"
+        else:
+            outcome = "pass"
+        metrics.observe("guard_latency_s", elapsed, guard=guard.name)
+        metrics.incr("guard_checks_total", guard=guard.name, result=outcome)
+
+    async def _call(self, guard: Guard, text: str) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            result = await guard.check(text) if guard.is_async else guard.check(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record(guard, started, None, error=True)
+            if self._closed(guard):
+                return FAIL_CLOSED_REPLY
+            return None
+        self._record(guard, started, result)
+        return result
+
+    async def run(self, text: str) -> Verdict:
+        checked = 0
+        for guard in self._local:
+            checked += 1
+            result = await self._call(guard, text)
+            if result:
+                return self._blocked(guard, result, checked)
+        if not self._expensive:
+            return Verdict(True, checked=checked)
+        try:
+            async with stage("guardrails"):
+                return await self._run_expensive(text, checked)
+        except StageTimeout:
+            metrics.incr("guardrail_timeouts_total", pipeline=self.name)
+            if any(self._closed(g) for g in self._expensive):
+                return Verdict(False, guard="timeout", message=FAIL_CLOSED_REPLY, checked=checked)
+            return Verdict(True, checked=checked)
+
+    async def _run_expensive(self, text: str, checked: int) -> Verdict:
+        passed = {g.name for g in self._local}
+        waiting = list(self._expensive)
+        running: Dict[asyncio.Task, Guard] = {}
+        try:
+            while waiting or running:
+                for guard in [g for g in waiting if all(d in passed for d in g.depends_on)]:
+                    waiting.remove(guard)
+                    running[asyncio.ensure_future(self._call(guard, text))] = guard
+                if not running:
+                    raise RuntimeError("guardrail pipeline stalled")  # unreachable: _plan rejects cycles
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    guard = running.pop(task)
+                    checked += 1
+                    result = task.result()
+                    if result:
+                        return self._blocked(guard, result, checked)
+                    passed.add(guard.name)
+            return Verdict(True, checked=checked)
+        finally:
+            for task in running:
+                task.cancel()
+
+    def _blocked(self, guard: Guard, message: str, checked: int) -> Verdict:
+        metrics.incr("guardrail_blocked_total", pipeline=self.name, guard=guard.name)
+        return Verdict(False, guard=guard.name, message=message, checked=checked)
+
+    def as_input_guardrail(self):
+        """Whole pipeline as one SDK input guardrail (tripwire on block, verdict in output_info)."""
+        from agents import GuardrailFunctionOutput, input_guardrail
+
+        @input_guardrail(name=f"pipeline:{self.name}")
+        async def pipeline_guardrail(ctx, agent, input_data) -> GuardrailFunctionOutput:
+            verdict = await self.run(_user_text(input_data))
+            return GuardrailFunctionOutput(output_info=verdict, tripwire_triggered=not verdict.allowed)
+
+        return pipeline_guardrail
+
+
+def _user_text(input_data: Any) -> str:
+    """Plain text of the user turns in an SDK input (a string or a list of input items)."""
+    if isinstance(input_data, str):
+        return input_data
+    parts: List[str] = []
+    for item in input_data:
+        if not isinstance(item, dict) or item.get("role") != "user":
+            continue
+        content = item.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if isinstance(p, dict))
+    return " ".join(parts)
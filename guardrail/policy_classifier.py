@@ -0,0 +1,248 @@
+import asyncio
+import enum
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from agents import Agent, GuardrailFunctionOutput, Runner, output_guardrail
+from config.model_tiers import run_with_escalation
+from metrics.metrics import metrics
+from metrics.usage import usage_scope
+
+# ----------------------------
+# Multi-label policy classifier
+# ----------------------------
+# One structured-output call answers every enabled policy at once, instead of
+# one classifier agent per policy:
+#
+#   classifier = PolicyClassifier(guardrail_model)
+#   c = await classifier.classify(text, Policy.MATH_TOPIC | Policy.OFFENSIVE)
+#   c.message   # None = allowed, else the reply for the first violated policy
+#
+# Adding a policy = one more field in PolicyVerdicts + one _SPECS entry; the
+# number of guardrail round-trips per check stays one. Input and output checks
+# share the classifier (same agents per mask, same result cache, and identical
+# concurrent texts share a single in-flight call). The enabled mask turns
+# policies off globally: GUARDRAIL_POLICIES=math_topic,political.
+# With ``label`` set, calls start on that label's model tier and move one tier
+# up when the structured output fails validation (config/model_tiers.py); the
+# model then comes from model_for(label, ...), so pass ``model`` or ``label``,
+# not both.
+
+
+class Policy(enum.IntFlag):
+    MATH_TOPIC = 1
+    POLITICAL = 2
+    OFFENSIVE = 4
+    NEGATIVE_SENTIMENT = 8
+
+
+ALL_POLICIES = Policy.MATH_TOPIC | Policy.POLITICAL | Policy.OFFENSIVE | Policy.NEGATIVE_SENTIMENT
+
+
+class PolicyVerdicts(BaseModel):
+    is_math: bool
+    is_political: bool
+    is_offensive: bool
+    is_negative: bool
+    reason: str
+
+
+# policy -> (field, question for the prompt, value that violates, reply when violated)
+_SPECS: Dict[Policy, Tuple[str, str, bool, str]] = {
+    Policy.MATH_TOPIC: (
+        "is_math", "Is the text about mathematics?", False, "Not math related"),
+    Policy.POLITICAL: (
+        "is_political", "Does the text contain political topics, political opinions or references to political figures?",
+        True, "Contains political content"),
+    Policy.OFFENSIVE: (
+        "is_offensive", "Is the text insulting, abusive or offensive?", True, "Please keep the conversation respectful."),
+    Policy.NEGATIVE_SENTIMENT: (
+        "is_negative", "Is the writer angry, frustrated or unhappy?", True, "Sorry to hear that. Let me connect you to a human agent."),
+}
+
+
+def parse_mask(text: Optional[str], default: Policy = ALL_POLICIES) -> Policy:
+    """``"math_topic,political"`` -> Policy.MATH_TOPIC | Policy.POLITICAL (empty/None -> ``default``)."""
+    if not text or not text.strip():
+        return default
+    mask = Policy(0)
+    for name in text.split(","):
+        name = name.strip().upper()
+        if name not in Policy.__members__:
+            raise ValueError(f"unknown guardrail policy '{name.lower()}'; known: {', '.join(p.name.lower() for p in Policy)}")
+        mask |= Policy[name]
+    return mask
+
+
+class Classification:
+    __slots__ = ("verdicts", "violations", "message")
+
+    def __init__(self, verdicts: Optional[PolicyVerdicts], violations: List[Policy], message: Optional[str]):
+        self.verdicts = verdicts
+        self.violations = violations
+        self.message = message
+
+    def __bool__(self) -> bool:
+        """True when allowed."""
+        return not self.violations
+
+    def __repr__(self) -> str:
+        return f"Classification(violations={[p.name for p in self.violations]})"
+
+
+class PolicyClassifier:
+    def __init__(
+        self,
+        model: Any = None,
+        enabled: Policy = ALL_POLICIES,
+        cache_size: int = 1024,
+        name: str = "default",
+        label: Optional[str] = None,
+        priority: str = "default",
+    ):
+        if (model is None) == (label is None):
+            raise ValueError("PolicyClassifier needs a model or a tier label (label picks the model per tier), not both")
+        self.name = name
+        self.model = model
+        self.label = label
+        self.priority = priority
+        self.enabled = enabled
+        self.cache_size = cache_size
+        self._agents: Dict[int, Agent] = {}
+        self._cache: "OrderedDict[Tuple[int, str], Classification]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, str], "asyncio.Future[Classification]"] = {}
+        self.calls = 0
+        self.cache_hits = 0
+        self.shared = 0
+        metrics.register_collector(f"policy_classifier:{name}", self.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": [p.name.lower() for p in Policy if p in self.enabled],
+            "model_calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "shared_inflight": self.shared,
+        }
+
+    def agent_for(self, mask: Policy) -> Agent:
+        """One classifier agent per mask; the prompt asks only about the policies in it."""
+        agent = self._agents.get(int(mask))
+        if agent is None:
+            lines = []
+            for policy, (field, question, _, _) in _SPECS.items():
+                if policy in mask:
+                    lines.append(f"- {field}: {question}")
+                else:
+                    lines.append(f"- {field}: not checked, always false")
+            agent = Agent(
+                "PolicyClassifierAgent",
+                instructions=(
+                    "Classify the text below against each policy and fill every field.\n"
+                    + "\n".join(lines)
+                    + "\nGive one short reason covering the fields that are true."
+                ),
+                model=self.model,
+                output_type=PolicyVerdicts,
+            )
+            self._agents[int(mask)] = agent
+        return agent
+
+    def _judge(self, verdicts: PolicyVerdicts, mask: Policy) -> Classification:
+        violations: List[Policy] = []
+        message = None
+        for policy, (field, _, violating, reply) in _SPECS.items():
+            if policy in mask and getattr(verdicts, field) == violating:
+                violations.append(policy)
+                metrics.incr("policy_violations_total", policy=policy.name.lower())
+                if message is None:
+                    message = f"{reply}: {verdicts.reason}" if policy is Policy.MATH_TOPIC else reply
+        return Classification(verdicts, violations, message)
+
+    async def _call_model(self, text: str, mask: Policy, context: Any) -> Classification:
+        self.calls += 1
+        metrics.incr("policy_classifier_calls_total")
+        started = time.perf_counter()
+        try:
+            with usage_scope(guardrail=self.name):
+                if self.label:
+                    result = await run_with_escalation(
+                        self.agent_for(mask), text, label=self.label, priority=self.priority, hedge=True, context=context
+                    )
+                else:
+                    result = await Runner.run(self.agent_for(mask), text, context=context)
+        finally:
+            metrics.observe("policy_classifier_s", time.perf_counter() - started)
+        return self._judge(result.final_output, mask)
+
+    async def classify(self, text: str, mask: Optional[Policy] = None, context: Any = None) -> Classification:
+        """Every policy in ``mask`` (default: all enabled) answered by at most one model call."""
+        mask = (self.enabled if mask is None else mask) & self.enabled
+        if not mask:
+            return Classification(None, [], None)
+        key = (int(mask), text)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            metrics.incr("policy_classifier_cache_hits_total")
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.shared += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # we were cancelled ourselves
+                return await self.classify(text, mask, context)  # the owner was: ask again
+
+        future: "asyncio.Future[Classification]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            classification = await self._call_model(text, mask, context)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # don't warn when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(classification)
+        self._cache[key] = classification
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return classification
+
+    def input_check(self, mask: Policy):
+        """A GuardrailPipeline check (text -> None or reply) for ``mask``."""
+
+        async def check(text: str) -> Optional[str]:
+            return (await self.classify(text, mask)).message
+
+        return check
+
+    def as_output_guardrail(self, mask: Policy, name: str = "policy_output"):
+        """An SDK output guardrail for ``mask`` on the final output text."""
+
+        @output_guardrail(name=name)
+        async def policy_output_guardrail(ctx, agent, output_data) -> GuardrailFunctionOutput:
+            text = output_data if isinstance(output_data, str) else str(output_data)
+            classification = await self.classify(text, mask, context=ctx.context)
+            return GuardrailFunctionOutput(
+                output_info=classification.verdicts,
+                tripwire_triggered=not classification,
+            )
+
+        return policy_output_guardrail
+
+
+def enabled_from_env() -> Policy:
+    return parse_mask(os.getenv("GUARDRAIL_POLICIES"))
@@ -0,0 +1,17 @@
+# ----------------------------
+# Word lists shared by the live guards (customer_support_bot.py,
+# guardrail/input_guardrail.py, main_2.py) and bulk re-moderation
+# (guardrail/bulk_moderation.py)
+# ----------------------------
+# Matching is lowercase substring, same as the original inline lists.
+# Change a list here and re-run bulk_moderation over the transcripts.
+
+# One offensive list per surface, as the inline lists were: the support bot also
+# blocks Roman-Urdu insults, the triage bots and the math guard only English ones.
+SUPPORT_OFFENSIVE_WORDS = ("idiot", "stupid", "bkwas", "lanat", "gali", "bewaqoof")  # customer_support_bot.py
+TRIAGE_OFFENSIVE_WORDS = ("idiot", "stupid", "dumb")  # main_2.py, my_agent/two_agents.py
+MATH_OFFENSIVE_WORDS = ("idiot", "stupid", "dumb")  # guardrail/input_guardrail.py
+
+NEGATIVE_MARKERS = ("refund now", "very bad", "worst", "angry", "nonsense", "bkwas", "ghalat", "cancel karo")
+
+ORDER_KEYWORDS = ("order", "status", "tracking", "track", "order id", "meray order ka", "mera order", "id ")
@@ -1,11 +1,15 @@
 import asyncio
-import os
 import logging
-from typing import Dict, Any, Optional
+from typing import Optional
 from dotenv import load_dotenv
-from agents import Agent, ModelSettings, set_tracking_disabled, function_tool, guardrail
-from config.config import model
-from agents import AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig
+from agents import Agent, Runner, ModelSettings, set_tracing_disabled, function_tool
+from config.config import model, model_for
+from router.local_router import LocalRouter, log_triage_decision
+from guardrail.pipeline import LOCAL, Guard, GuardrailPipeline
+from guardrail.word_lists import TRIAGE_OFFENSIVE_WORDS
+from serving.coalesce import SingleFlight, coalesce_key
+from serving.deadline import StageTimeout, budgeted, message_deadline, stage
+from tools.tool_cache import tool_cache
 # Logging setup
 logging.basicConfig(
     level=logging.INFO,
@@ -16,20 +20,12 @@ logger = logging.getLogger(__name__)
 
 # Environment variables load karo
 load_dotenv()
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if not gemini_api_key:
-    raise ValueError("GEMINI_API_KEY environment mein nahi mila.")
 
-# AsyncOpenAI client aur model
+# Client aur model config/config.py se: sab agents ek hi rate limiter share karte hain
+triage_model = model_for("TriageAgent", priority="triage", hedge=True)
 
-external_client = AsyncOpenAI(
-    api_key=gemini_api_key,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
+# Local router (router/train_router.py se train hota hai); model file na ho to sab triage_agent se jata hai
+local_router = LocalRouter.load_if_exists()
 
 # Fake order database
 ORDERS_DB = {
@@ -46,9 +42,12 @@ FAQS = {
 }
 
 # Function tool for order status (error_function ke bina)
+# is_enabled SDK me (ctx, agent) leta hai; user ka text run context me hai
 @function_tool(
-    is_enabled=lambda query, **kwargs: "order" in query.lower()
+    is_enabled=lambda ctx, agent: "order" in ((ctx.context or {}).get("user_text") or "").lower()
 )
+@budgeted("tool")
+@tool_cache.cached(depends_on=lambda order_id: [f"order:{order_id}"], ttl=30.0)
 async def get_order_status(order_id: str) -> str:
     """
     Fake database se order status fetch karo.
@@ -61,11 +60,16 @@ async def get_order_status(order_id: str) -> str:
         logger.warning(f"Order ID {order_id} nahi mila.")
         return "Maaf karen, yeh order ID nahi mila. Baraye mehrbani order ID check karen."
 
+# SDK me plain-function guardrail decorator nahi hai; ye sirf marker hai
+def guardrail(fn):
+    fn._is_guardrail = True
+    return fn
+
+
 # Guardrail for offensive language
 @guardrail
 async def check_for_offensive_language(message: str):
-    bad_words = ["idiot", "stupid", "dumb"]
-    if any(word in message.lower() for word in bad_words):
+    if any(word in message.lower() for word in TRIAGE_OFFENSIVE_WORDS):
         logger.warning(f"Offensive language mila: {message}")
         return "⚠ Baraye mehrbani baat cheet ko izzat ke sath rakhen."
     return None
@@ -79,8 +83,16 @@ async def check_for_negative_sentiment(message: str):
         return "Lagta hai aap naraz hain. Main aap ko human agent se jodta hoon."
     return None
 
-# Tracking disable karo 
-set_tracking_disabled(False)
+guardrails = GuardrailPipeline(
+    [
+        Guard("offensive_language", check_for_offensive_language, cost=LOCAL),
+        Guard("negative_sentiment", check_for_negative_sentiment, cost=LOCAL),
+    ],
+    name="triage",
+)
+
+# Tracing disable karo (Gemini key OpenAI tracing par upload nahi ho sakti)
+set_tracing_disabled(True)
 
 # Bot agent with tools
 bot_agent = Agent(
@@ -92,8 +104,7 @@ bot_agent = Agent(
     ),
     tools=[get_order_status],
     model=model,
-    model_setting=ModelSettings(
-        tool_choices="required",
+    model_settings=ModelSettings(
         metadata={"agent_role": "bot", "store_id": "STORE001"}
     ),
 )
@@ -106,8 +117,7 @@ human_agent = Agent(
         "Provide a professional response and assure the customer that their issue is being addressed."
     ),
     model=model,
-    model_setting=ModelSettings(
-        tool_choices="none",
+    model_settings=ModelSettings(
         metadata={"agent_role": "human", "store_id": "STORE001"}
     ),
 )
@@ -121,25 +131,42 @@ triage_agent = Agent(
         "If the query is about orders or FAQs, send it to BotAgent. "
         "If the query is emotional, negative, or outside BotAgent’s capabilities, send it to HumanAgent."
     ),
-    model=model,
+    model=triage_model,
     handoffs=[bot_agent, human_agent],
-    model_setting=ModelSettings(
-        tool_choices="none",
+    model_settings=ModelSettings(
         metadata={"agent_role": "triage", "store_id": "STORE001"}
     ),
 )
 
-async def handle_message(user_text: str, customer_id: str) -> str:
+# Ek jaise concurrent sawal ek hi triage/agent run share karte hain; order queries personal hain (order ID tool), share nahi hoti
+triage_flight = SingleFlight("triage")
+
+
+TIMEOUT_REPLY = "Sorry, this is taking longer than expected. A human agent will follow up shortly."
+
+
+async def handle_message(user_text: str, customer_id: str, deadline: Optional[float] = None) -> str:
+    key = None if "order" in user_text.lower() else coalesce_key(user_text)
+    with message_deadline(deadline):
+        try:
+            async with stage("message"):
+                return await triage_flight.do(key, lambda: _respond(user_text, customer_id))
+        except StageTimeout as e:
+            logger.warning(f"Deadline hit in stage {e.stage} for customer {customer_id}: {user_text}")
+            return TIMEOUT_REPLY
+
+
+async def _respond(user_text: str, customer_id: str) -> str:
     """
     Main function to handle incoming messages.
-    It uses triage_agent to decide whether to handoff to bot_agent or human_agent.
+    Confident cases go straight to bot_agent / human_agent via local_router;
+    the rest use triage_agent to decide the handoff.
     """
-    # Guardrails apply karo
-    for guard in [check_for_offensive_language, check_for_negative_sentiment]:
-        guard_result = await guard(user_text)
-        if guard_result:
-            logger.info(f"Guardrail triggered for customer {customer_id}: {guard_result}")
-            return guard_result
+    # Guardrails apply karo (pipeline: sasta check pehle, pehle trip par hi ruk jata hai)
+    verdict = await guardrails.run(user_text)
+    if not verdict:
+        logger.info(f"Guardrail {verdict.guard} triggered for customer {customer_id}: {verdict.message}")
+        return verdict.message
 
     # Check FAQs directly in triage for efficiency
     for faq_key, faq_answer in FAQS.items():
@@ -147,17 +174,29 @@ async def handle_message(user_text: str, customer_id: str) -> str:
             logger.info(f"FAQ matched for query: {user_text}")
             return faq_answer
 
+    # Local router: confident hai to triage wala LLM call skip karo
+    route = local_router.route(user_text) if local_router else None
+    if route:
+        logger.info(f"LocalRouter sent customer {customer_id} to {route}: {user_text}")
+        agent = bot_agent if route == bot_agent.name else human_agent
+        async with stage("agent"):
+            result = await Runner.run(agent, user_text, context={"customer_id": customer_id, "user_text": user_text})
+        logger.info(f"Response for customer {customer_id}: {result.final_output}")
+        return result.final_output
+
     # Log query
     logger.info(f"TriageAgent processing query from customer {customer_id}: {user_text}")
 
     # Use triage_agent to process the message
-    response = await triage_agent.run(
-        input=user_text,
-        context={"customer_id": customer_id}
-    )
-
-    logger.info(f"Response for customer {customer_id}: {response}")
-    return response
+    # triage run me handoff ke baad wale agent ka jawab bhi shamil hai
+    async with stage("triage"):
+        result = await Runner.run(triage_agent, user_text, context={"customer_id": customer_id, "user_text": user_text})
+    if result.last_agent is not triage_agent:
+        # router ke liye training data
+        log_triage_decision(logger, customer_id, user_text, result.last_agent.name)
+
+    logger.info(f"Response for customer {customer_id}: {result.final_output}")
+    return result.final_output
 
 # Main function to run the bot
 async def main():
@@ -0,0 +1,338 @@
+import gc
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from metrics.metrics import metrics
+
+# ----------------------------
+# Memory telemetry for long-running processes
+# ----------------------------
+# Resident memory creeping up over days (leftover run contexts, histories,
+# logging handlers, Agents built per call) shows up here long before the OOM
+# killer does:
+#
+#   memory_monitor.start()               # server / worker processes do this
+#   memory_monitor.dump(top=20)          # or: kill -USR1 <pid>, GET /admin/memory
+#
+# Always on and cheap: RSS (current + peak), GC counts and pause times (after start())
+# (collector "memory", gauges memory_rss_bytes / memory_rss_peak_bytes).
+# Every MEMORY_INTERVAL_S the monitor thread also:
+#   * counts live objects of TRACKED_TYPES (Agent, RunResult, RunContextWrapper,
+#     sessions, ...) plus logging handlers -> memory_live_objects{type}
+#   * with tracemalloc on (MEMORY_TRACEMALLOC=<frames> or start_tracing()),
+#     diffs the heap against the previous sample and the first one, grouped
+#     by module, so steady growth points at the code that allocates it.
+# tracemalloc costs noticeable CPU and memory; turn it on while hunting a leak.
+
+MEMORY_INTERVAL_S = float(os.getenv("MEMORY_INTERVAL_S", "60"))
+MEMORY_TRACEMALLOC = int(os.getenv("MEMORY_TRACEMALLOC", "0"))  # frames per traceback, 0 = off
+MEMORY_TOP_N = int(os.getenv("MEMORY_TOP_N", "15"))
+
+# "module:Class" -> counted by exact class name and subclasses
+TRACKED_TYPES = (
+    "agents.agent:Agent",
+    "agents.result:RunResult",
+    "agents.result:RunResultStreaming",
+    "agents.run_context:RunContextWrapper",
+    "agents.memory.session:SQLiteSession",
+    "model_layer.base:ModelWrapper",
+    "asyncio:Task",
+)
+
+
+def rss_bytes() -> Tuple[int, int]:
+    """(current, peak) resident set size in bytes; current is 0 where /proc isn't available."""
+    current = 0
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    peak = 0
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak if sys.platform == "darwin" else peak * 1024  # macOS reports bytes, Linux KiB
+    except (ImportError, OSError):
+        pass
+    return current, max(current, peak)
+
+
+def _resolve_types() -> Dict[str, type]:
+    """Only types whose module is already imported; counting must not import anything."""
+    out = {}
+    for spec in TRACKED_TYPES:
+        module, name = spec.split(":")
+        mod = sys.modules.get(module)
+        cls = getattr(mod, name, None) if mod is not None else None
+        if isinstance(cls, type):
+            out[name] = cls
+    return out
+
+
+def count_live_objects() -> Dict[str, int]:
+    """One pass over the GC heap; O(tracked objects), so keep it off the hot path."""
+    types = _resolve_types()
+    counts = {name: 0 for name in types}
+    classes = tuple(types.items())
+    for obj in gc.get_objects():
+        for name, cls in classes:
+            if isinstance(obj, cls):
+                counts[name] += 1
+    manager = logging.Logger.manager
+    loggers = [logging.getLogger()] + [lg for lg in manager.loggerDict.values() if isinstance(lg, logging.Logger)]
+    counts["logging.Handler"] = sum(len(lg.handlers) for lg in loggers)
+    counts["logging.Logger"] = len(loggers)
+    return counts
+
+
+def _module_index() -> List[Tuple[str, str]]:
+    """(directory or file prefix, module name), longest first, to map allocation sites to modules."""
+    index = []
+    for name, mod in list(sys.modules.items()):
+        path = getattr(mod, "__file__", None)
+        if not path:
+            continue
+        path = os.path.abspath(path)
+        if os.path.basename(path) == "__init__.py":
+            path = os.path.dirname(path) + os.sep
+        index.append((path, name))
+    index.sort(key=lambda item: len(item[0]), reverse=True)
+    return index
+
+
+def _module_of(filename: str, index: List[Tuple[str, str]], cache: Dict[str, str]) -> str:
+    module = cache.get(filename)
+    if module is None:
+        module = filename
+        path = os.path.abspath(filename)
+        for prefix, name in index:
+            if path == prefix or (prefix.endswith(os.sep) and path.startswith(prefix)):
+                module = name
+                break
+        cache[filename] = module
+    return module
+
+
+def group_by_module(stats: List[Any], index: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """tracemalloc StatisticDiff list (key "filename") -> per-module growth, biggest first."""
+    cache: Dict[str, str] = {}
+    grouped: Dict[str, List[int]] = {}
+    for stat in stats:
+        module = _module_of(stat.traceback[0].filename, index, cache)
+        g = grouped.setdefault(module, [0, 0, 0])
+        g[0] += stat.size_diff
+        g[1] += stat.size
+        g[2] += stat.count_diff
+    rows = [{"module": m, "size_diff": d, "size": s, "count_diff": c} for m, (d, s, c) in grouped.items()]
+    rows.sort(key=lambda r: r["size_diff"], reverse=True)
+    return rows
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(n) < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GiB"
+
+
+class MemoryMonitor:
+    def __init__(self, interval: float = MEMORY_INTERVAL_S, top_n: int = MEMORY_TOP_N):
+        self.interval = interval
+        self.top_n = top_n
+        self.samples = 0
+        self.live: Dict[str, int] = {}
+        self.growth_last: List[Dict[str, Any]] = []
+        self.growth_total: List[Dict[str, Any]] = []
+        self.last_sample_s = 0.0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._gc_started = 0.0
+        self._gc_pause_total = 0.0
+        self._gc_pause_max = 0.0
+        metrics.register_collector("memory", self.stats)
+
+    # --- GC pause timing (gc.callbacks) ---
+
+    def _on_gc(self, phase: str, info: Dict[str, Any]) -> None:
+        # plain attribute updates only: a collection can start while this thread holds the
+        # metrics lock, so calling into metrics here could deadlock
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started:
+            pause = time.perf_counter() - self._gc_started
+            self._gc_pause_total += pause
+            if pause > self._gc_pause_max:
+                self._gc_pause_max = pause
+
+    # --- tracemalloc ---
+
+    def start_tracing(self, frames: int = 1) -> None:
+        """Start tracemalloc now; growth is measured from the next sample on."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        with self._lock:
+            self._baseline = self._previous = None
+
+    def stop_tracing(self) -> None:
+        tracemalloc.stop()
+        with self._lock:
+            self._baseline = self._previous = None
+            self.growth_last = []
+            self.growth_total = []
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+
+    # --- sampling ---
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one full sample now (object counts + heap diff); returns stats()."""
+        started = time.perf_counter()
+        live = count_live_objects()
+        for name, n in live.items():
+            metrics.set_gauge("memory_live_objects", n, type=name)
+
+        growth_last: List[Dict[str, Any]] = []
+        growth_total: List[Dict[str, Any]] = []
+        if tracemalloc.is_tracing():
+            snap = self._snapshot()
+            index = _module_index()
+            with self._lock:
+                previous, baseline = self._previous, self._baseline
+                self._previous = snap
+                if baseline is None:
+                    self._baseline = snap
+            if previous is not None:
+                growth_last = group_by_module(snap.compare_to(previous, "filename"), index)[: self.top_n]
+            if baseline is not None:
+                growth_total = group_by_module(snap.compare_to(baseline, "filename"), index)[: self.top_n]
+            current, peak = tracemalloc.get_traced_memory()
+            metrics.set_gauge("memory_traced_bytes", current)
+            metrics.set_gauge("memory_traced_peak_bytes", peak)
+
+        with self._lock:
+            self.live = live
+            self.growth_last = growth_last
+            self.growth_total = growth_total
+            self.samples += 1
+            self.last_sample_s = round(time.perf_counter() - started, 4)
+        metrics.observe("memory_sample_s", time.perf_counter() - started)
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        current, peak = rss_bytes()
+        metrics.set_gauge("memory_rss_bytes", current)
+        metrics.set_gauge("memory_rss_peak_bytes", peak)
+        with self._lock:
+            return {
+                "rss_bytes": current,
+                "rss_peak_bytes": peak,
+                "gc": {
+                    "counts": list(gc.get_count()),
+                    "collections": [g["collections"] for g in gc.get_stats()],
+                    "uncollectable": [g["uncollectable"] for g in gc.get_stats()],
+                    "garbage": len(gc.garbage),
+                    "pause_total_s": round(self._gc_pause_total, 4),
+                    "pause_max_s": round(self._gc_pause_max, 4),
+                },
+                "tracemalloc": tracemalloc.is_tracing(),
+                "live_objects": dict(self.live),
+                "growth_since_last": list(self.growth_last),
+                "growth_since_start": list(self.growth_total),
+                "samples": self.samples,
+                "last_sample_s": self.last_sample_s,
+            }
+
+    def top_allocators(self, limit: int = 20, group_by: str = "lineno") -> List[Dict[str, Any]]:
+        """Biggest live allocation sites right now ([] when tracemalloc is off)."""
+        if not tracemalloc.is_tracing():
+            return []
+        rows = []
+        for stat in self._snapshot().statistics(group_by)[:limit]:
+            frame = stat.traceback[0]
+            rows.append({"site": f"{frame.filename}:{frame.lineno}", "size": stat.size, "count": stat.count})
+        return rows
+
+    def dump(self, top: int = 20, file: Optional[TextIO] = None) -> None:
+        """Human-readable report: RSS, GC, live objects, module growth and top allocators."""
+        out = file or sys.stderr
+        s = self.sample()
+        print(f"== memory pid={os.getpid()} rss={_fmt_bytes(s['rss_bytes'])} peak={_fmt_bytes(s['rss_peak_bytes'])}", file=out)
+        g = s["gc"]
+        print(f"gc counts={g['counts']} collections={g['collections']} garbage={g['garbage']} pause_total={g['pause_total_s']}s", file=out)
+        print("live objects:", ", ".join(f"{k}={v}" for k, v in sorted(s["live_objects"].items())), file=out)
+        if not s["tracemalloc"]:
+            print("tracemalloc off (MEMORY_TRACEMALLOC=<frames> or start_tracing() for allocation sites)", file=out)
+        else:
+            for title, rows in (("growth since start", s["growth_since_start"]), ("growth since last sample", s["growth_since_last"])):
+                print(f"-- {title} (by module)", file=out)
+                for r in rows[:top]:
+                    print(f"  {_fmt_bytes(r['size_diff']):>10} {r['count_diff']:+8d} objs  {r['module']}", file=out)
+            print("-- top allocators", file=out)
+            for r in self.top_allocators(top):
+                print(f"  {_fmt_bytes(r['size']):>10} {r['count']:8d} objs  {r['site']}", file=out)
+        out.flush()
+
+    # --- background thread ---
+
+    def start(self, interval: Optional[float] = None, tracing_frames: int = MEMORY_TRACEMALLOC) -> "MemoryMonitor":
+        """Start periodic sampling (idempotent). interval <= 0 keeps only the cheap always-on stats."""
+        if interval is not None:
+            self.interval = interval
+        if self._on_gc not in gc.callbacks:
+            gc.callbacks.append(self._on_gc)
+        if tracing_frames > 0:
+            self.start_tracing(tracing_frames)
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="memory-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:  # telemetry must never take the worker down
+                metrics.incr("memory_sample_errors_total")
+                print(f"[memory] sample failed: {e}", file=sys.stderr)
+
+    def install_signal(self, signum: int = getattr(signal, "SIGUSR1", 0), top: int = 20) -> bool:
+        """``kill -USR1 <pid>`` dumps the report to stderr. Main thread only; False where unsupported."""
+        if not signum or threading.current_thread() is not threading.main_thread():
+            return False
+        # the handler only starts a thread: the dump walks the heap and must not run inside a signal frame
+        signal.signal(signum, lambda *_: threading.Thread(target=self.dump, args=(top,), daemon=True).start())
+        return True
+
+
+# Process-wide monitor
+memory_monitor = MemoryMonitor()
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+# ----------------------------
+# In-process metrics registry
+# ----------------------------
+# Counters, gauges and latency summaries shared by the serving layer, the
+# model wrappers and the batch/worker entry points. Everything is plain
+# Python so it can be snapshotted as JSON or shipped between processes.
+
+SUMMARY_WINDOW = 2048
+
+
+def _key(name: str, labels: Dict[str, Any]) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{inner}}}"
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+class Summary:
+    """Count/sum plus percentiles over a bounded window of recent observations."""
+
+    __slots__ = ("count", "total", "max", "window")
+
+    def __init__(self, window: int = SUMMARY_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.window: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.window.append(value)
+
+    def percentile(self, q: float) -> float:
+        return _percentile(sorted(self.window), q)
+
+    def snapshot(self) -> Dict[str, float]:
+        values = sorted(self.window)
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "avg": round(self.total / self.count, 6) if self.count else 0.0,
+            "p50": _percentile(values, 0.50),
+            "p90": _percentile(values, 0.90),
+            "p99": _percentile(values, 0.99),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Summary] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self.started_at = time.time()
+
+    def incr(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary()
+            summary.observe(value)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        return self._counters.get(_key(name, labels), 0)
+
+    def summary(self, name: str, **labels: Any) -> Optional[Summary]:
+        return self._summaries.get(_key(name, labels))
+
+    def register_collector(self, name: str, fn: Callable[[], Dict[str, Any]]) -> None:
+        """Pull-based metrics: ``fn`` is called on every snapshot."""
+        self._collectors[name] = fn
+
+    def unregister_collector(self, name: str) -> None:
+        self._collectors.pop(name, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = {
+                "uptime_s": round(time.time() - self.started_at, 3),
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {k: s.snapshot() for k, s in self._summaries.items()},
+            }
+            collectors = list(self._collectors.items())
+        for name, fn in collectors:
+            try:
+                data[name] = fn()
+            except Exception as e:  # a broken collector must not break /metrics
+                data[name] = {"error": str(e)}
+        return data
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+class Timer:
+    """``with Timer("latency_s", agent="BotAgent"): ...`` records elapsed seconds."""
+
+    def __init__(self, name: str, registry: Optional[Metrics] = None, **labels: Any):
+        self.name = name
+        self.labels = labels
+        self.registry = registry or metrics
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.elapsed = time.perf_counter() - self._start
+        self.registry.observe(self.name, self.elapsed, **self.labels)
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine snapshots from several processes.
+
+    Counters and gauges are summed. Summaries add count/sum; percentiles are
+    count-weighted averages and max is the overall max (an approximation,
+    the raw windows stay in their own processes).
+    """
+    counters: Dict[str, float] = {}
+    gauges: Dict[str, float] = {}
+    parts: Dict[str, List[Dict[str, float]]] = {}
+    n = 0
+    for snap in snapshots:
+        n += 1
+        for k, v in snap.get("counters", {}).items():
+            counters[k] = counters.get(k, 0) + v
+        for k, v in snap.get("gauges", {}).items():
+            gauges[k] = gauges.get(k, 0) + v
+        for k, v in snap.get("summaries", {}).items():
+            parts.setdefault(k, []).append(v)
+
+    summaries: Dict[str, Dict[str, float]] = {}
+    for k, items in parts.items():
+        count = sum(s["count"] for s in items)
+        total = sum(s["sum"] for s in items)
+        merged = {
+            "count": count,
+            "sum": round(total, 6),
+            "avg": round(total / count, 6) if count else 0.0,
+            "max": max(s["max"] for s in items),
+        }
+        for q in ("p50", "p90", "p99"):
+            merged[q] = (sum(s[q] * s["count"] for s in items) / count) if count else 0.0
+        summaries[k] = merged
+
+    return {"processes": n, "counters": counters, "gauges": gauges, "summaries": summaries}
+
+
+# Process-wide default registry
+metrics = Metrics()
@@ -0,0 +1,349 @@
+import asyncio
+import contextlib
+import contextvars
+import cProfile
+import html
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from metrics.metrics import metrics
+
+# ----------------------------
+# Opt-in sampling profiler
+# ----------------------------
+# Profiles a random fraction of requests and writes one set of files per
+# profiled request, tagged with kind / customer / agent:
+#
+#   with profiler.profile("handle_message", customer=customer_id, agent="support"):
+#       ...
+#
+# Off by default (rate 0): profile() is then one float compare and a shared
+# nullcontext. Switch at runtime with profiler.configure(rate=...) or
+# POST /admin/profiling on serving/server.py; PROFILE_SAMPLE_RATE etc. set
+# the starting state (worker processes inherit it).
+#
+# Modes:
+#   sample    a background thread walks the event-loop thread's stack every
+#             PROFILE_INTERVAL_MS and keeps samples whose running asyncio task
+#             belongs to the profiled request (its context, so tasks the SDK
+#             spawns count too). Concurrent requests don't pollute each other.
+#             Output: <name>.folded (collapsed stacks, flamegraph.pl/speedscope
+#             input) and <name>.svg (flamegraph).
+#   cprofile  deterministic cProfile -> <name>.prof (pstats/snakeviz). One at a
+#             time per process and it sees every task on the thread, so keep
+#             concurrency low while using it.
+# Profiles nested inside a running one are no-ops. Every written profile is
+# also appended to <dir>/index.jsonl; inside an event loop the files are
+# written on the default executor, so a profiled request never blocks on disk.
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_ACTIVE = int(os.getenv("PROFILE_MAX_ACTIVE", "4"))
+MAX_STACK_DEPTH = 128
+
+MODES = ("sample", "cprofile")
+
+_active: contextvars.ContextVar[Optional["_Profile"]] = contextvars.ContextVar("profile", default=None)
+_NOOP = contextlib.nullcontext()
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _safe(value: Any) -> str:
+    return _UNSAFE.sub("_", str(value))[:40] or "_"
+
+
+class _Profile:
+    __slots__ = ("kind", "tags", "started", "stacks", "samples", "thread_id", "loop")
+
+    def __init__(self, kind: str, tags: Dict[str, Any]):
+        self.kind = kind
+        self.tags = tags
+        self.started = time.time()
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.thread_id = threading.get_ident()
+        try:
+            self.loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None  # sync caller: every sample of this thread counts
+
+
+def _frame_name(frame: Any) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+
+
+def collapse(frame: Any) -> str:
+    """Root-first "a;b;c" stack of ``frame`` (the collapsed-stack format)."""
+    names: List[str] = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+# ----------------------------
+# Sampler thread
+# ----------------------------
+class _Sampler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: List[_Profile] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._switch_interval = sys.getswitchinterval()
+
+    def add(self, p: _Profile) -> None:
+        with self._lock:
+            self._profiles.append(p)
+            if self._thread is None:
+                self._stop = threading.Event()
+                # The sampler only runs when it gets the GIL; with the default 5ms switch
+                # interval it would mostly see the loop at its I/O waits, not in CPU work.
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self._switch_interval, profiler.interval / 2))
+                self._thread = threading.Thread(target=self._loop, args=(self._stop,), name="profiler-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, p: _Profile) -> None:
+        with self._lock:
+            self._profiles.remove(p)
+            if not self._profiles and self._thread is not None:
+                self._stop.set()  # stop when nobody is being profiled
+                self._thread = None
+                sys.setswitchinterval(self._switch_interval)
+
+    def _loop(self, stop: threading.Event) -> None:
+        while not stop.wait(profiler.interval):
+            # under the lock: once remove(p) returns, p.stacks is never written again
+            with self._lock:
+                if self._profiles:
+                    self._sample(self._profiles)
+
+    @staticmethod
+    def _sample(profiles: List[_Profile]) -> None:
+        frames = sys._current_frames()
+        stacks: Dict[int, str] = {}
+        for p in profiles:
+            frame = frames.get(p.thread_id)
+            if frame is None:
+                continue
+            if p.loop is not None:
+                # only CPU time spent in this request's tasks (an idle loop has no current task)
+                task = asyncio.current_task(p.loop)
+                if task is None or task.get_context().get(_active) is not p:
+                    continue
+            stack = stacks.get(p.thread_id)
+            if stack is None:
+                stack = stacks[p.thread_id] = collapse(frame)
+            p.stacks[stack] = p.stacks.get(stack, 0) + 1
+            p.samples += 1
+
+
+# ----------------------------
+# Flamegraph (SVG, no external tools)
+# ----------------------------
+FRAME_HEIGHT = 16
+SVG_WIDTH = 1200
+
+
+def flamegraph_svg(stacks: Dict[str, int], title: str = "") -> str:
+    tree: Dict[str, Any] = {"n": 0, "c": {}}
+    for stack, count in stacks.items():
+        node = tree
+        node["n"] += count
+        for name in stack.split(";"):
+            node = node["c"].setdefault(name, {"n": 0, "c": {}})
+            node["n"] += count
+
+    total = tree["n"] or 1
+    rects: List[str] = []
+    depth_max = 0
+
+    def walk(node: Dict[str, Any], x: float, depth: int) -> None:
+        nonlocal depth_max
+        for name, child in sorted(node["c"].items()):
+            width = child["n"] / total * SVG_WIDTH
+            if width >= 0.5:  # narrower than a pixel: skip subtree
+                depth_max = max(depth_max, depth)
+                label = html.escape(name)
+                pct = child["n"] / total * 100
+                hue = 20 + (hash(name.split(":")[0]) % 40)
+                rects.append(
+                    f'<g><title>{label} ({child["n"]} samples, {pct:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{{y{depth}}}" width="{width:.1f}" height="{FRAME_HEIGHT - 1}" '
+                    f'fill="hsl({hue},90%,60%)"/>'
+                    + (f'<text x="{x + 3:.1f}" y="{{t{depth}}}">{label[: int(width / 7)]}</text>' if width > 35 else "")
+                    + "</g>"
+                )
+                walk(child, x, depth + 1)
+            x += width
+
+    walk(tree, 0.0, 0)
+    height = (depth_max + 1) * FRAME_HEIGHT + 30
+    body = "".join(rects)
+    for d in range(depth_max + 1):  # root at the bottom
+        y = height - (d + 1) * FRAME_HEIGHT
+        body = body.replace(f"{{y{d}}}", str(y)).replace(f"{{t{d}}}", str(y + FRAME_HEIGHT - 4))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="4" y="16" font-size="13">{html.escape(title)} ({tree["n"]} samples)</text>{body}</svg>'
+    )
+
+
+# ----------------------------
+# Profiler
+# ----------------------------
+class Profiler:
+    def __init__(self):
+        self.rate = 0.0
+        self.mode = "sample"
+        self.directory = PROFILE_DIR
+        self.interval = PROFILE_INTERVAL_MS / 1000
+        self.max_active = PROFILE_MAX_ACTIVE
+        self.active = 0
+        self.written = 0
+        self.skipped = 0
+        self._sampler = _Sampler()
+        self._cprofile_busy = False
+        self._seq = 0
+        self._index_lock = threading.Lock()
+        self.configure(PROFILE_SAMPLE_RATE, PROFILE_MODE)
+        metrics.register_collector("profiler", self.stats)
+
+    def configure(
+        self,
+        rate: Optional[float] = None,
+        mode: Optional[str] = None,
+        directory: Optional[str] = None,
+        interval_ms: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Change settings at runtime; returns stats(). rate 0 switches profiling off."""
+        if rate is not None:
+            if not 0.0 <= rate <= 1.0:
+                raise ValueError("rate must be between 0 and 1")
+            self.rate = float(rate)
+        if mode is not None:
+            if mode not in MODES:
+                raise ValueError(f"mode must be one of {MODES}")
+            self.mode = mode
+        if directory is not None:
+            self.directory = directory
+        if interval_ms is not None:
+            if interval_ms <= 0:
+                raise ValueError("interval_ms must be > 0")
+            self.interval = interval_ms / 1000
+        return self.stats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "mode": self.mode,
+            "directory": self.directory,
+            "interval_ms": round(self.interval * 1000, 3),
+            "active": self.active,
+            "written": self.written,
+            "skipped": self.skipped,
+        }
+
+    def profile(self, kind: str, force: bool = False, **tags: Any):
+        """Context manager; profiles the body with probability ``rate`` (``force`` = always)."""
+        if (self.rate <= 0 or random.random() >= self.rate) and not force:
+            return _NOOP
+        if _active.get() is not None:
+            return _NOOP  # already inside a profiled request
+        return self._profile(kind, tags)
+
+    @contextlib.contextmanager
+    def _profile(self, kind: str, tags: Dict[str, Any]):
+        mode = self.mode
+        if self.active >= self.max_active or (mode == "cprofile" and self._cprofile_busy):
+            self.skipped += 1
+            metrics.incr("profiler_skipped_total", kind=kind, reason="busy")
+            yield None
+            return
+
+        p = _Profile(kind, tags)
+        token = _active.set(p)
+        self.active += 1
+        prof: Optional[cProfile.Profile] = None
+        if mode == "cprofile":
+            self._cprofile_busy = True
+            prof = cProfile.Profile()
+            prof.enable()
+        else:
+            self._sampler.add(p)
+        started = time.perf_counter()
+        try:
+            yield p
+        finally:
+            elapsed = time.perf_counter() - started
+            if prof is not None:
+                prof.disable()
+                self._cprofile_busy = False
+            else:
+                self._sampler.remove(p)
+            self.active -= 1
+            _active.reset(token)
+            self._seq += 1
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(p.started))
+            name = "-".join([stamp, str(os.getpid()), str(self._seq), _safe(p.kind)] + [_safe(v) for v in p.tags.values()])
+            if p.loop is not None and p.loop.is_running():
+                p.loop.run_in_executor(None, self._write, p, mode, elapsed, prof, self.directory, name)
+            else:
+                self._write(p, mode, elapsed, prof, self.directory, name)
+
+    def _write(self, p: _Profile, mode: str, elapsed: float, prof: Optional[cProfile.Profile], directory: str, name: str) -> None:
+        # never raises: a failed profile must not fail the request it was watching
+        try:
+            self._write_files(p, mode, elapsed, prof, directory, name)
+        except Exception as e:
+            metrics.incr("profiler_write_errors_total")
+            print(f"[profiler] could not write profile: {type(e).__name__}: {e}", file=sys.stderr)
+
+    def _write_files(self, p: _Profile, mode: str, elapsed: float, prof: Optional[cProfile.Profile], directory: str, name: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, name)
+        files = []
+        if prof is not None:
+            prof.dump_stats(base + ".prof")
+            files.append(base + ".prof")
+        else:
+            with open(base + ".folded", "w", encoding="utf-8") as f:
+                for stack, count in sorted(p.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            title = " ".join([p.kind] + [f"{k}={v}" for k, v in p.tags.items()])
+            with open(base + ".svg", "w", encoding="utf-8") as f:
+                f.write(flamegraph_svg(p.stacks, title))
+            files += [base + ".folded", base + ".svg"]
+        entry = {
+            "ts": p.started,
+            "kind": p.kind,
+            "tags": p.tags,
+            "mode": mode,
+            "duration_s": round(elapsed, 4),
+            "samples": p.samples,
+            "files": files,
+        }
+        with self._index_lock, open(os.path.join(directory, "index.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            self.written += 1
+        metrics.incr("profiler_profiles_total", kind=p.kind, mode=mode)
+
+
+# Process-wide profiler
+profiler = Profiler()
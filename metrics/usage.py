@@ -0,0 +1,310 @@
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, TextIO, Tuple
+
+from metrics.metrics import metrics
+
+# ----------------------------
+# Token usage / cost accounting
+# ----------------------------
+# model_layer.usage.UsageModel (outermost wrapper from config.model_for)
+# reads the usage of every model response -- input, output, cached tokens,
+# one call -- and books it in usage_ledger under four dimensions:
+#   agent      the model_for label (BotAgent, guardrail, TriageAgent, ...)
+#   guardrail  set by usage_scope(guardrail=...) (policy classifier)
+#   tool       set by usage_scope(tool=...) / scoped_tool() (agent-as-tool runs)
+#   customer   usage_scope(customer=...) or model_settings.metadata["customer_id"]
+#
+#   with usage_scope(customer=customer_id):      # handle_message, server, batch
+#       ...every model call in here is billed to the customer
+#
+# Totals since start plus rolling per-minute buckets (last USAGE_WINDOW_MINUTES)
+# are in the "usage" collector and usage_* counters; USAGE_LOG=<path> appends
+# one JSONL line per call, export_jsonl() writes the aggregates.
+#
+# Budgets (CUSTOMER_TOKEN_BUDGET tokens per CUSTOMER_BUDGET_WINDOW_S, 0 = off):
+# budget_status() is "ok", "soft" past CUSTOMER_BUDGET_SOFT of the budget
+# (callers degrade: shorter answers, no escalation runs) or "hard" (callers
+# skip the model). UsageModel itself refuses a call that would go over the
+# hard limit with BudgetExceeded, before anything is sent.
+
+USAGE_WINDOW_MINUTES = int(os.getenv("USAGE_WINDOW_MINUTES", "60"))
+USAGE_MAX_CUSTOMERS = int(os.getenv("USAGE_MAX_CUSTOMERS", "10000"))
+USAGE_LOG = os.getenv("USAGE_LOG", "")
+CUSTOMER_TOKEN_BUDGET = int(os.getenv("CUSTOMER_TOKEN_BUDGET", "0"))
+CUSTOMER_BUDGET_WINDOW_S = float(os.getenv("CUSTOMER_BUDGET_WINDOW_S", "86400"))
+CUSTOMER_BUDGET_SOFT = float(os.getenv("CUSTOMER_BUDGET_SOFT", "0.8"))
+
+DIMENSIONS = ("agent", "guardrail", "tool", "customer")
+OK, SOFT, HARD = "ok", "soft", "hard"
+
+_scope: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("usage_scope", default={})
+
+
+@contextlib.contextmanager
+def usage_scope(**tags: Optional[str]):
+    """Tag model calls in the body (and tasks started from it); inner scopes add to outer ones."""
+    merged = dict(_scope.get())
+    merged.update({k: str(v) for k, v in tags.items() if v})
+    token = _scope.set(merged)
+    try:
+        yield merged
+    finally:
+        _scope.reset(token)
+
+
+def current_scope() -> Dict[str, str]:
+    return _scope.get()
+
+
+def scoped_tool(tool: Any) -> Any:
+    """Bill model calls made while ``tool`` (a FunctionTool, e.g. agent.as_tool()) runs to tool=<name>."""
+    invoke = tool.on_invoke_tool
+
+    async def on_invoke_tool(ctx: Any, args: str) -> Any:
+        with usage_scope(tool=tool.name):
+            return await invoke(ctx, args)
+
+    tool.on_invoke_tool = on_invoke_tool
+    return tool
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, customer: str, used: int, limit: int):
+        super().__init__(f"customer '{customer}' is over its token budget ({used}/{limit})")
+        self.customer = customer
+        self.used = used
+        self.limit = limit
+
+
+class _Tally:
+    __slots__ = ("calls", "input", "output", "cached", "cost")
+
+    def __init__(self):
+        self.calls = 0
+        self.input = 0
+        self.output = 0
+        self.cached = 0
+        self.cost = 0.0
+
+    def add(self, inp: int, out: int, cached: int, cost: float, calls: int = 1) -> None:
+        self.calls += calls
+        self.input += inp
+        self.output += out
+        self.cached += cached
+        self.cost += cost
+
+    def merge(self, other: "_Tally") -> None:
+        self.add(other.input, other.output, other.cached, other.cost, other.calls)
+
+    @property
+    def tokens(self) -> int:
+        return self.input + self.output
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input,
+            "output_tokens": self.output,
+            "cached_tokens": self.cached,
+            "cost_usd": round(self.cost, 6),
+        }
+
+
+Key = Tuple[str, str]  # (dimension, value)
+
+
+class UsageLedger:
+    def __init__(
+        self,
+        window_minutes: int = USAGE_WINDOW_MINUTES,
+        max_customers: int = USAGE_MAX_CUSTOMERS,
+        budget: int = CUSTOMER_TOKEN_BUDGET,
+        budget_window_s: float = CUSTOMER_BUDGET_WINDOW_S,
+        soft_ratio: float = CUSTOMER_BUDGET_SOFT,
+        log_path: str = USAGE_LOG,
+    ):
+        self.window_minutes = window_minutes
+        self.max_customers = max_customers
+        self.budget = budget
+        self.budget_window_s = budget_window_s
+        self.soft_ratio = soft_ratio
+        self.budgets: Dict[str, int] = {}  # per-customer overrides
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._totals: Dict[Key, _Tally] = {}
+        self._customers: "OrderedDict[str, _Tally]" = OrderedDict()  # LRU, bounded
+        self._buckets: Deque[Tuple[int, Dict[Key, _Tally]]] = deque()
+        # customer -> [(bucket, tokens)] inside the budget window, least recently charged first
+        self._spend: "OrderedDict[str, Deque[List[int]]]" = OrderedDict()
+        self._bucket_s = max(60.0, budget_window_s / 120)
+        self._log: Optional[TextIO] = open(log_path, "a", buffering=1, encoding="utf-8") if log_path else None
+
+    # --- recording ---
+
+    def record(self, tags: Dict[str, str], model: str, inp: int, out: int, cached: int, cost: float) -> None:
+        now = time.time()
+        minute = int(now // 60)
+        keys = [(d, tags[d]) for d in DIMENSIONS if tags.get(d) and d != "customer"]
+        customer = tags.get("customer")
+        with self._lock:
+            for key in keys:
+                self._totals.setdefault(key, _Tally()).add(inp, out, cached, cost)
+            if customer:
+                tally = self._customers.get(customer)
+                if tally is None:
+                    tally = self._customers[customer] = _Tally()
+                    if len(self._customers) > self.max_customers:
+                        self._customers.popitem(last=False)
+                else:
+                    self._customers.move_to_end(customer)
+                tally.add(inp, out, cached, cost)
+                keys.append(("customer", customer))
+                self._add_spend(customer, now, inp + out)
+
+            if not self._buckets or self._buckets[-1][0] != minute:
+                self._buckets.append((minute, {}))
+                while self._buckets and self._buckets[0][0] <= minute - self.window_minutes:
+                    self._buckets.popleft()
+            bucket = self._buckets[-1][1]
+            for key in keys:
+                bucket.setdefault(key, _Tally()).add(inp, out, cached, cost)
+
+        agent = tags.get("agent", "unknown")
+        metrics.incr("usage_calls_total", agent=agent)
+        metrics.incr("usage_tokens_total", inp, agent=agent, kind="input")
+        metrics.incr("usage_tokens_total", out, agent=agent, kind="output")
+        if cached:
+            metrics.incr("usage_tokens_total", cached, agent=agent, kind="cached")
+        metrics.incr("usage_cost_usd_total", cost, agent=agent)
+        if self._log is not None:
+            row = {"ts": round(now, 3), **tags, "model": model, "input_tokens": inp, "output_tokens": out, "cached_tokens": cached, "cost_usd": round(cost, 8)}
+            self._log.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    # --- budgets ---
+
+    def _add_spend(self, customer: str, now: float, tokens: int) -> None:
+        bucket = int(now // self._bucket_s)
+        oldest = int((now - self.budget_window_s) // self._bucket_s)
+        spend = self._spend.get(customer)
+        if spend is None:
+            spend = self._spend[customer] = deque()
+        else:
+            self._spend.move_to_end(customer)
+            while spend and spend[0][0] <= oldest:
+                spend.popleft()
+        if spend and spend[-1][0] == bucket:
+            spend[-1][1] += tokens
+        else:
+            spend.append([bucket, tokens])
+        # customers nobody charged within the window hold nothing that counts any more;
+        # the map stays as big as the set of customers active inside one budget window
+        while True:
+            first, window = next(iter(self._spend.items()))
+            if window and window[-1][0] > oldest:
+                break
+            del self._spend[first]
+
+    def spent(self, customer: str) -> int:
+        """Tokens the customer used inside the budget window."""
+        oldest = int((time.time() - self.budget_window_s) // self._bucket_s)
+        with self._lock:
+            spend = self._spend.get(customer)
+            if not spend:
+                return 0
+            while spend and spend[0][0] <= oldest:
+                spend.popleft()
+            if not spend:
+                del self._spend[customer]
+                return 0
+            return sum(tokens for _, tokens in spend)
+
+    def set_budget(self, customer: str, limit: Optional[int]) -> None:
+        """Per-customer budget (tokens per window); None restores the default, 0 = unlimited."""
+        if limit is None:
+            self.budgets.pop(customer, None)
+        else:
+            self.budgets[customer] = limit
+
+    def limit_for(self, customer: str) -> int:
+        return self.budgets.get(customer, self.budget)
+
+    def budget_status(self, customer: Optional[str], estimate: int = 0) -> str:
+        """OK / SOFT / HARD for ``customer`` if it spent ``estimate`` more tokens now."""
+        limit = self.limit_for(customer) if customer else 0
+        if limit <= 0:
+            return OK
+        used = self.spent(customer) + estimate
+        if used > limit:
+            return HARD
+        return SOFT if used >= limit * self.soft_ratio else OK
+
+    def check(self, customer: Optional[str], estimate: int = 0) -> None:
+        """Raise BudgetExceeded when the call would take ``customer`` past its hard limit."""
+        if customer and self.budget_status(customer, estimate) == HARD:
+            self.rejected += 1
+            metrics.incr("usage_budget_rejections_total")
+            raise BudgetExceeded(customer, self.spent(customer), self.limit_for(customer))
+
+    # --- reading ---
+
+    def window(self, minutes: int) -> Dict[Key, _Tally]:
+        oldest = int(time.time() // 60) - minutes
+        merged: Dict[Key, _Tally] = {}
+        with self._lock:
+            buckets = [b for m, b in self._buckets if m > oldest]
+            for bucket in buckets:
+                for key, tally in bucket.items():
+                    merged.setdefault(key, _Tally()).merge(tally)
+        return merged
+
+    @staticmethod
+    def _by_dimension(tallies: Dict[Key, _Tally], top: int) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {d: {} for d in DIMENSIONS}
+        for (dim, value), tally in sorted(tallies.items(), key=lambda kv: kv[1].tokens, reverse=True):
+            if len(out[dim]) < top or dim != "customer":
+                out[dim][value] = tally.as_dict()
+        return out
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            totals = dict(self._totals)
+            totals.update((("customer", c), t) for c, t in self._customers.items())
+        out = self._by_dimension(totals, top)
+        out["windows"] = {
+            f"{m}m": self._by_dimension(self.window(m), top) for m in (1, 5, self.window_minutes)
+        }
+        out["budget"] = {
+            "tokens": self.budget,
+            "window_s": self.budget_window_s,
+            "soft_ratio": self.soft_ratio,
+            "overrides": len(self.budgets),
+            "rejected": self.rejected,
+        }
+        return out
+
+    def export_jsonl(self, path: str, minutes: Optional[int] = None) -> int:
+        """Append one line per (dimension, value) -- totals, or the last ``minutes`` -- to ``path``."""
+        if minutes is None:
+            with self._lock:
+                tallies = dict(self._totals)
+                tallies.update((("customer", c), t) for c, t in self._customers.items())
+        else:
+            tallies = self.window(minutes)
+        ts = round(time.time(), 3)
+        window = "total" if minutes is None else f"{minutes}m"
+        with open(path, "a", encoding="utf-8") as f:
+            for (dim, value), tally in tallies.items():
+                row = {"ts": ts, "window": window, "dimension": dim, "key": value, **tally.as_dict()}
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return len(tallies)
+
+
+# Process-wide ledger
+usage_ledger = UsageLedger()
+metrics.register_collector("usage", usage_ledger.stats)
@@ -0,0 +1,69 @@
+from typing import Any, AsyncIterator
+
+from agents import Model, ModelResponse
+from openai.types.responses import ResponseCompletedEvent
+
+from model_layer.mock_model import estimate_tokens
+
+
+# ----------------------------
+# Model wrapper base
+# ----------------------------
+# Every model-layer feature (rate limiting, hedging, circuit breaking, usage
+# accounting) is a Model that wraps another Model, so they stack in any order
+# and agents never notice: Agent(..., model=RateLimitedModel(base_model, ...)).
+
+class ModelWrapper(Model):
+    def __init__(self, inner: Model):
+        self.inner = inner
+
+    @property
+    def model_name(self) -> str:
+        inner = self.inner
+        while isinstance(inner, ModelWrapper):
+            inner = inner.inner
+        return str(getattr(inner, "model", None) or getattr(inner, "name", type(inner).__name__))
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        return await self.inner.get_response(*args, **kwargs)
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        async for event in self.inner.stream_response(*args, **kwargs):
+            yield event
+
+
+def estimate_request_tokens(system_instructions: Any, input: Any, model_settings: Any, default_output: int = 256) -> int:
+    """Rough prompt + completion size, used before the real usage is known."""
+    prompt = estimate_tokens(str(system_instructions or "")) + estimate_tokens(str(input or ""))
+    return prompt + (getattr(model_settings, "max_tokens", None) or default_output)
+
+
+def stream_usage_tokens(event: Any) -> int:
+    """Total tokens from a ResponseCompletedEvent, 0 for any other stream event."""
+    if isinstance(event, ResponseCompletedEvent) and event.response.usage:
+        return event.response.usage.total_tokens or 0
+    return 0
+
+
+def status_code(error: BaseException) -> int:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", 0) or 0
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return status_code(error) == 429
+
+
+def is_retryable(error: BaseException) -> bool:
+    code = status_code(error)
+    if code in (408, 409, 429) or code >= 500:
+        return True
+    # openai.APIConnectionError / APITimeoutError carry no status code
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_after(error: BaseException) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
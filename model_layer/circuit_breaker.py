@@ -0,0 +1,216 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from agents import Model, ModelResponse
+
+from metrics.metrics import metrics
+from model_layer.base import ModelWrapper
+
+# ----------------------------
+# Circuit breaker around the model layer
+# ----------------------------
+# closed    -> calls pass; outcomes go into a rolling window
+# open      -> error rate or slow-call rate over the window crossed its
+#              threshold: every call fails immediately with CircuitOpenError
+#              for ``open_seconds``, so callers can switch to a degraded path
+# half_open -> a few probe calls are let through; all good -> closed,
+#              any failure -> open again
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"circuit '{name}' is open (retry in {retry_in:.1f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 3,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        metrics.register_collector(f"circuit:{name}", self.stats)
+
+    # --- state ---
+
+    def _set(self, state: str) -> None:
+        if state != self.state:
+            metrics.incr("circuit_transitions_total", circuit=self.name, to=state)
+            self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != CLOSED:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if state == CLOSED:
+            self._window.clear()
+
+    def _refresh(self) -> None:
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._set(HALF_OPEN)
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (open, or half-open with all probe slots taken)."""
+        self._refresh()
+        if self.state == OPEN:
+            return True
+        return self.state == HALF_OPEN and self._probes_in_flight >= self.half_open_probes
+
+    def allow(self) -> None:
+        """Reserve a call or raise CircuitOpenError."""
+        self._refresh()
+        if self.state == CLOSED:
+            return
+        if self.state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+            self._probes_in_flight += 1
+            return
+        self.reject()
+
+    def reject(self) -> None:
+        """Raise CircuitOpenError, counted as a rejected call."""
+        metrics.incr("circuit_rejected_total", circuit=self.name)
+        retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record(self, ok: bool, latency: float) -> None:
+        slow = latency >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if not ok or slow:
+                self._set(OPEN)
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._set(CLOSED)
+            return
+        if self.state == OPEN:
+            return  # a straggler from before the trip
+
+        self._window.append((not ok, slow))
+        n = len(self._window)
+        if n < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._window if failed)
+        slows = sum(1 for _, s in self._window if s)
+        if failures / n >= self.failure_rate or slows / n >= self.slow_call_rate:
+            self._set(OPEN)
+
+    def release(self) -> None:
+        """A reserved call ended without a verdict on the provider (e.g. caller cancelled)."""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refresh()
+        n = len(self._window)
+        return {
+            "state": self.state,
+            "calls_in_window": n,
+            "failure_rate": round(sum(1 for f, _ in self._window if f) / n, 3) if n else 0.0,
+            "slow_rate": round(sum(1 for _, s in self._window if s) / n, 3) if n else 0.0,
+        }
+
+
+class CircuitBreakerModel(ModelWrapper):
+    """Fails fast with CircuitOpenError while the breaker is open.
+
+    ``call_timeout`` bounds how long one call (or a stream's first event) may
+    hang; a timeout counts as a failure. Put it inside a RateLimitedModel so
+    latency and the timeout cover the provider call only, not queueing for a
+    permit, and every retried attempt is recorded.
+    """
+
+    def __init__(self, inner: Model, breaker: CircuitBreaker, call_timeout: Optional[float] = None):
+        super().__init__(inner)
+        self.breaker = breaker
+        self.call_timeout = call_timeout
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        self.breaker.allow()
+        started = time.monotonic()
+        try:
+            response = await asyncio.wait_for(self.inner.get_response(*args, **kwargs), self.call_timeout)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(False, time.monotonic() - started)
+            raise
+        self.breaker.record(True, time.monotonic() - started)
+        return response
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        self.breaker.allow()
+        started = time.monotonic()
+        stream = self.inner.stream_response(*args, **kwargs)
+        recorded = False
+        try:
+            try:
+                first = await asyncio.wait_for(anext(stream), self.call_timeout)
+            except StopAsyncIteration:
+                self.breaker.record(True, time.monotonic() - started)
+                recorded = True
+                return
+            yield first
+            async for event in stream:
+                yield event
+        except Exception:
+            self.breaker.record(False, time.monotonic() - started)
+            recorded = True
+            raise
+        except BaseException:
+            self.breaker.release()
+            recorded = True
+            raise
+        finally:
+            if not recorded:
+                self.breaker.record(True, time.monotonic() - started)
+            await stream.aclose()
+
+
+class CircuitGateModel(ModelWrapper):
+    """Rejects while the breaker is open, before the call reaches ``inner``.
+
+    Goes outside a RateLimitedModel so rejected calls never queue for a slot;
+    it reserves nothing, the CircuitBreakerModel further in does that.
+    """
+
+    def __init__(self, inner: Model, breaker: CircuitBreaker):
+        super().__init__(inner)
+        self.breaker = breaker
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        if self.breaker.is_open():
+            self.breaker.reject()
+        return await self.inner.get_response(*args, **kwargs)
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        if self.breaker.is_open():
+            self.breaker.reject()
+        async for event in self.inner.stream_response(*args, **kwargs):
+            yield event
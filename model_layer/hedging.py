@@ -0,0 +1,177 @@
+import asyncio
+import contextlib
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from agents import Model, ModelResponse
+
+from metrics.metrics import metrics
+from model_layer.base import ModelWrapper
+
+# ----------------------------
+# Hedged requests
+# ----------------------------
+# If a call hasn't answered within the p<percentile> of recent latency, send
+# an identical second call and keep whichever answers first; the loser is
+# cancelled. Extra calls are capped by a budget (``budget_ratio`` hedges per
+# primary call, plus a small burst), so a provider-wide slowdown can't double
+# our traffic. Best for short, idempotent calls: guardrail classifiers, triage.
+
+
+class HedgeBudget:
+    def __init__(self, ratio: float = 0.05, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.credit = burst
+
+    def earn(self) -> None:
+        self.credit = min(self.burst, self.credit + self.ratio)
+
+    def spend(self) -> bool:
+        if self.credit >= 1.0:
+            self.credit -= 1.0
+            return True
+        return False
+
+
+class HedgedModel(ModelWrapper):
+    def __init__(
+        self,
+        inner: Model,
+        agent: str = "default",
+        percentile: float = 0.95,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        window: int = 512,
+        budget_ratio: float = 0.05,
+        budget_burst: float = 5.0,
+    ):
+        super().__init__(inner)
+        self.agent = agent
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.budget = HedgeBudget(budget_ratio, budget_burst)
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        metrics.register_collector(f"hedging:{agent}", self.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.wins,
+            "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "win_rate": round(self.wins / self.hedges, 4) if self.hedges else 0.0,
+            "delay_s": self.hedge_delay(),
+            "budget_credit": round(self.budget.credit, 2),
+        }
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        values = sorted(self._latencies)
+        idx = min(len(values) - 1, int(self.percentile * (len(values) - 1)))
+        return max(self.min_delay, values[idx])
+
+    def _start(self) -> Optional[float]:
+        self.requests += 1
+        self.budget.earn()
+        metrics.incr("hedge_requests_total", agent=self.agent)
+        return self.hedge_delay()
+
+    def _may_hedge(self) -> bool:
+        if not self.budget.spend():
+            metrics.incr("hedge_budget_denied_total", agent=self.agent)
+            return False
+        self.hedges += 1
+        metrics.incr("hedges_sent_total", agent=self.agent)
+        return True
+
+    def _won(self) -> None:
+        self.wins += 1
+        metrics.incr("hedge_wins_total", agent=self.agent)
+
+    async def _timed(self, coro) -> Any:
+        started = time.monotonic()
+        result = await coro
+        self._latencies.append(time.monotonic() - started)
+        return result
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        delay = self._start()
+        primary = asyncio.ensure_future(self._timed(self.inner.get_response(*args, **kwargs)))
+        if delay is None:
+            return await primary
+
+        hedge: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._may_hedge():
+                return await primary
+
+            hedge = asyncio.ensure_future(self._timed(self.inner.get_response(*args, **kwargs)))
+            pending = {primary, hedge}
+            first_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._won()
+                        return task.result()
+                    first_error = first_error or task.exception()
+            raise first_error
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        # Hedge on time-to-first-event; once one stream has produced output, stick with it.
+        delay = self._start()
+        started = time.monotonic()
+        streams = [self.inner.stream_response(*args, **kwargs)]
+        firsts = [asyncio.ensure_future(anext(streams[0]))]
+        winner, first = streams[0], firsts[0]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({first}, timeout=delay)
+                if not done and self._may_hedge():
+                    streams.append(self.inner.stream_response(*args, **kwargs))
+                    firsts.append(asyncio.ensure_future(anext(streams[1])))
+                    winner, first = await self._first_of(list(zip(streams, firsts)))
+                    if winner is streams[1]:
+                        self._won()
+            try:
+                event = await first
+            except StopAsyncIteration:
+                return
+            self._latencies.append(time.monotonic() - started)
+            yield event
+            async for event in winner:
+                yield event
+        finally:
+            for fut in firsts:
+                fut.cancel()
+            await asyncio.gather(*firsts, return_exceptions=True)
+            for stream in streams:
+                with contextlib.suppress(Exception):
+                    await stream.aclose()
+
+    @staticmethod
+    async def _first_of(entries: List[Tuple[Any, asyncio.Future]]) -> Tuple[Any, asyncio.Future]:
+        """(stream, first-event future) whose first event arrived successfully first."""
+        pending = {fut: stream for stream, fut in entries}
+        last = entries[0]
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                last = (pending.pop(fut), fut)
+                if fut.exception() is None:
+                    return last
+        return last
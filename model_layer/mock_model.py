@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Optional, Union
+
+from agents import Model, ModelResponse, Usage
+from agents.models.fake_id import FAKE_RESPONSES_ID
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+# ----------------------------
+# Offline model for local runs
+# ----------------------------
+# Drop-in replacement for OpenAIChatCompletionsModel: no network, no API key.
+# Used by the serving layer, batch runner and benchmarks so everything can be
+# exercised on localhost, e.g. Agent(..., model=MockModel()).
+
+
+def last_user_text(input: Union[str, list]) -> str:
+    """Pull the most recent user text out of a Runner input list."""
+    if isinstance(input, str):
+        return input
+    for item in reversed(input or []):
+        if isinstance(item, dict) and item.get("role") == "user":
+            content = item.get("content")
+            if isinstance(content, str):
+                return content
+            if isinstance(content, list):
+                return " ".join(str(p.get("text", "")) for p in content if isinstance(p, dict))
+    return ""
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for English/Roman Urdu
+    return max(1, len(text or "") // 4)
+
+
+class MockModel(Model):
+    def __init__(
+        self,
+        reply: Optional[Callable[[str], str]] = None,
+        latency: Union[float, Callable[[], float]] = 0.0,
+        chunk_size: int = 8,
+        name: str = "mock-model",
+    ):
+        self.reply = reply or (lambda text: f"(MOCK) {text}")
+        self.latency = latency
+        self.chunk_size = max(1, chunk_size)
+        self.name = name
+        self.calls = 0
+
+    async def _wait(self) -> None:
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _usage(self, prompt: str, text: str) -> Usage:
+        i, o = estimate_tokens(prompt), estimate_tokens(text)
+        return Usage(
+            requests=1,
+            input_tokens=i,
+            output_tokens=o,
+            total_tokens=i + o,
+            input_tokens_details=InputTokensDetails(cached_tokens=0),
+            output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+        )
+
+    @staticmethod
+    def _message(text: str) -> ResponseOutputMessage:
+        return ResponseOutputMessage(
+            id=FAKE_RESPONSES_ID,
+            content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+            role="assistant",
+            type="message",
+            status="completed",
+        )
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs: Any) -> ModelResponse:
+        self.calls += 1
+        prompt = last_user_text(input)
+        await self._wait()
+        text = self.reply(prompt)
+        return ModelResponse(output=[self._message(text)], usage=self._usage(prompt, text), response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs: Any) -> AsyncIterator[Any]:
+        self.calls += 1
+        prompt = last_user_text(input)
+        await self._wait()
+        text = self.reply(prompt)
+
+        seq = 0
+        for start in range(0, len(text), self.chunk_size):
+            yield ResponseTextDeltaEvent(
+                content_index=0,
+                delta=text[start:start + self.chunk_size],
+                item_id=FAKE_RESPONSES_ID,
+                output_index=0,
+                type="response.output_text.delta",
+                sequence_number=seq,
+                logprobs=[],
+            )
+            seq += 1
+            await asyncio.sleep(0)
+
+        usage = self._usage(prompt, text)
+        response = Response(
+            id=FAKE_RESPONSES_ID,
+            created_at=time.time(),
+            model=self.name,
+            object="response",
+            output=[self._message(text)],
+            tool_choice="auto",
+            tools=[],
+            parallel_tool_calls=False,
+            usage=ResponseUsage(
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                total_tokens=usage.total_tokens,
+                input_tokens_details=usage.input_tokens_details,
+                output_tokens_details=usage.output_tokens_details,
+            ),
+        )
+        yield ResponseCompletedEvent(response=response, type="response.completed", sequence_number=seq)
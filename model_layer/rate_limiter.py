@@ -0,0 +1,320 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from agents import Model, ModelResponse
+
+from metrics.metrics import metrics
+from model_layer.base import (
+    ModelWrapper,
+    estimate_request_tokens,
+    is_rate_limited,
+    is_retryable,
+    retry_after,
+    stream_usage_tokens,
+)
+
+# ----------------------------
+# Client-side rate limiting for Gemini calls
+# ----------------------------
+# One AdaptiveLimiter is shared by every agent (see config/config.py):
+#   * two token buckets: requests/minute and tokens/minute
+#   * an AIMD concurrency limit: +1 slot per window of clean calls, x0.5 on a
+#     429 or a latency spike, so we back off before the provider makes us
+#   * weighted fair queuing across priority classes, so short guardrail
+#     calls get slots even while long generations are queued
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or per_minute)
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    async def take(self, amount: float) -> float:
+        """Block (FIFO) until ``amount`` is available; returns seconds waited."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                delay = self.wait_time(amount)
+                if delay <= 0:
+                    self.tokens -= min(amount, self.capacity)
+                    return waited
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def adjust(self, delta: float) -> None:
+        """Positive gives tokens back (over-estimate), negative charges more."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+    def pause(self, seconds: float) -> None:
+        """Empty the bucket so nothing passes for ~``seconds`` (provider said Retry-After)."""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class _PriorityClass:
+    __slots__ = ("name", "weight", "waiters", "vtime", "granted")
+
+    def __init__(self, name: str, weight: float):
+        self.name = name
+        self.weight = max(weight, 1e-6)
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.vtime = 0.0
+        self.granted = 0
+
+
+class AIMDConcurrency:
+    """Additive-increase / multiplicative-decrease slot limit with weighted fair queuing."""
+
+    def __init__(
+        self,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 64,
+        decrease_factor: float = 0.5,
+        spike_factor: float = 3.0,
+        cooldown: float = 2.0,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.spike_factor = spike_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._classes: Dict[str, _PriorityClass] = {}
+        self._vclock = 0.0
+        self._last_decrease = 0.0
+        self._baseline: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+
+    @property
+    def slots(self) -> int:
+        return max(self.minimum, int(self.limit))
+
+    def waiting(self) -> Dict[str, int]:
+        return {name: len(c.waiters) for name, c in self._classes.items() if c.waiters}
+
+    def _class(self, name: str, weight: float) -> _PriorityClass:
+        c = self._classes.get(name)
+        if c is None:
+            c = self._classes[name] = _PriorityClass(name, weight)
+        c.weight = max(weight, 1e-6)
+        return c
+
+    async def acquire(self, priority: str, weight: float = 1.0) -> None:
+        c = self._class(priority, weight)
+        if self.in_flight < self.slots and not any(x.waiters for x in self._classes.values()):
+            self._grant(c)
+            return
+        if not c.waiters:
+            # an idle class restarts at the current virtual time: no banked credit
+            c.vtime = max(c.vtime, self._vclock)
+        fut = asyncio.get_running_loop().create_future()
+        c.waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # granted and cancelled in the same tick: hand the slot on
+            else:
+                c.waiters.remove(fut)
+            raise
+
+    def _grant(self, c: _PriorityClass) -> None:
+        self._vclock = c.vtime
+        c.vtime += 1.0 / c.weight
+        c.granted += 1
+        self.in_flight += 1
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.slots:
+            ready = [c for c in self._classes.values() if c.waiters]
+            if not ready:
+                return
+            c = min(ready, key=lambda x: x.vtime)
+            fut = c.waiters.popleft()
+            if fut.cancelled():
+                continue
+            self._grant(c)
+            fut.set_result(None)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    # --- feedback ---
+
+    def on_success(self, agent: str, latency: float) -> None:
+        base = self._baseline.get(agent)
+        n = self._samples.get(agent, 0) + 1
+        self._samples[agent] = n
+        if base is not None and n > 20 and latency > self.spike_factor * base:
+            self.decrease("latency_spike")
+        else:
+            # additive increase: about +1 slot per `limit` successful calls
+            self.limit = min(self.maximum, self.limit + 1.0 / max(1.0, self.limit))
+            self._dispatch()
+        self._baseline[agent] = latency if base is None else 0.9 * base + 0.1 * latency
+
+    def decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+        metrics.incr("limiter_decreases_total", reason=reason)
+
+
+class Permit:
+    __slots__ = ("agent", "estimate", "started")
+
+    def __init__(self, agent: str, estimate: int):
+        self.agent = agent
+        self.estimate = estimate
+        self.started = time.monotonic()
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        rpm: float = 1000,
+        tpm: float = 1_000_000,
+        initial_concurrency: int = 8,
+        max_concurrency: int = 64,
+        min_concurrency: int = 1,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AIMDConcurrency(initial_concurrency, min_concurrency, max_concurrency)
+        self.weights = dict(weights or {})
+
+    def stats(self) -> Dict[str, Any]:
+        c = self.concurrency
+        return {
+            "concurrency_limit": round(c.limit, 2),
+            "in_flight": c.in_flight,
+            "waiting": c.waiting(),
+            "granted": {name: cls.granted for name, cls in c._classes.items()},
+            "rpm_available": round(self.requests.tokens, 1),
+            "tpm_available": round(self.tokens.tokens, 1),
+        }
+
+    async def acquire(self, agent: str, priority: str, estimate: int) -> Permit:
+        started = time.monotonic()
+        await self.concurrency.acquire(priority, self.weights.get(priority, 1.0))
+        try:
+            await self.requests.take(1)
+            await self.tokens.take(estimate)
+        except BaseException:
+            self.concurrency.release()
+            raise
+        metrics.observe("limiter_wait_s", time.monotonic() - started, priority=priority)
+        return Permit(agent, estimate)
+
+    def release(self, permit: Permit, error: Optional[BaseException] = None, actual_tokens: int = 0, feedback: bool = True) -> None:
+        latency = time.monotonic() - permit.started
+        self.concurrency.release()
+        if not feedback:
+            # caller went away (cancelled / stopped reading): says nothing about the provider
+            return
+        if error is not None:
+            if is_rate_limited(error):
+                metrics.incr("limiter_429_total", agent=permit.agent)
+                self.concurrency.decrease("429")
+                pause = retry_after(error)
+                if pause:
+                    self.requests.pause(pause)
+            return
+        if actual_tokens:
+            self.tokens.adjust(permit.estimate - actual_tokens)
+        self.concurrency.on_success(permit.agent, latency)
+
+
+def _backoff(attempt: int, error: BaseException) -> float:
+    return max(retry_after(error), min(8.0, 0.5 * 2 ** attempt)) * (0.5 + random.random())
+
+
+class RateLimitedModel(ModelWrapper):
+    """Routes every call through a shared AdaptiveLimiter and retries retryable errors under it.
+
+    Give the OpenAI client ``max_retries=0`` so retries are not hidden from the limiter.
+    """
+
+    def __init__(self, inner: Model, limiter: AdaptiveLimiter, agent: str = "default", priority: Optional[str] = None, max_retries: int = 2):
+        super().__init__(inner)
+        self.limiter = limiter
+        self.agent = agent
+        self.priority = priority or agent
+        self.max_retries = max_retries
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs: Any) -> ModelResponse:
+        estimate = estimate_request_tokens(system_instructions, input, model_settings)
+        attempt = 0
+        while True:
+            permit = await self.limiter.acquire(self.agent, self.priority, estimate)
+            try:
+                response = await self.inner.get_response(
+                    system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+                )
+            except asyncio.CancelledError:
+                self.limiter.release(permit, feedback=False)
+                raise
+            except Exception as e:
+                self.limiter.release(permit, error=e)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                metrics.incr("limiter_retries_total", agent=self.agent)
+                await asyncio.sleep(_backoff(attempt, e))
+                attempt += 1
+                continue
+            self.limiter.release(permit, actual_tokens=response.usage.total_tokens if response.usage else 0)
+            return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs: Any) -> AsyncIterator[Any]:
+        estimate = estimate_request_tokens(system_instructions, input, model_settings)
+        attempt = 0
+        while True:
+            permit = await self.limiter.acquire(self.agent, self.priority, estimate)
+            yielded = False
+            actual = 0
+            try:
+                async for event in self.inner.stream_response(
+                    system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+                ):
+                    actual = stream_usage_tokens(event) or actual
+                    yielded = True
+                    yield event
+            except Exception as e:
+                self.limiter.release(permit, error=e)
+                # only retry before the caller has seen any output
+                if yielded or attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                metrics.incr("limiter_retries_total", agent=self.agent)
+                await asyncio.sleep(_backoff(attempt, e))
+                attempt += 1
+                continue
+            except BaseException:
+                self.limiter.release(permit, feedback=False)
+                raise
+            self.limiter.release(permit, actual_tokens=actual)
+            return
@@ -0,0 +1,74 @@
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from agents import Model, ModelResponse
+from openai.types.responses import ResponseCompletedEvent
+
+from metrics.usage import UsageLedger, current_scope, usage_ledger
+from model_layer.base import ModelWrapper, estimate_request_tokens
+
+# ----------------------------
+# Usage accounting wrapper
+# ----------------------------
+# Books every response's tokens in metrics.usage.usage_ledger (agent label +
+# the caller's usage_scope tags) and refuses calls that would take a
+# customer past its hard token budget, before anything is sent.
+
+
+def _tokens(usage: Any) -> Tuple[int, int, int]:
+    details = getattr(usage, "input_tokens_details", None)
+    return (
+        getattr(usage, "input_tokens", 0) or 0,
+        getattr(usage, "output_tokens", 0) or 0,
+        getattr(details, "cached_tokens", 0) or 0,
+    )
+
+
+class UsageModel(ModelWrapper):
+    """Books every response's usage in the ledger; refuses calls past a customer's hard budget.
+
+    ``agent`` is the label usage is booked under (None: usage_scope(agent=...)).
+    ``pricing`` is anything with ``cost(input_tokens, output_tokens)`` (a model_tiers.TierSpec).
+    """
+
+    def __init__(self, inner: Model, agent: Optional[str] = None, pricing: Any = None, ledger: Optional[UsageLedger] = None):
+        super().__init__(inner)
+        self.agent = agent
+        self.pricing = pricing
+        self.ledger = ledger or usage_ledger
+
+    def _tags(self, model_settings: Any) -> Dict[str, str]:
+        tags = dict(current_scope())
+        if self.agent:
+            tags["agent"] = self.agent
+        tags.setdefault("agent", "unknown")
+        if "customer" not in tags:
+            customer = (getattr(model_settings, "metadata", None) or {}).get("customer_id")
+            if customer:
+                tags["customer"] = str(customer)
+        return tags
+
+    def _book(self, tags: Dict[str, str], usage: Any) -> None:
+        if usage is None:
+            return
+        inp, out, cached = _tokens(usage)
+        cost = self.pricing.cost(inp, out) if self.pricing is not None else 0.0
+        self.ledger.record(tags, self.model_name, inp, out, cached, cost)
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs: Any) -> ModelResponse:
+        tags = self._tags(model_settings)
+        self.ledger.check(tags.get("customer"), estimate_request_tokens(system_instructions, input, model_settings))
+        response = await self.inner.get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+        )
+        self._book(tags, response.usage)
+        return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs: Any) -> AsyncIterator[Any]:
+        tags = self._tags(model_settings)
+        self.ledger.check(tags.get("customer"), estimate_request_tokens(system_instructions, input, model_settings))
+        async for event in self.inner.stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+        ):
+            if isinstance(event, ResponseCompletedEvent):
+                self._book(tags, event.response.usage)
+            yield event
@@ -1,8 +1,13 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
 from agents import Agent
 from config.config import model
+from config.model_tiers import run_with_escalation
+from metrics.metrics import metrics
 from schema.schema import MyDataType
 
 # Multiple hotels ka data (instructions etc. aap apni zarurat ke mutabiq update kar sakte hain)
@@ -12,46 +17,120 @@ hotels = {
     "Hotel Serena": "Check queries for Hotel Serena",
 }
 
+# ----------------------------
+# Precomputed hotel-name matcher
+# ----------------------------
+# Saare naam ek hi regex me (lambe naam pehle), query sirf ek dafa lowercase hoti hai.
+# "hotel"/"hostel" ka zikr ho magar koi known naam na mile, ya do hotel ek saath aayein,
+# to faisla inconclusive hai aur model se poocha jata hai.
+_HOTEL_WORD = re.compile(r"\bho(?:s)?tel\b")
+
+
+def build_hotel_matcher(names: Iterable[str]) -> Callable[[str], List[str]]:
+    by_lower = {" ".join(n.lower().split()): n for n in names}
+    if not by_lower:
+        return lambda query: []
+    alternatives = sorted(by_lower, key=len, reverse=True)
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(n).replace(r"\ ", r"\s+") for n in alternatives) + r")\b")
+
+    def match(query: str) -> List[str]:
+        found = (by_lower[" ".join(m.group(0).split())] for m in pattern.finditer(query.lower()))
+        return list(dict.fromkeys(found))
+
+    return match
+
+
+match_hotels = build_hotel_matcher(hotels)
+
+
 def detect_hotel_from_query(query):
-    for hotel in hotels.keys():
-        if hotel.lower() in query.lower():
-            return hotel
-    return None
+    found = match_hotels(query)
+    return found[0] if found else None
+
+
+# ----------------------------
+# Classification stats (kitni dafa model bacha)
+# ----------------------------
+classifier_stats: Dict[str, int] = {"query": 0, "context": 0, "no_hotel": 0, "model": 0}
+
+
+def _classifier_snapshot() -> Dict[str, Any]:
+    total = sum(classifier_stats.values())
+    avoided = total - classifier_stats["model"]
+    return {
+        **classifier_stats,
+        "total": total,
+        "model_avoided": avoided,
+        "model_avoided_rate": round(avoided / total, 4) if total else 0.0,
+    }
+
+
+metrics.register_collector("hotel_classifier", _classifier_snapshot)
+
+
+def _record(path: str) -> None:
+    classifier_stats[path] += 1
+    metrics.incr("hotel_classifier_total", path=path)
+
+
+def _result(hotel_name: Optional[str], reason: str) -> MyDataType:
+    return MyDataType(
+        hotel_name=hotel_name,
+        is_query_about_hotel=hotel_name is not None,
+        is_query_about_hotel_sannata=hotel_name == "Hotel Sannata",
+        reason=reason,
+    )
+
+
+def classify_locally(query: str, context: Dict[str, Any]) -> Tuple[Optional[MyDataType], str]:
+    """(output, path) from the matcher and context; output is None when the model has to decide."""
+    found = match_hotels(query)
+    if len(found) == 1:
+        return _result(found[0], f"Query is about {found[0]}."), "query"
+    if len(found) > 1:
+        return None, "model"
+
+    # Agar query mein hotel na mile, toh context se try karo
+    hotel_name = context.get("hotel_name")
+    if hotel_name:
+        return _result(hotel_name, f"Using context, query assumed about {hotel_name}."), "context"
+    if _HOTEL_WORD.search(query.lower()):
+        return None, "model"  # kisi aur/galat spelling wale hotel ka zikr
+    return _result(None, "Hotel not specified in query or context."), "no_hotel"
+
+
+# (id(agent), instructions) -> clone; ek hotel ke liye ek hi clone, taake run_with_escalation ki tier copies bhi reuse hon
+_variants: Dict[Tuple[int, str], Agent] = {}
+
 
 class DynamicGuardrailAgent(Agent):
+    # True: pehle local matcher, model sirf inconclusive queries par. False: har query model se.
+    deterministic = True
+
     async def run(self, input, context=None):
-        context = context or {}
-        
-        hotel_name = detect_hotel_from_query(input)
-        if hotel_name:
-            context["hotel_name"] = hotel_name
-            is_query_about_hotel = True
-            reason = f"Query is about {hotel_name}."
-        else:
-            # Agar query mein hotel na mile, toh context se try karo
-            hotel_name = context.get("hotel_name")
-            if hotel_name:
-                is_query_about_hotel = True
-                reason = f"Using context, query assumed about {hotel_name}."
-            else:
-                is_query_about_hotel = False
-                reason = "Hotel not specified in query or context."
-        
-        # Output banayen MyDataType ke mutabiq
-        output_data = MyDataType(
-            hotel_name=hotel_name,
-            is_query_about_hotel=is_query_about_hotel,
-            reason=reason
-        )
-        
-        # Yahan aap agent instructions ko dynamically set kar sakte hain agar zarurat ho
-        self.instructions = hotels.get(hotel_name, "Please specify a valid hotel.")
-        
-        # Parent ka run method call karein (ye aapka model ke saath interaction karega)
-        result = await super().run(input, context=context)
-        
-        # Agar result aapke model se koi response ho to uska bhi return kar sakte hain, warna output_data return karen
-        # Example: return result or output_data depending on implementation
+        context = context if context is not None else {}
+
+        output_data, path = classify_locally(input, context) if self.deterministic else (None, "model")
+        if output_data is not None:
+            if output_data.hotel_name:
+                context["hotel_name"] = output_data.hotel_name
+            _record(path)
+            return output_data
+
+        # Inconclusive: model hi faisla kare. self.instructions ko mutate nahi karte (concurrent runs),
+        # clone par hotel-specific instructions set hoti hain.
+        _record("model")
+        candidates = match_hotels(input)
+        instructions = hotels.get(candidates[0], "") if len(candidates) == 1 else ""
+        instructions = instructions or "Decide which of these hotels the query is about, if any: " + ", ".join(hotels) + "."
+        agent = _variants.get((id(self), instructions))
+        if agent is None:
+            agent = _variants[(id(self), instructions)] = self.clone(instructions=instructions)
+        # fast tier pehle; output validate na ho to agla (stronger) tier
+        result = await run_with_escalation(agent, input, label="hotel_classifier", context=context)
+        output_data = result.final_output
+        if isinstance(output_data, MyDataType) and output_data.hotel_name:
+            context["hotel_name"] = output_data.hotel_name
         return output_data
 
 # Instantiate the agent
@@ -0,0 +1,175 @@
+import json
+import math
+import os
+import random
+import re
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics.metrics import metrics
+
+# ----------------------------
+# Local learned router (replaces the triage LLM hop when confident)
+# ----------------------------
+# Features: word unigrams + bigrams and character 3-grams, hashed (crc32)
+# into a fixed number of buckets. Model: multinomial logistic regression
+# trained with plain SGD. Saved as JSON (no pickle) next to this file.
+#
+# route(text) returns "BotAgent"/"HumanAgent" when the top probability is
+# >= threshold, otherwise None and the caller falls back to triage_agent.
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "router_model.json")
+DEFAULT_DIMS = 1 << 18
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def features(text: str, dims: int = DEFAULT_DIMS) -> Dict[int, float]:
+    t = (text or "").lower()
+    words = _WORD.findall(t)
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {' '.join(words)} "
+    grams += [f"#{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    counts: Dict[int, float] = {}
+    for g in grams:
+        h = zlib.crc32(g.encode()) % dims
+        counts[h] = counts.get(h, 0.0) + 1.0
+    # L2 normalise so long messages don't get extreme logits
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+
+def _softmax(z: List[float]) -> List[float]:
+    m = max(z)
+    e = [math.exp(x - m) for x in z]
+    s = sum(e)
+    return [x / s for x in e]
+
+
+class LocalRouter:
+    def __init__(self, classes: Sequence[str], dims: int = DEFAULT_DIMS, threshold: float = 0.9):
+        self.classes = list(classes)
+        self.dims = dims
+        self.threshold = threshold
+        self.bias = [0.0] * len(self.classes)
+        # sparse weights: bucket -> per-class weights
+        self.weights: Dict[int, List[float]] = {}
+
+    # --- inference ---
+
+    def probabilities(self, text: str) -> List[float]:
+        z = list(self.bias)
+        for k, v in features(text, self.dims).items():
+            w = self.weights.get(k)
+            if w is not None:
+                for c in range(len(z)):
+                    z[c] += w[c] * v
+        return _softmax(z)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        p = self.probabilities(text)
+        best = max(range(len(p)), key=p.__getitem__)
+        return self.classes[best], p[best]
+
+    def route(self, text: str) -> Optional[str]:
+        started = time.perf_counter()
+        label, prob = self.predict(text)
+        metrics.observe("router_predict_s", time.perf_counter() - started)
+        if prob >= self.threshold:
+            metrics.incr("router_decisions_total", route="local", label=label)
+            return label
+        metrics.incr("router_decisions_total", route="fallback")
+        return None
+
+    # --- training ---
+
+    def fit(
+        self,
+        samples: Sequence[Tuple[str, str]],
+        epochs: int = 8,
+        lr: float = 0.5,
+        l2: float = 1e-6,
+        seed: int = 13,
+    ) -> "LocalRouter":
+        index = {c: i for i, c in enumerate(self.classes)}
+        data = [(features(text, self.dims), index[label]) for text, label in samples if label in index]
+        rng = random.Random(seed)
+        n_classes = len(self.classes)
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            step = lr / (1.0 + epoch)
+            for x, y in data:
+                z = list(self.bias)
+                for k, v in x.items():
+                    w = self.weights.get(k)
+                    if w is not None:
+                        for c in range(n_classes):
+                            z[c] += w[c] * v
+                p = _softmax(z)
+                for c in range(n_classes):
+                    g = p[c] - (1.0 if c == y else 0.0)
+                    self.bias[c] -= step * g
+                for k, v in x.items():
+                    w = self.weights.get(k)
+                    if w is None:
+                        w = self.weights[k] = [0.0] * n_classes
+                    for c in range(n_classes):
+                        w[c] -= step * ((p[c] - (1.0 if c == y else 0.0)) * v + l2 * w[c])
+        return self
+
+    # --- persistence ---
+
+    def save(self, path: str = DEFAULT_MODEL_PATH) -> None:
+        data = {
+            "classes": self.classes,
+            "dims": self.dims,
+            "threshold": self.threshold,
+            "bias": self.bias,
+            "weights": {str(k): [round(x, 6) for x in w] for k, w in self.weights.items()},
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "LocalRouter":
+        with open(path) as f:
+            data = json.load(f)
+        router = cls(data["classes"], data["dims"], data["threshold"])
+        router.bias = data["bias"]
+        router.weights = {int(k): w for k, w in data["weights"].items()}
+        return router
+
+    @classmethod
+    def load_if_exists(cls, path: Optional[str] = None) -> Optional["LocalRouter"]:
+        """Router from ``path`` (or $ROUTER_MODEL_PATH / the default file), None if not trained yet."""
+        path = path or os.getenv("ROUTER_MODEL_PATH", DEFAULT_MODEL_PATH)
+        return cls.load(path) if os.path.exists(path) else None
+
+
+# ----------------------------
+# Training data from support_bot.log
+# ----------------------------
+TRIAGE_MARKER = "triage_decision "
+
+
+def log_triage_decision(logger, customer_id: str, text: str, route: str) -> None:
+    """One parseable log line per LLM triage decision -- the router's training data."""
+    logger.info(TRIAGE_MARKER + json.dumps({"customer_id": customer_id, "text": text, "route": route}, ensure_ascii=False))
+
+
+def read_triage_log(lines: Iterable[str], labels: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+    samples = []
+    for line in lines:
+        pos = line.find(TRIAGE_MARKER)
+        if pos < 0:
+            continue
+        try:
+            row = json.loads(line[pos + len(TRIAGE_MARKER):])
+        except json.JSONDecodeError:
+            continue
+        text, route = row.get("text"), row.get("route")
+        if text and route and (labels is None or route in labels):
+            samples.append((text, route))
+    return samples
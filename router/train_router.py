@@ -0,0 +1,107 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+import zlib
+from typing import Any, Dict, List, Sequence, Tuple
+
+from router.local_router import DEFAULT_MODEL_PATH, LocalRouter, read_triage_log
+
+# ----------------------------
+# Train / evaluate the local router
+# ----------------------------
+#   python router/train_router.py --log support_bot.log            # train + report
+#   python router/train_router.py --jsonl labelled.jsonl           # {"text", "route"} per line
+#   python router/train_router.py --report-only --log support_bot.log
+
+ROUTES = ("BotAgent", "HumanAgent")
+
+
+def load_samples(args: argparse.Namespace) -> List[Tuple[str, str]]:
+    samples: List[Tuple[str, str]] = []
+    if args.log:
+        with open(args.log, encoding="utf-8", errors="replace") as f:
+            samples += read_triage_log(f, ROUTES)
+    if args.jsonl:
+        with open(args.jsonl, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    if row.get("route") in ROUTES and row.get("text"):
+                        samples.append((row["text"], row["route"]))
+    return samples
+
+
+def split(samples: Sequence[Tuple[str, str]], test_fraction: float) -> Tuple[List, List]:
+    """Deterministic split on a hash of the text, so duplicates never straddle train/test."""
+    train, test = [], []
+    for s in samples:
+        bucket = zlib.crc32(s[0].lower().encode()) % 1000
+        (test if bucket < test_fraction * 1000 else train).append(s)
+    return train, test
+
+
+def evaluate(router: LocalRouter, samples: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+    if not samples:
+        return {"samples": 0}
+    correct = covered = covered_correct = 0
+    confusion: Dict[str, Dict[str, int]] = {c: {p: 0 for p in router.classes} for c in router.classes}
+    started = time.perf_counter()
+    for text, label in samples:
+        pred, prob = router.predict(text)
+        confusion[label][pred] += 1
+        correct += pred == label
+        if prob >= router.threshold:
+            covered += 1
+            covered_correct += pred == label
+    per_message = (time.perf_counter() - started) / len(samples)
+    return {
+        "samples": len(samples),
+        "accuracy": round(correct / len(samples), 4),
+        "threshold": router.threshold,
+        "coverage": round(covered / len(samples), 4),
+        "accuracy_when_routed": round(covered_correct / covered, 4) if covered else None,
+        "predict_latency_us": round(per_message * 1e6, 1),
+        "confusion": confusion,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the local triage router from logged decisions")
+    parser.add_argument("--log", help="support_bot.log with triage_decision lines")
+    parser.add_argument("--jsonl", help='extra labelled data, one {"text", "route"} per line')
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--epochs", type=int, default=8)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--report-only", action="store_true", help="evaluate the saved model, don't retrain")
+    args = parser.parse_args()
+
+    samples = load_samples(args)
+    if not samples:
+        parser.error("no labelled triage decisions found (pass --log and/or --jsonl)")
+    train, test = split(samples, args.test_fraction)
+
+    if args.report_only:
+        router = LocalRouter.load(args.model)
+        report = {"model": args.model, "all": evaluate(router, samples)}
+    else:
+        started = time.perf_counter()
+        router = LocalRouter(ROUTES, threshold=args.threshold).fit(train, epochs=args.epochs)
+        train_s = time.perf_counter() - started
+        router.save(args.model)
+        report = {
+            "model": args.model,
+            "train_samples": len(train),
+            "train_seconds": round(train_s, 2),
+            "train": evaluate(router, train),
+            "test": evaluate(router, test),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
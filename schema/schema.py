@@ -1,5 +1,9 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class MyDataType(BaseModel):
-    is_query_about_hotel_sannata: bool
-    reason: str
\ No newline at end of file
+    is_query_about_hotel_sannata: bool = False
+    is_query_about_hotel: bool = False
+    hotel_name: Optional[str] = None
+    reason: str
@@ -0,0 +1,161 @@
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from metrics.metrics import metrics
+from serving.sinks import Send, Sink, as_sink
+
+# ----------------------------
+# Single-flight request coalescing
+# ----------------------------
+# During an incident hundreds of customers send "where is my order" within
+# seconds. Identical concurrent requests (same normalized text + the context
+# that changes the answer) share one in-flight run:
+#
+#   flight = SingleFlight("support")
+#   key = coalesce_key(text, degraded=False)          # None -> never shared
+#   result = await flight.do(key, run, share=lambda r: r.generic)
+#
+# The first caller (leader) runs; the rest (followers) await its result. If
+# share(result) says the answer was personal (e.g. a human handoff) or the
+# leader got cancelled, followers run on their own. Personalized paths are
+# kept out simply by returning key None for them.
+#
+# RecordingSink + replay() fan a streamed reply out: the leader streams as
+# usual while its frames are recorded, followers get the frames replayed.
+
+T = TypeVar("T")
+
+_PUNCT = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(_PUNCT.sub(" ", text.lower()).split())
+
+
+def coalesce_key(text: str, **context: Any) -> str:
+    """Normalized text plus the context values that change the answer."""
+    parts = [normalize_text(text)]
+    parts.extend(f"{k}={context[k]}" for k in sorted(context))
+    return "\x1f".join(parts)
+
+
+class SingleFlight:
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.unshared = 0
+        self.bypassed = 0
+        metrics.register_collector(f"singleflight:{name}", self.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.followers + self.bypassed
+        shared = self.followers - self.unshared
+        return {
+            "in_flight": len(self._inflight),
+            "requests": total,
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "followers_rerun": self.unshared,
+            "bypassed": self.bypassed,
+            # share of requests answered without their own run
+            "coalescing_ratio": round(shared / total, 4) if total else 0.0,
+        }
+
+    def _count(self, role: str) -> None:
+        metrics.incr("singleflight_requests_total", flight=self.name, role=role)
+
+    async def do(
+        self,
+        key: Optional[str],
+        fn: Callable[[], Awaitable[T]],
+        share: Callable[[T], bool] = lambda result: True,
+    ) -> T:
+        if key is None:
+            self.bypassed += 1
+            self._count("bypass")
+            return await fn()
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.followers += 1
+            self._count("follower")
+            try:
+                result = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # we were cancelled ourselves
+                result = None
+                shareable = False
+            else:
+                shareable = share(result)
+            if not shareable:
+                self.unshared += 1
+                self._count("rerun")
+                return await fn()
+            return result
+
+        self.leaders += 1
+        self._count("leader")
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # don't warn when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(result)
+        return result
+
+
+# ----------------------------
+# Record a leader's output, replay it to followers
+# ----------------------------
+Frame = Tuple[str, Tuple[Any, ...]]
+
+
+class RecordingSink(Sink):
+    """Forwards to ``inner`` and records every frame.
+
+    Always asks for deltas (so followers that stream get them); an inner sink
+    that doesn't stream gets the finished text via message() instead.
+    """
+
+    streams_deltas = True
+
+    def __init__(self, inner: Sink):
+        self.inner = inner
+        self.frames: List[Frame] = []
+        self._text: Dict[str, List[str]] = {}
+
+    async def message(self, text: str) -> None:
+        self.frames.append(("message", (text,)))
+        await self.inner.message(text)
+
+    async def delta(self, agent: str, text: str) -> None:
+        self.frames.append(("delta", (agent, text)))
+        if self.inner.streams_deltas:
+            await self.inner.delta(agent, text)
+        else:
+            self._text.setdefault(agent, []).append(text)
+
+    async def end(self, agent: str) -> None:
+        self.frames.append(("end", (agent,)))
+        if self.inner.streams_deltas:
+            await self.inner.end(agent)
+        else:
+            await self.inner.message(f"💬 ({agent}): " + "".join(self._text.pop(agent, [])))
+
+
+async def replay(frames: List[Frame], send: Optional[Send]) -> None:
+    sink = RecordingSink(as_sink(send))  # same delta/message adaptation as the leader got
+    for kind, args in frames:
+        await getattr(sink, kind)(*args)
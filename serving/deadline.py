@@ -0,0 +1,128 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from metrics.metrics import metrics
+
+# ----------------------------
+# Deadlines and per-stage budgets
+# ----------------------------
+# Every incoming message gets one deadline; every stage under it sees it
+# through a contextvar (tasks and SDK tool calls inherit it):
+#
+#   with message_deadline(20.0):                  # serving layer / handle_message
+#       async with stage("guardrails"): ...      # gets its share of what's left
+#       async with stage("agent"): ...
+#
+# A stage's budget is share x (remaining - FALLBACK_RESERVE_S), so there is
+# always time left to send a fallback reply before the deadline itself. When
+# a budget runs out the stage's awaits are cancelled and StageTimeout is
+# raised at the `async with`. Outside any deadline, stage() is a no-op.
+# Per stage: deadline_stage_s{stage}, deadline_timeouts_total{stage}.
+
+MESSAGE_DEADLINE_S = float(os.getenv("MESSAGE_DEADLINE_S", "25"))
+FALLBACK_RESERVE_S = float(os.getenv("DEADLINE_FALLBACK_RESERVE_S", "1.0"))
+
+# Share of the remaining budget (after the reserve) a stage may use.
+# Stages not listed get all of it.
+STAGE_SHARES: Dict[str, float] = {
+    "guardrails": 0.2,
+    "triage": 1.0,      # main_2 triage run includes the handed-off agent's answer
+    "tool": 0.3,
+    "bot_agent": 0.6,   # leave room for a human-agent run after a handoff
+    "agent": 1.0,
+}
+
+
+class StageTimeout(asyncio.TimeoutError):
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"stage '{stage}' ran out of its {budget:.2f}s budget")
+        self.stage = stage
+        self.budget = budget
+
+
+class Deadline:
+    __slots__ = ("at", "seconds")
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.at
+
+    def budget(self, stage: str, share: Optional[float] = None) -> float:
+        share = STAGE_SHARES.get(stage, 1.0) if share is None else share
+        return max(0.0, self.remaining() - FALLBACK_RESERVE_S) * share
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def message_deadline(seconds: Optional[float] = None):
+    """Start a deadline for this message unless one is already running (the outer one wins)."""
+    existing = _current.get()
+    if existing is not None:
+        yield existing
+        return
+    deadline = Deadline(MESSAGE_DEADLINE_S if seconds is None else seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def stage(name: str, share: Optional[float] = None):
+    """Run the body within ``name``'s share of the remaining budget; StageTimeout when it runs out."""
+    deadline = _current.get()
+    if deadline is None:
+        yield None
+        return
+    budget = deadline.budget(name, share)
+    started = time.monotonic()
+    timeout = asyncio.timeout(budget)
+    try:
+        async with timeout:
+            yield deadline
+    except TimeoutError:
+        if not timeout.expired():
+            raise  # raised by the body itself (e.g. a model call's own wait_for), not this budget
+    finally:
+        metrics.observe("deadline_stage_s", time.monotonic() - started, stage=name)
+    # expired() also catches bodies that swallowed the cancellation and returned early
+    if timeout.expired():
+        metrics.incr("deadline_timeouts_total", stage=name)
+        raise StageTimeout(name, budget)
+
+
+def budgeted(name: str = "tool", share: Optional[float] = None):
+    """Decorator for (async) tool functions: the call runs as stage ``name``. Put it under @function_tool."""
+
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        if not inspect.iscoroutinefunction(fn):
+            raise TypeError("budgeted() needs an async function; a sync call can't be cancelled")
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            async with stage(name, share):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
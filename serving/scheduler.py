@@ -0,0 +1,245 @@
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Union
+
+from metrics.metrics import metrics
+
+# ----------------------------
+# Priority + fair-queuing scheduler
+# ----------------------------
+# Sits in front of handle_message (serving.server uses it for every request):
+#
+#   async with scheduler.slot(customer_id, priority=LIVE):
+#       await handle_message(...)
+#
+#   * priority classes: escalation > live > batch; a free slot always goes to
+#     the highest class with someone waiting
+#   * inside a class, customers are served round-robin (one request each per
+#     turn), so one chatty customer or one batch job can't starve the others
+#   * bounded queues: per class and per customer. A full class sheds the
+#     newest waiter of a lower class to make room, otherwise the request is
+#     rejected with Overloaded; waiters older than the class' max_wait are
+#     shed too. Either way the caller gets a 429, never an unbounded wait.
+# Queue wait is observed per class (scheduler_queue_wait_s{priority=...}).
+
+ESCALATION = "escalation"
+LIVE = "live"
+BATCH = "batch"
+PRIORITIES = (ESCALATION, LIVE, BATCH)  # highest first
+
+DEFAULT_MAX_QUEUE = {ESCALATION: 64, LIVE: 64, BATCH: 256}
+DEFAULT_MAX_WAIT = {ESCALATION: None, LIVE: 30.0, BATCH: 300.0}
+
+
+class Overloaded(Exception):
+    def __init__(self, queue_depth: int, reason: str = "queue_full"):
+        super().__init__("overloaded")
+        self.queue_depth = queue_depth
+        self.reason = reason
+
+
+class Draining(Exception):
+    pass
+
+
+class _Waiter:
+    __slots__ = ("future", "customer_id", "priority", "enqueued")
+
+    def __init__(self, customer_id: str, priority: str):
+        self.future: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+        self.customer_id = customer_id
+        self.priority = priority
+        self.enqueued = time.monotonic()
+
+
+def _per_class(value: Union[int, float, None, Dict[str, Any]], default: Dict[str, Any]) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return {p: value.get(p, default[p]) for p in PRIORITIES}
+    if value is None:
+        return dict(default)
+    return {p: value for p in PRIORITIES}
+
+
+class FairScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_queue: Union[int, Dict[str, int], None] = None,
+        max_per_customer: int = 8,
+        max_wait: Union[float, Dict[str, Optional[float]], None] = None,
+    ):
+        """``max_queue`` / ``max_wait`` take one value for every class or a dict per class."""
+        self.max_concurrency = max_concurrency
+        self.max_queue_by_class: Dict[str, int] = _per_class(max_queue, DEFAULT_MAX_QUEUE)
+        self.max_wait: Dict[str, Optional[float]] = _per_class(max_wait, DEFAULT_MAX_WAIT)
+        self.max_per_customer = max_per_customer
+        # class -> customer -> FIFO of waiters; the OrderedDict order is the round-robin turn
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._depth: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.in_flight = 0
+        self.draining = False
+        self.shed: Dict[str, int] = {p: 0 for p in PRIORITIES}
+
+    # --- AdmissionController-compatible view (server stats / healthz) ---
+
+    @property
+    def queued(self) -> int:
+        return sum(self._depth.values())
+
+    @property
+    def max_queue(self) -> int:
+        return sum(self.max_queue_by_class.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queued": dict(self._depth),
+            "waiting_customers": {p: len(q) for p, q in self._queues.items()},
+            "shed": dict(self.shed),
+        }
+
+    # --- queue bookkeeping ---
+
+    def _push(self, w: _Waiter) -> None:
+        queue = self._queues[w.priority]
+        line = queue.get(w.customer_id)
+        if line is None:
+            line = queue[w.customer_id] = deque()
+        line.append(w)
+        self._depth[w.priority] += 1
+        metrics.set_gauge("scheduler_queue_depth", self._depth[w.priority], priority=w.priority)
+
+    def _remove(self, w: _Waiter) -> bool:
+        queue = self._queues[w.priority]
+        line = queue.get(w.customer_id)
+        if not line or w not in line:
+            return False
+        line.remove(w)
+        if not line:
+            del queue[w.customer_id]
+        self._depth[w.priority] -= 1
+        metrics.set_gauge("scheduler_queue_depth", self._depth[w.priority], priority=w.priority)
+        return True
+
+    def _pop_next(self) -> Optional[_Waiter]:
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            if not queue:
+                continue
+            customer, line = next(iter(queue.items()))
+            w = line.popleft()
+            if line:
+                queue.move_to_end(customer)  # next customer's turn
+            else:
+                del queue[customer]
+            self._depth[priority] -= 1
+            metrics.set_gauge("scheduler_queue_depth", self._depth[priority], priority=priority)
+            return w
+        return None
+
+    def _shed(self, w: _Waiter, reason: str) -> None:
+        self.shed[w.priority] += 1
+        metrics.incr("scheduler_shed_total", priority=w.priority, reason=reason)
+        if not w.future.done():
+            w.future.set_exception(Overloaded(self._depth[w.priority], reason))
+
+    def _shed_expired(self) -> None:
+        now = time.monotonic()
+        for priority in PRIORITIES:
+            limit = self.max_wait[priority]
+            if limit is None or not self._depth[priority]:
+                continue
+            for line in list(self._queues[priority].values()):
+                while line and now - line[0].enqueued > limit:
+                    w = line[0]
+                    self._remove(w)
+                    self._shed(w, "max_wait")
+
+    def _make_room(self, priority: str) -> bool:
+        """Evict the newest waiter of the lowest class below ``priority``; False if there is none."""
+        for lower in reversed(PRIORITIES[PRIORITIES.index(priority) + 1:]):
+            queue = self._queues[lower]
+            if queue:
+                newest = max((line[-1] for line in queue.values()), key=lambda w: w.enqueued)
+                self._remove(newest)
+                self._shed(newest, "preempted")
+                return True
+        return False
+
+    def _dispatch(self) -> None:
+        self._shed_expired()
+        while self.in_flight < self.max_concurrency:
+            w = self._pop_next()
+            if w is None:
+                break
+            if w.future.done():  # cancelled while waiting
+                continue
+            self.in_flight += 1
+            w.future.set_result(True)
+        self._maybe_idle()
+
+    def _maybe_idle(self) -> None:
+        if self.in_flight == 0 and self.queued == 0:
+            self._idle.set()
+
+    # --- public API ---
+
+    @contextlib.asynccontextmanager
+    async def slot(self, customer_id: str = "anonymous", priority: str = LIVE):
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {PRIORITIES}")
+        if self.draining:
+            raise Draining()
+        self._idle.clear()
+        started = time.monotonic()
+
+        if self.in_flight < self.max_concurrency and not any(self._depth[p] for p in PRIORITIES[: PRIORITIES.index(priority) + 1]):
+            self.in_flight += 1  # free slot and nobody of equal/higher class ahead
+        else:
+            self._shed_expired()
+            line = self._queues[priority].get(customer_id)
+            if line is not None and len(line) >= self.max_per_customer:
+                self._reject(priority, "customer_queue_full")
+            if self._depth[priority] >= self.max_queue_by_class[priority] and not self._make_room(priority):
+                self._reject(priority, "queue_full")
+            w = _Waiter(customer_id, priority)
+            self._push(w)
+            try:
+                await w.future
+            except asyncio.CancelledError:
+                if not self._remove(w) and w.future.done() and not w.future.cancelled() and w.future.exception() is None:
+                    # granted just as we were cancelled: hand the slot on
+                    self.in_flight -= 1
+                    self._dispatch()
+                self._maybe_idle()
+                raise
+            except Overloaded:
+                self._maybe_idle()
+                raise
+
+        metrics.observe("scheduler_queue_wait_s", time.monotonic() - started, priority=priority)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def _reject(self, priority: str, reason: str) -> None:
+        self.shed[priority] += 1
+        metrics.incr("scheduler_shed_total", priority=priority, reason=reason)
+        self._maybe_idle()
+        raise Overloaded(self._depth[priority], reason)
+
+    async def drain(self, timeout: float) -> bool:
+        """Stop admitting and wait for queued + in-flight runs. Returns True if fully drained."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
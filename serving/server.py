@@ -0,0 +1,605 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import signal
+import struct
+import time
+from importlib import import_module
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from agents import Agent, InputGuardrailTripwireTriggered, ItemHelpers, RunConfig, Runner
+from openai.types.responses import ResponseCompletedEvent, ResponseTextDeltaEvent
+
+import customer_support_bot
+from metrics.metrics import metrics
+from metrics.memory import memory_monitor
+from metrics.profiler import profiler
+from metrics.usage import usage_scope
+from model_layer.usage import UsageModel
+from serving.deadline import MESSAGE_DEADLINE_S, StageTimeout, message_deadline, stage
+from serving.scheduler import BATCH, ESCALATION, LIVE, Draining, FairScheduler, Overloaded
+from serving.sinks import CallbackSink, Send, StreamStats, WebSocketSink, as_sink
+
+# ----------------------------
+# Async HTTP / WebSocket front-end
+# ----------------------------
+# Stdlib-only (asyncio streams) so it runs anywhere the bot runs.
+#
+#   POST /v1/<app>/messages   {"text": ..., "customer_id": ...}  -> chunked NDJSON stream
+#   GET  /v1/<app>/ws         WebSocket, one JSON message per request, streamed replies
+#
+# Requests go through serving.scheduler.FairScheduler: negative-sentiment
+# messages run as "escalation", the rest as "live"; clients may send
+# "priority": "batch" to be scheduled below live chat (never above it).
+# Each request runs under a deadline (--deadline, serving/deadline.py) that
+# starts when the request arrives -- time spent queued for a slot counts --
+# and is seen by every stage of the app.
+#
+# Replies: {"type": "message", "text"} for whole messages, {"type": "delta",
+# "agent", "text"} per model token chunk then {"type": "message_end", "agent"},
+# and finally {"type": "done", "latency_ms"} or {"type": "error", ...}.
+#   GET  /healthz             liveness + queue state (503 while draining)
+#   GET  /metrics             metrics.snapshot() as JSON
+#   GET  /admin/profiling     profiler settings (metrics/profiler.py)
+#   POST /admin/profiling     {"rate": 0.01, "mode": "sample"|"cprofile", "interval_ms": 5} -> new settings
+#                             (rate 0 = off). No auth: keep --host on a private interface.
+#   GET  /admin/memory?top=20 fresh memory sample + top allocators (metrics/memory.py)
+#   POST /admin/memory        {"tracemalloc": <frames>} starts allocation tracing, 0 stops it
+#
+# Apps: "support" -> customer_support_bot.handle_message, "hotel" -> dynamic_assign hotel_assistant.
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+App = Callable[[str, str, Send], Awaitable[None]]
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    503: "Service Unavailable",
+}
+
+
+# ----------------------------
+# Apps
+# ----------------------------
+async def support_app(text: str, customer_id: str, send: Send) -> None:
+    await customer_support_bot.handle_message(text, customer_id, send=send)
+
+
+class AgentApp:
+    """Runs an Agent with Runner.run_streamed and forwards text deltas to the sink.
+
+    ``target`` is "module:attribute" and is imported on first use, so a broken
+    or heavy agent module doesn't stop the rest of the server from starting.
+    """
+
+    def __init__(self, target: str, run_config: Optional[RunConfig] = None):
+        self.target = target
+        self.run_config = run_config
+        self._agent: Optional[Agent] = None
+
+    def agent(self) -> Agent:
+        if self._agent is None:
+            module, attr = self.target.split(":")
+            self._agent = getattr(import_module(module), attr)
+        return self._agent
+
+    async def __call__(self, text: str, customer_id: str, send: Send) -> None:
+        agent = self.agent()
+        # before run_streamed: its background task must inherit the profile context
+        with profiler.profile("agent_run", customer=customer_id, agent=agent.name):
+            await self._stream(agent, text, customer_id, send)
+
+    async def _stream(self, agent: Agent, text: str, customer_id: str, send: Send) -> None:
+        sink = as_sink(send)
+        stats = StreamStats(agent.name)
+        with usage_scope(agent=agent.name):  # the run's task copies this context
+            result = Runner.run_streamed(
+                agent,
+                input=text,
+                context={"customer_id": customer_id, "user_text": text},
+                run_config=self.run_config,
+            )
+        try:
+            async with stage("agent"):
+                async for event in result.stream_events():
+                    if event.type == "raw_response_event":
+                        if isinstance(event.data, ResponseTextDeltaEvent):
+                            stats.on_delta(event.data.delta)
+                            if sink.streams_deltas:
+                                await sink.delta(agent.name, event.data.delta)
+                        elif isinstance(event.data, ResponseCompletedEvent) and event.data.response.usage:
+                            stats.on_usage(event.data.response.usage.output_tokens)
+                    elif event.type == "run_item_stream_event" and event.item.type == "message_output_item":
+                        if sink.streams_deltas:
+                            await sink.end(agent.name)
+                        else:
+                            await sink.message(ItemHelpers.text_message_output(event.item))
+        except StageTimeout:
+            result.cancel()
+            await sink.message(TIMEOUT_REPLY)
+        except InputGuardrailTripwireTriggered as e:
+            # pipeline guardrails (guardrail/pipeline.py) put their Verdict in output_info
+            info = e.guardrail_result.output.output_info
+            await sink.message(getattr(info, "message", None) or BLOCKED_REPLY)
+        finally:
+            stats.finish()
+
+
+TIMEOUT_REPLY = "Sorry, this is taking longer than expected. Please try again in a moment."
+BLOCKED_REPLY = "Sorry, I can't help with that message."
+
+
+def default_apps(run_config: Optional[RunConfig] = None) -> Dict[str, App]:
+    return {
+        "support": support_app,
+        "hotel": AgentApp("dynamic_assign.dynamic:hotel_assistant", run_config=run_config),
+    }
+
+
+# ----------------------------
+# WebSocket framing (RFC 6455, server side)
+# ----------------------------
+def _ws_accept(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return head + payload
+
+
+def _unmask(payload: bytes, mask: bytes) -> bytes:
+    n = len(payload)
+    if not n:
+        return payload
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+
+
+async def _ws_read_frame(reader: asyncio.StreamReader) -> Tuple[bool, int, bytes]:
+    b1, b2 = await reader.readexactly(2)
+    length = b2 & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_BODY_BYTES:
+        raise ValueError("frame too large")
+    mask = await reader.readexactly(4) if b2 & 0x80 else b""
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = _unmask(payload, mask)
+    return bool(b1 & 0x80), b1 & 0x0F, payload
+
+
+class WebSocket:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    async def send_json(self, data: Dict[str, Any]) -> None:
+        self.writer.write(_ws_frame(0x1, json.dumps(data, ensure_ascii=False).encode()))
+        await self.writer.drain()
+
+    async def receive_text(self) -> Optional[str]:
+        """Next complete text message, or None once the peer closes."""
+        parts = []
+        while True:
+            fin, opcode, payload = await _ws_read_frame(self.reader)
+            if opcode == 0x8:
+                await self.close()
+                return None
+            if opcode == 0x9:
+                self.writer.write(_ws_frame(0xA, payload))
+                await self.writer.drain()
+                continue
+            if opcode == 0xA:
+                continue
+            parts.append(payload)
+            if fin:
+                return b"".join(parts).decode("utf-8")
+
+    async def close(self, code: int = 1000) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        with contextlib.suppress(Exception):
+            self.writer.write(_ws_frame(0x8, struct.pack("!H", code)))
+            await self.writer.drain()
+
+
+# ----------------------------
+# Server
+# ----------------------------
+class SupportServer:
+    def __init__(
+        self,
+        apps: Optional[Dict[str, App]] = None,
+        max_concurrency: int = 16,
+        max_queue: Optional[int] = None,
+        drain_timeout: float = 30.0,
+        max_per_customer: int = 8,
+        deadline_s: float = MESSAGE_DEADLINE_S,
+    ):
+        """``max_queue``: per priority class (None = scheduler defaults)."""
+        self.apps = apps if apps is not None else default_apps()
+        self.admission = FairScheduler(max_concurrency, max_queue, max_per_customer=max_per_customer)
+        self.drain_timeout = drain_timeout
+        self.deadline_s = deadline_s
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._websockets: Set[WebSocket] = set()
+        metrics.register_collector("server", self.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        a = self.admission
+        return {
+            **a.stats(),
+            "connections": len(self._connections),
+            "websockets": len(self._websockets),
+            "draining": a.draining,
+        }
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        self._server = await asyncio.start_server(self._on_connection, host, port, limit=MAX_HEADER_BYTES)
+        return self._server
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1] if self._server else 0
+
+    async def shutdown(self) -> None:
+        """Stop accepting, let in-flight runs finish (up to drain_timeout), then close everything."""
+        if self._server is not None:
+            self._server.close()
+        drained = await self.admission.drain(self.drain_timeout)
+        metrics.incr("server_shutdowns_total", drained=drained)
+        for ws in list(self._websockets):
+            await ws.close(1001)
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        metrics.unregister_collector("server")
+
+    # --- connection handling ---
+
+    async def _on_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            await self._handle(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self._connections.discard(task)
+            with contextlib.suppress(Exception):
+                writer.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        path = target.split("?", 1)[0]
+
+        if path == "/healthz":
+            status = 503 if self.admission.draining else 200
+            body = {"status": "draining" if self.admission.draining else "ok", **self.stats()}
+            return await self._send_json(writer, status, body)
+        if path == "/metrics":
+            return await self._send_json(writer, 200, metrics.snapshot())
+        if path == "/admin/profiling":
+            return await self._profiling(method, headers, reader, writer)
+        if path == "/admin/memory":
+            return await self._memory(method, target, headers, reader, writer)
+
+        parts = path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "v1" or parts[1] not in self.apps:
+            return await self._send_json(writer, 404, {"error": "not found"})
+        app_name, action = parts[1], parts[2]
+
+        if action == "ws" and headers.get("upgrade", "").lower() == "websocket":
+            return await self._websocket(app_name, headers, reader, writer)
+        if action == "messages":
+            if method != "POST":
+                return await self._send_json(writer, 405, {"error": "use POST"})
+            return await self._http_message(app_name, headers, reader, writer)
+        return await self._send_json(writer, 404, {"error": "not found"})
+
+    async def _profiling(self, method: str, headers: Dict[str, str], reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if method == "GET":
+            return await self._send_json(writer, 200, profiler.stats())
+        if method != "POST":
+            return await self._send_json(writer, 405, {"error": "use GET or POST"})
+        raw = await self._read_body(headers, reader, writer)
+        if raw is None:
+            return
+        try:
+            data = json.loads(raw or b"{}")
+            settings = profiler.configure(
+                rate=data.get("rate"), mode=data.get("mode"), interval_ms=data.get("interval_ms")
+            )
+        except (ValueError, TypeError, AttributeError) as e:
+            return await self._send_json(writer, 400, {"error": str(e)})
+        metrics.incr("profiler_reconfigured_total")
+        return await self._send_json(writer, 200, settings)
+
+    async def _memory(self, method: str, target: str, headers: Dict[str, str], reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if method == "POST":
+            raw = await self._read_body(headers, reader, writer)
+            if raw is None:
+                return
+            try:
+                frames = int(json.loads(raw or b"{}").get("tracemalloc", 0))
+            except (ValueError, TypeError, AttributeError) as e:
+                return await self._send_json(writer, 400, {"error": str(e)})
+            if frames > 0:
+                memory_monitor.start_tracing(frames)
+            else:
+                memory_monitor.stop_tracing()
+            return await self._send_json(writer, 200, memory_monitor.stats())
+        if method != "GET":
+            return await self._send_json(writer, 405, {"error": "use GET or POST"})
+        query = dict(p.split("=", 1) for p in target.partition("?")[2].split("&") if "=" in p)
+        try:
+            top = max(1, min(200, int(query.get("top", 20))))
+        except ValueError:
+            return await self._send_json(writer, 400, {"error": "'top' must be an integer"})
+        # heap walk + snapshot take a while; keep the event loop serving meanwhile
+        loop = asyncio.get_running_loop()
+        stats = await loop.run_in_executor(None, memory_monitor.sample)
+        stats["top_allocators"] = await loop.run_in_executor(None, memory_monitor.top_allocators, top)
+        return await self._send_json(writer, 200, stats)
+
+    async def _read_body(self, headers: Dict[str, str], reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Optional[bytes]:
+        """The request body, or None after answering 400 (bad Content-Length) / 413 (too large)."""
+        try:
+            length = int(headers.get("content-length") or 0)
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            await self._send_json(writer, 400, {"error": "invalid Content-Length"})
+            return None
+        if length > MAX_BODY_BYTES:
+            await self._send_json(writer, 413, {"error": "body too large"})
+            return None
+        return await reader.readexactly(length)
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, body: Dict[str, Any], extra: str = "") -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode()
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"{extra}"
+                "Connection: close\r\n\r\n"
+            ).encode()
+            + payload
+        )
+        await writer.drain()
+
+    async def _reject(self, writer: asyncio.StreamWriter, app_name: str, exc: Exception) -> None:
+        if isinstance(exc, Overloaded):
+            metrics.incr("server_rejected_total", app=app_name, reason="overloaded")
+            await self._send_json(
+                writer, 429, {"error": "overloaded", "reason": exc.reason, "queue_depth": exc.queue_depth},
+                extra="Retry-After: 1\r\n",
+            )
+        else:
+            metrics.incr("server_rejected_total", app=app_name, reason="draining")
+            await self._send_json(writer, 503, {"error": "shutting down"})
+
+    @staticmethod
+    def _parse_request(raw: bytes) -> Tuple[str, str, str]:
+        data = json.loads(raw or b"{}")
+        text = data.get("text")
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("'text' is required")
+        priority = data.get("priority") or LIVE
+        if priority not in (LIVE, BATCH):
+            raise ValueError("'priority' must be \"live\" or \"batch\"")
+        return text, str(data.get("customer_id") or "anonymous"), priority
+
+    @staticmethod
+    def _priority(app_name: str, text: str, requested: str) -> str:
+        # Gussa/shikayat wale messages routine FAQs ke peeche intezar nahi karte
+        if app_name == "support" and customer_support_bot.is_negative_sentiment(text):
+            return ESCALATION
+        return requested
+
+    async def _run(self, app_name: str, text: str, customer_id: str, send: Send, transport: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            with usage_scope(customer=customer_id):
+                await self.apps[app_name](text, customer_id, send)
+            return {"type": "done", "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except ConnectionError:
+            # client went away mid-stream
+            status = "disconnected"
+            raise
+        except Exception as e:
+            status = "error"
+            return {"type": "error", "error": str(e)}
+        finally:
+            metrics.incr("server_requests_total", app=app_name, transport=transport, status=status)
+            metrics.observe("server_request_latency_s", time.perf_counter() - started, app=app_name)
+
+    async def _http_message(self, app_name: str, headers: Dict[str, str], reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        raw = await self._read_body(headers, reader, writer)
+        if raw is None:
+            return
+        try:
+            text, customer_id, priority = self._parse_request(raw)
+        except ValueError as e:
+            return await self._send_json(writer, 400, {"error": str(e)})
+
+        async def write_chunk(obj: Dict[str, Any]) -> None:
+            line = json.dumps(obj, ensure_ascii=False).encode() + b"\n"
+            writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+            await writer.drain()
+
+        send = CallbackSink(
+            on_message=lambda text: write_chunk({"type": "message", "text": text}),
+            on_delta=lambda agent, text: write_chunk({"type": "delta", "agent": agent, "text": text}),
+            on_end=lambda agent: write_chunk({"type": "message_end", "agent": agent}),
+        )
+
+        try:
+            # started before admission: queue wait is part of the message's budget
+            with message_deadline(self.deadline_s):
+                async with self.admission.slot(customer_id, self._priority(app_name, text, priority)):
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\n"
+                        b"Content-Type: application/x-ndjson\r\n"
+                        b"Transfer-Encoding: chunked\r\n"
+                        b"Connection: close\r\n\r\n"
+                    )
+                    final = await self._run(app_name, text, customer_id, send, "http")
+                    await write_chunk(final)
+                    writer.write(b"0\r\n\r\n")
+                    await writer.drain()
+        except (Overloaded, Draining) as e:
+            await self._reject(writer, app_name, e)
+
+    async def _websocket(self, app_name: str, headers: Dict[str, str], reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        key = headers.get("sec-websocket-key")
+        if not key:
+            return await self._send_json(writer, 400, {"error": "missing Sec-WebSocket-Key"})
+        writer.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {_ws_accept(key)}\r\n\r\n"
+            ).encode()
+        )
+        await writer.drain()
+
+        ws = WebSocket(reader, writer)
+        self._websockets.add(ws)
+        try:
+            while not ws.closed:
+                raw = await ws.receive_text()
+                if raw is None:
+                    break
+                try:
+                    text, customer_id, priority = self._parse_request(raw.encode())
+                except ValueError as e:
+                    await ws.send_json({"type": "error", "status": 400, "error": str(e)})
+                    continue
+
+                send = WebSocketSink(ws)
+
+                try:
+                    with message_deadline(self.deadline_s):
+                        async with self.admission.slot(customer_id, self._priority(app_name, text, priority)):
+                            await ws.send_json(await self._run(app_name, text, customer_id, send, "ws"))
+                except Overloaded as e:
+                    metrics.incr("server_rejected_total", app=app_name, reason="overloaded")
+                    await ws.send_json(
+                        {"type": "error", "status": 429, "error": "overloaded", "reason": e.reason, "queue_depth": e.queue_depth}
+                    )
+                except Draining:
+                    metrics.incr("server_rejected_total", app=app_name, reason="draining")
+                    await ws.send_json({"type": "error", "status": 503, "error": "shutting down"})
+                    await ws.close(1001)
+        finally:
+            self._websockets.discard(ws)
+
+
+# ----------------------------
+# Entry point: python serving/server.py --port 8080 [--mock]
+# ----------------------------
+async def serve(args: argparse.Namespace) -> None:
+    run_config = None
+    if args.mock:
+        from model_layer.mock_model import MockModel
+
+        mock = UsageModel(MockModel(latency=args.mock_latency))  # usage booked under the running agent
+        customer_support_bot.use_model(mock)
+        run_config = RunConfig(model=mock, tracing_disabled=True)
+
+    if args.profile_rate is not None:
+        profiler.configure(rate=args.profile_rate, mode=args.profile_mode, directory=args.profile_dir)
+
+    memory_monitor.start(args.memory_interval)
+    memory_monitor.install_signal()
+
+    server = SupportServer(
+        default_apps(run_config),
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        drain_timeout=args.drain_timeout,
+        max_per_customer=args.max_per_customer,
+        deadline_s=args.deadline,
+    )
+    await server.start(args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.port} (apps: {', '.join(server.apps)})")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    print("Shutting down, draining in-flight requests...")
+    await server.shutdown()
+    memory_monitor.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP/WebSocket front-end for the support bot and hotel assistant")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=None, help="queue bound per priority class (default: 64/64/256)")
+    parser.add_argument("--max-per-customer", type=int, default=8, help="queued requests per customer_id")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--deadline", type=float, default=MESSAGE_DEADLINE_S, help="seconds per message, all stages included")
+    parser.add_argument("--profile-rate", type=float, default=None, help="fraction of requests to profile (default PROFILE_SAMPLE_RATE)")
+    parser.add_argument("--profile-mode", choices=("sample", "cprofile"), default=None)
+    parser.add_argument("--profile-dir", default=None)
+    parser.add_argument("--memory-interval", type=float, default=None, help="seconds between memory samples (default MEMORY_INTERVAL_S, 0 = off)")
+    parser.add_argument(
+        "--mock", action="store_true", help="use MockModel instead of Gemini (no network; GEMINI_API_KEY must still be set, any value)"
+    )
+    parser.add_argument("--mock-latency", type=float, default=0.0)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import inspect
+import sys
+import time
+from typing import Any, Callable, Dict, Optional, Union
+
+from metrics.metrics import metrics
+
+# ----------------------------
+# Output sinks
+# ----------------------------
+# Agent output goes to a Sink instead of print(), so the same run can stream
+# to a terminal, a WebSocket or any async callback:
+#   message(text)       whole message / notice (FAQ answer, queue ticket, ...)
+#   delta(agent, text)  one text delta from a streaming model response
+#   end(agent)          the message those deltas belonged to is complete
+# Sinks with streams_deltas = False only ever get message(); callers then
+# send the finished text instead.
+
+
+class Sink:
+    streams_deltas = False
+
+    async def message(self, text: str) -> None:
+        raise NotImplementedError
+
+    async def delta(self, agent: str, text: str) -> None:
+        pass
+
+    async def end(self, agent: str) -> None:
+        pass
+
+
+async def _call(fn: Callable[..., Any], *args: Any) -> None:
+    result = fn(*args)
+    if inspect.isawaitable(result):
+        await result
+
+
+class StdoutSink(Sink):
+    streams_deltas = True
+
+    def __init__(self, stream: Any = None):
+        self.stream = stream or sys.stdout
+        self._open: Optional[str] = None
+
+    async def message(self, text: str) -> None:
+        if self._open:
+            await self.end(self._open)
+        print(text, file=self.stream, flush=True)
+
+    async def delta(self, agent: str, text: str) -> None:
+        if self._open != agent:
+            if self._open:
+                await self.end(self._open)
+            print(f"💬 ({agent}): ", end="", file=self.stream)
+            self._open = agent
+        print(text, end="", file=self.stream, flush=True)
+
+    async def end(self, agent: str) -> None:
+        if self._open:
+            print(file=self.stream, flush=True)
+            self._open = None
+
+
+class CallbackSink(Sink):
+    """Sync or async callables: ``on_message(text)`` and, for token streaming, ``on_delta(agent, text)``."""
+
+    def __init__(
+        self,
+        on_message: Callable[[str], Any],
+        on_delta: Optional[Callable[[str, str], Any]] = None,
+        on_end: Optional[Callable[[str], Any]] = None,
+    ):
+        self.on_message = on_message
+        self.on_delta = on_delta
+        self.on_end = on_end
+        self.streams_deltas = on_delta is not None
+
+    async def message(self, text: str) -> None:
+        await _call(self.on_message, text)
+
+    async def delta(self, agent: str, text: str) -> None:
+        if self.on_delta is not None:
+            await _call(self.on_delta, agent, text)
+
+    async def end(self, agent: str) -> None:
+        if self.on_end is not None:
+            await _call(self.on_end, agent)
+
+
+class WebSocketSink(Sink):
+    """JSON frames on anything with ``async send_json(dict)`` (serving.server.WebSocket)."""
+
+    streams_deltas = True
+
+    def __init__(self, ws: Any):
+        self.ws = ws
+
+    async def message(self, text: str) -> None:
+        await self.ws.send_json({"type": "message", "text": text})
+
+    async def delta(self, agent: str, text: str) -> None:
+        await self.ws.send_json({"type": "delta", "agent": agent, "text": text})
+
+    async def end(self, agent: str) -> None:
+        await self.ws.send_json({"type": "message_end", "agent": agent})
+
+
+# send=None -> stdout, a Sink, or a plain callable that gets whole messages
+Send = Union[Sink, Callable[[str], Any]]
+
+
+def as_sink(send: Optional[Send]) -> Sink:
+    if send is None:
+        return StdoutSink()
+    if isinstance(send, Sink):
+        return send
+    return CallbackSink(send)
+
+
+async def emit(send: Optional[Send], text: str) -> None:
+    await as_sink(send).message(text)
+
+
+# ----------------------------
+# Time-to-first-token and tokens/sec per agent
+# ----------------------------
+class StreamStats:
+    def __init__(self, agent: str):
+        self.agent = agent
+        self.started = time.monotonic()
+        self.first_at: Optional[float] = None
+        self.chars = 0
+        self.output_tokens = 0
+
+    def on_delta(self, text: str) -> None:
+        if self.first_at is None:
+            self.first_at = time.monotonic()
+            metrics.observe("stream_ttft_s", self.first_at - self.started, agent=self.agent)
+        self.chars += len(text)
+
+    def on_usage(self, output_tokens: int) -> None:
+        self.output_tokens += output_tokens or 0
+
+    def finish(self) -> Dict[str, Any]:
+        if self.first_at is None:
+            return {}
+        # provider usage when the stream reported it, else the same chars/4 estimate as everywhere else
+        tokens = self.output_tokens or max(1, self.chars // 4)
+        elapsed = max(time.monotonic() - self.first_at, 1e-6)
+        metrics.incr("stream_output_tokens_total", tokens, agent=self.agent)
+        metrics.observe("stream_tokens_per_s", tokens / elapsed, agent=self.agent)
+        return {"ttft_s": round(self.first_at - self.started, 4), "tokens": tokens, "tokens_per_s": round(tokens / elapsed, 1)}
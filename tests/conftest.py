@@ -0,0 +1,27 @@
+import logging
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config/config.py refuses to import without a key; tests never reach Gemini (MockModel only)
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+# main_2.py calls logging.basicConfig(filename="support_bot.log"); a configured root logger makes that a no-op
+logging.getLogger().addHandler(logging.NullHandler())
+
+
+@pytest.fixture
+def mock_model():
+    """Every customer_support_bot agent on MockModel for the test; restored afterwards."""
+    import customer_support_bot
+    from model_layer.mock_model import MockModel
+
+    saved = customer_support_bot.run_config, customer_support_bot.model_breaker
+    model = MockModel()
+    customer_support_bot.use_model(model)
+    yield model
+    customer_support_bot.run_config, customer_support_bot.model_breaker = saved
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import math
+
+import pytest
+from agents.tool_context import ToolContext
+
+from Math_Function_Tool import array_math
+from Math_Function_Tool.array_math import MathInputError, aggregate, describe, elementwise, evaluate
+
+
+@pytest.fixture(params=["python", "numpy"], autouse=True)
+def backend(request, monkeypatch):
+    """Every test runs on plain Python and, when it is installed, on numpy."""
+    if request.param == "numpy":
+        monkeypatch.setattr(array_math, "np", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(array_math, "np", None)
+    return request.param
+
+
+def values(result):
+    return describe(result)["values"]
+
+
+def test_aggregate():
+    stats = aggregate([1, 2, 3, 4], ["count", "sum", "mean", "product", "min", "max", "median", "var"])
+    assert stats == {"count": 4.0, "sum": 10.0, "mean": 2.5, "product": 24.0, "min": 1.0, "max": 4.0, "median": 2.5, "var": 1.25}
+    assert aggregate([0.1] * 10, ["sum"])["sum"] == pytest.approx(1.0, abs=1e-12)
+    assert aggregate([], ["count", "sum", "product"]) == {"count": 0.0, "sum": 0.0, "product": 1.0}
+    assert aggregate([1e308, 1e308], ["product"]) == {"product": None}  # inf is not JSON
+    with pytest.raises(MathInputError):
+        aggregate([], ["mean"])
+    with pytest.raises(MathInputError, match="unknown stats"):
+        aggregate([1], ["mode"])
+
+
+def test_elementwise():
+    assert values(elementwise("mul", [1, 2, 3], [4, 5, 6])) == [4.0, 10.0, 18.0]
+    assert values(elementwise("add", [1, 2], scalar=0.5)) == [1.5, 2.5]
+    assert values(elementwise("cumsum", [1, 2, 3])) == [1.0, 3.0, 6.0]
+    assert values(elementwise("div", [1, 0], scalar=0)) == [None, None]  # inf / nan
+    assert values(elementwise("sqrt", [4, -1])) == [2.0, None]
+    with pytest.raises(MathInputError, match="length mismatch"):
+        elementwise("add", [1, 2], [1, 2, 3])
+    with pytest.raises(MathInputError, match="exactly one"):
+        elementwise("add", [1], [1], scalar=1)
+    with pytest.raises(MathInputError, match="exponent"):
+        elementwise("pow", [2], scalar=10_000)
+    with pytest.raises(MathInputError, match="unknown op"):
+        elementwise("xor", [1], [1])
+
+
+def test_describe_truncates_but_summarises_everything():
+    out = describe(elementwise("add", list(range(1500)), scalar=0), limit=10)
+    assert out["count"] == 1500 and out["truncated"] and len(out["values"]) == 10
+    assert out["sum"] == sum(range(1500))
+    assert describe(3.0) == {"result": 3.0}
+
+
+def test_evaluate():
+    prices, quantities = [10.0, 20.0, 30.0], [1.0, 2.0, 3.0]
+    assert evaluate("sum(x * y) / sum(y)", x=prices, y=quantities) == pytest.approx(140 / 6)
+    assert evaluate("2 ^ 10 + max(x) - min(3, 4)", x=prices) == 1024 + 30 - 3
+    assert evaluate("round(pi * 100) / 100") == 3.14
+    assert values(evaluate("-x + len(x)", x=prices)) == [-7.0, -17.0, -27.0]
+    assert math.isnan(evaluate("sqrt(-1)"))
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "__import__('os').system('true')",
+        "x.__class__",
+        "(lambda: 1)()",
+        "[1, 2]",
+        "sum(x=1)",
+        "z + 1",
+        "2 ** 10 ** 10",
+        "1 +" * 200 + "1",
+        "9" * 400 + " ** 2",
+        "1 +",
+    ],
+)
+def test_evaluate_refuses(expression):
+    with pytest.raises(MathInputError):
+        evaluate(expression, x=[1.0])
+
+
+def test_tools_return_errors_to_the_model():
+    from Math_Function_Tool.math_function_tool import aggregate_numbers, evaluate_expression
+
+    def call(tool, **args):
+        ctx = ToolContext(context=None, tool_name=tool.name, tool_call_id="call_1")
+        return asyncio.run(tool.on_invoke_tool(ctx, json.dumps(args)))
+
+    assert call(aggregate_numbers, values=[1, 2, 3], stats=["sum"]) == {"sum": 6.0}
+    assert "error" in call(evaluate_expression, expression="open('x')")
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+from batch.batch_runner import BatchRunner, recover_output
+
+
+def write_input(path, n):
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": i, "text": f"message {i}"}) + "\n")
+
+
+def read_rows(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def run_batch(tmp_path, handler, n=20, **kwargs):
+    inp, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    if not inp.exists():
+        write_input(inp, n)
+    runner = BatchRunner(str(inp), str(out), handler, concurrency=4, checkpoint_every=3, **kwargs)
+    return asyncio.run(runner.run()), out
+
+
+def test_runs_every_record_once(tmp_path):
+    seen = []
+
+    async def handler(text, customer_id):
+        seen.append(text)
+        return text.upper()
+
+    stats, out = run_batch(tmp_path, handler)
+    assert stats == {"processed": 20, "skipped": 0, "failed": 0}
+    assert sorted(seen) == sorted(f"message {i}" for i in range(20))
+    assert {r["id"] for r in read_rows(out)} == set(range(20))
+
+
+def test_resume_after_crash_skips_finished_records(tmp_path):
+    calls = []
+
+    async def crashing(text, customer_id):
+        calls.append(text)
+        if text == "message 12":
+            raise KeyboardInterrupt  # not caught per record: ends the run like a crash
+        await asyncio.sleep(0)
+        return "ok"
+
+    try:
+        run_batch(tmp_path, crashing)
+    except KeyboardInterrupt:
+        pass
+    finished = {r["id"] for r in read_rows(tmp_path / "out.jsonl")}
+    assert finished and 12 not in finished
+
+    rerun = []
+
+    async def handler(text, customer_id):
+        rerun.append(int(text.split()[1]))
+        return "ok"
+
+    stats, out = run_batch(tmp_path, handler)
+    assert not set(rerun) & finished  # no record paid for twice
+    assert {r["id"] for r in read_rows(out)} == set(range(20))
+    assert stats["processed"] == 20 - len(finished)
+
+
+def test_retry_errors_reruns_failures_below_the_watermark(tmp_path):
+    async def flaky(text, customer_id):
+        if text == "message 1":
+            raise RuntimeError("model down")
+        return "ok"
+
+    stats, out = run_batch(tmp_path, flaky)
+    assert stats["failed"] == 1
+    failed = next(r["offset"] for r in read_rows(out) if not r["ok"])
+    with open(str(out) + ".ckpt") as f:
+        assert json.load(f)["watermark"] > failed
+
+    rerun = []
+
+    async def handler(text, customer_id):
+        rerun.append(text)
+        return "ok"
+
+    stats, _ = run_batch(tmp_path, handler)
+    assert rerun == []  # without the flag failures stay as they are
+
+    stats, _ = run_batch(tmp_path, handler, retry_errors=True)
+    assert rerun == ["message 1"]
+    assert stats["processed"] == 1
+
+    stats, _ = run_batch(tmp_path, handler, retry_errors=True)
+    assert rerun == ["message 1"]  # the retry's ok line wins over the old failure
+
+
+def test_torn_last_line_is_truncated(tmp_path):
+    out = tmp_path / "out.jsonl"
+    out.write_bytes(b'{"offset": 0, "ok": true}\n{"offset": 17, "ok"')
+    start, done = recover_output(str(out), 0, False)
+    assert (start, done) == (0, {0})
+    assert out.read_bytes() == b'{"offset": 0, "ok": true}\n'
@@ -0,0 +1,71 @@
+import json
+import sys
+
+import pytest
+
+import customer_support_bot as bot
+from guardrail import bulk_moderation
+from guardrail.bulk_moderation import moderate, moderate_iter
+
+MESSAGES = [
+    "You are an IDIOT and this is the worst service",
+    "Mera order kab aayega?",
+    "Thank you, all good",
+    None,
+    "bkwas band karo, refund now",
+]
+
+
+@pytest.fixture(params=["python", "numpy"], autouse=True)
+def backend(request, monkeypatch):
+    """Every test runs on plain Python and, when it is installed, on numpy."""
+    if request.param == "numpy":
+        np = pytest.importorskip("numpy")
+        if not hasattr(np, "strings"):
+            pytest.skip("numpy.strings needs numpy 2")
+        monkeypatch.setattr(bulk_moderation, "np", np)
+    else:
+        monkeypatch.setattr(bulk_moderation, "np", None)
+    return request.param
+
+
+def column(result, name):
+    return [bool(v) if not name.endswith("_score") else int(v) for v in result[name]]
+
+
+def test_flags_and_scores():
+    result = moderate(MESSAGES)
+    assert len(result) == 5
+    assert column(result, "offensive") == [True, False, False, False, True]
+    assert column(result, "negative") == [True, False, False, False, True]
+    assert column(result, "negative_score") == [1, 0, 0, 0, 2]  # "bkwas" + "refund now"
+    assert column(result, "order_intent") == [False, True, False, False, False]
+    assert result.summary() == {"offensive": 2, "negative": 2, "order_intent": 1}
+
+
+def test_matches_the_live_guard():
+    texts = [m or "" for m in MESSAGES] + ["very bad experience", "cancel karo abhi", "sab theek hai"]
+    assert column(moderate(texts), "negative") == [bot.is_negative_sentiment(t) for t in texts]
+
+
+def test_custom_lexicon_and_rows():
+    result = moderate(["Hotel Pearl is great"], {"hotel": ["pearl", "PEARL", "serena"]})
+    assert list(result.rows()) == [{"hotel": True, "hotel_score": 1}]  # duplicate terms count once
+
+
+def test_chunks_cover_every_message():
+    chunks = list(moderate_iter(iter(MESSAGES * 3), chunk_size=4))
+    assert [len(c) for c in chunks] == [4, 4, 4, 3]
+    assert sum(c.summary()["offensive"] for c in chunks) == 6
+
+
+def test_cli_writes_one_row_per_line(tmp_path, monkeypatch, capsys):
+    src = tmp_path / "transcripts.jsonl"
+    src.write_text("".join(json.dumps({"text": m}) + "\n" for m in MESSAGES) + "not json\n", encoding="utf-8")
+    out = tmp_path / "flags.jsonl"
+    monkeypatch.setattr(sys, "argv", ["bulk_moderation", str(src), "--field", "text", "--out", str(out), "--chunk-size", "2"])
+    bulk_moderation.main()
+    report = json.loads(capsys.readouterr().out)
+    assert report["messages"] == 6 and report["flagged"]["offensive"] == 2
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert len(rows) == 6 and rows[0]["offensive"] is True and rows[-1]["offensive"] is False
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+from agents.tool_context import ToolContext
+
+from dynamic_assign.catalogue import HotelCatalogue, HotelRecord
+
+SANNATA = {
+    "name": "Hotel Sannata",
+    "owner": "Mr. Ratan Lal",
+    "total_rooms": 200,
+    "blocked_rooms": 20,
+    "amenities": ["Free Wi-Fi", "Breakfast", "Gym", "Pool"],
+    "address": "Main Bazar, Karachi",
+}
+
+
+def test_get_returns_the_old_dict_shape():
+    cat = HotelCatalogue([SANNATA, {"name": "Hotel Empty"}])
+    assert cat.get("hotel sannata") == SANNATA
+    assert cat["hotel empty"] == {"name": "Hotel Empty"}  # unknown fields left out
+    assert cat.get("missing", "x") == "x"
+    assert "hotel sannata" in cat and len(cat) == 2
+    assert cat.public_capacity_at(cat.row_of("hotel sannata")) == 180
+    assert cat.public_capacity_at(cat.row_of("hotel empty")) is None
+
+
+def test_upsert_merges_and_ignores_none():
+    cat = HotelCatalogue([SANNATA])
+    key = cat.upsert({"name": "  HOTEL   sannata ", "total_rooms": 210, "owner": None, "phone": "+92-1"})
+    assert key == "hotel sannata" and len(cat) == 1
+    rec = cat[key]
+    assert rec["total_rooms"] == 210
+    assert rec["owner"] == "Mr. Ratan Lal"
+    assert rec["phone"] == "+92-1"
+    with pytest.raises(ValueError):
+        cat.upsert({"owner": "nobody"})
+
+
+def test_amenities_are_deduplicated_and_rewritten():
+    cat = HotelCatalogue([SANNATA, {"name": "Other", "amenities": ["Spa"]}])
+    cat.upsert({"name": "Hotel Sannata", "amenities": ["Gym", "Gym", "Spa"]})
+    assert cat["hotel sannata"]["amenities"] == ["Gym", "Spa"]
+    cat.upsert({"name": "Hotel Sannata", "amenities": ["Pool", "Sauna", "Spa", "Gym", "Bar"]})
+    assert cat["hotel sannata"]["amenities"] == ["Pool", "Sauna", "Spa", "Gym", "Bar"]
+    assert cat["other"]["amenities"] == ["Spa"]  # relocating one row's amenities leaves the others alone
+    assert cat.amenity_vocab.count("Spa") == 1
+
+
+def test_listeners_see_row_and_previous_values():
+    cat = HotelCatalogue()
+    events = []
+    cat.subscribe(lambda row, old: events.append((row, old)))
+    cat.upsert({"name": "A", "total_rooms": 5})
+    cat.upsert({"name": "a", "total_rooms": 6})
+    assert events == [(0, None), (0, {"name": "A", "total_rooms": 5})]
+
+
+def test_records_round_trip():
+    cat = HotelCatalogue([SANNATA, {"name": "Hotel Blue Bay", "total_rooms": 120}])
+    copy = HotelCatalogue.from_records(cat.to_records())
+    assert dict(copy.items()) == dict(cat.items())
+    assert cat.to_record("hotel sannata") == HotelRecord(**SANNATA)
+
+
+def test_iter_names_pages():
+    cat = HotelCatalogue({"name": f"Hotel {i}"} for i in range(10))
+    assert list(cat.iter_names(3, 4)) == ["Hotel 3", "Hotel 4", "Hotel 5", "Hotel 6"]
+    assert list(cat.iter_names(8, 5)) == ["Hotel 8", "Hotel 9"]
+    assert list(cat.iter_names(20, 5)) == []
+
+
+def test_list_hotels_tool_pages_through_the_catalogue():
+    from dynamic_assign import dynamic
+
+    def page(offset, limit):
+        ctx = ToolContext(context={}, tool_name="list_hotels", tool_call_id="c")
+        return asyncio.run(dynamic.list_hotels.on_invoke_tool(ctx, json.dumps({"offset": offset, "limit": limit})))
+
+    names, offset = [], 0
+    while offset is not None:
+        result = page(offset, 2)
+        names += result["hotels"]
+        offset = result["next_offset"]
+    assert names == list(dynamic.HOTEL_DB.iter_names())
+    assert result["total"] == len(dynamic.HOTEL_DB)
@@ -0,0 +1,166 @@
+import asyncio
+import types
+
+import pytest
+from agents import Agent, RunConfig, Runner
+
+from model_layer import circuit_breaker, rate_limiter
+from model_layer.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerModel,
+    CircuitGateModel,
+    CircuitOpenError,
+)
+from model_layer.mock_model import MockModel
+from model_layer.rate_limiter import AdaptiveLimiter, RateLimitedModel
+
+
+class Unavailable(Exception):
+    status_code = 503
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def breaker(**kwargs):
+    options = dict(window=10, min_calls=4, failure_rate=0.5, open_seconds=30.0, half_open_probes=2)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_on_failure_rate_only_after_min_calls(clock):
+    b = breaker()
+    for _ in range(3):
+        b.record(False, 0.1)
+    assert b.state == CLOSED  # 3 calls < min_calls
+    b.record(True, 0.1)
+    assert b.state == OPEN  # 3/4 failed
+
+    b = breaker()
+    for ok in (True, True, True, False):
+        b.record(ok, 0.1)
+    assert b.state == CLOSED  # 1/4 < 0.5
+    b.record(False, 0.1)
+    assert b.state == CLOSED  # 2/5
+    b.record(False, 0.1)
+    assert b.state == OPEN  # 3/6 >= 0.5
+
+
+def test_opens_on_slow_calls(clock):
+    b = breaker(slow_call_seconds=5.0, slow_call_rate=0.5)
+    for latency in (6.0, 0.1, 7.0, 0.1):
+        b.record(True, latency)
+    assert b.state == OPEN
+
+
+def test_open_rejects_then_half_open_probes_close_it(clock):
+    b = breaker()
+    for _ in range(4):
+        b.record(False, 0.1)
+    assert b.is_open()
+    clock[0] += 10
+    with pytest.raises(CircuitOpenError) as e:
+        b.allow()
+    assert e.value.retry_in == pytest.approx(20.0)
+
+    clock[0] += 20
+    assert b.stats()["state"] == HALF_OPEN
+    b.allow(), b.allow()
+    assert b.is_open()  # both probe slots taken
+    with pytest.raises(CircuitOpenError):
+        b.allow()
+    b.record(True, 0.1)
+    assert b.state == HALF_OPEN
+    b.record(True, 0.1)
+    assert b.state == CLOSED
+    assert b.stats()["calls_in_window"] == 0
+
+
+def test_failed_probe_reopens(clock):
+    b = breaker()
+    for _ in range(4):
+        b.record(False, 0.1)
+    clock[0] += 30
+    b.allow()
+    b.record(False, 0.1)
+    assert b.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        b.allow()
+
+
+def test_released_probe_frees_its_slot(clock):
+    b = breaker(half_open_probes=1)
+    for _ in range(4):
+        b.record(False, 0.1)
+    clock[0] += 30
+    b.allow()
+    assert b.is_open()
+    b.release()
+    assert not b.is_open()
+
+
+def test_model_wrapper_fails_fast_while_open():
+    failing = [True]
+
+    def reply(prompt):
+        if failing[0]:
+            raise ConnectionError("provider down")
+        return "ok"
+
+    mock = MockModel(reply=reply)
+    b = breaker(open_seconds=60.0)
+    agent = Agent(name="Bot", instructions="answer", model=CircuitBreakerModel(mock, b))
+    config = RunConfig(tracing_disabled=True)
+
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            asyncio.run(Runner.run(agent, "hi", run_config=config))
+    assert b.state == OPEN and mock.calls == 4
+
+    failing[0] = False
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(Runner.run(agent, "hi", run_config=config))
+    assert mock.calls == 4  # the provider was not called
+
+
+def test_breaker_inside_the_limiter_sees_every_attempt_and_not_the_queue(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_backoff", lambda attempt, error: 0.0)
+
+    def reply(prompt):
+        raise Unavailable("provider down")
+
+    mock = MockModel(reply=reply)
+    b = breaker(min_calls=3, open_seconds=60.0, slow_call_seconds=0.05)
+    limiter = AdaptiveLimiter(initial_concurrency=1, max_concurrency=1)
+    model = CircuitGateModel(RateLimitedModel(CircuitBreakerModel(mock, b), limiter, max_retries=2), b)
+    agent = Agent(name="Bot", instructions="answer", model=model)
+    config = RunConfig(tracing_disabled=True)
+
+    with pytest.raises(Unavailable):
+        asyncio.run(Runner.run(agent, "hi", run_config=config))
+    assert mock.calls == 3 and b.state == OPEN  # each retried attempt was recorded
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(Runner.run(agent, "hi", run_config=config))
+    assert mock.calls == 3 and limiter.concurrency._classes["default"].granted == 3  # rejected before a permit
+
+    # waiting for a permit is not provider latency
+    b = breaker(min_calls=2, slow_call_seconds=0.05)
+    model = RateLimitedModel(CircuitBreakerModel(MockModel(reply=lambda p: "ok"), b), limiter)
+
+    async def main():
+        await limiter.concurrency.acquire("hold")
+        calls = [asyncio.create_task(model.get_response(None, "hi", None, [], None, [], None)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        limiter.concurrency.release()
+        await asyncio.gather(*calls)
+
+    asyncio.run(main())
+    assert b.state == CLOSED and b.stats()["slow_rate"] == 0.0
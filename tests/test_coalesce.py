@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+import customer_support_bot as bot
+from serving.coalesce import RecordingSink, SingleFlight, coalesce_key, normalize_text, replay
+from serving.sinks import CallbackSink
+
+
+def test_key_ignores_case_and_punctuation_but_not_context():
+    assert normalize_text("Where's my   ORDER?!") == "where s my order"
+    assert coalesce_key("Return policy?", degraded=False) == coalesce_key("return  policy", degraded=False)
+    assert coalesce_key("return policy", degraded=False) != coalesce_key("return policy", degraded=True)
+
+
+async def _gather(flight, key, fn, n, share=lambda result: True):
+    return await asyncio.gather(*(flight.do(key, fn, share=share) for _ in range(n)))
+
+
+def test_concurrent_identical_requests_share_one_run():
+    flight = SingleFlight("test-share")
+    runs = []
+
+    async def fn():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    assert asyncio.run(_gather(flight, "k", fn, 5)) == ["answer"] * 5
+    assert len(runs) == 1
+    stats = flight.stats()
+    assert (stats["leaders"], stats["followers"], stats["in_flight"]) == (1, 4, 0)
+    assert stats["coalescing_ratio"] == 0.8
+
+    asyncio.run(_gather(flight, "k", fn, 1))  # finished flights are not cached
+    assert len(runs) == 2
+
+
+def test_unshareable_result_makes_followers_run_their_own():
+    flight = SingleFlight("test-unshared")
+    runs = []
+
+    async def fn():
+        runs.append(1)
+        n = len(runs)
+        await asyncio.sleep(0.01)
+        return n
+
+    results = asyncio.run(_gather(flight, "k", fn, 3, share=lambda result: False))
+    assert len(runs) == 3 and sorted(results) == [1, 2, 3]
+    assert flight.stats()["followers_rerun"] == 2
+
+
+def test_leader_error_reaches_followers_and_none_key_bypasses():
+    flight = SingleFlight("test-error")
+    runs = []
+
+    async def fail():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        raise LookupError("down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, LookupError) for r in asyncio.run(main()))
+    assert len(runs) == 1
+
+    with pytest.raises(LookupError):
+        asyncio.run(flight.do(None, fail))
+    assert flight.stats()["bypassed"] == 1 and len(runs) == 2
+
+
+def test_cancelled_leader_lets_followers_run():
+    flight = SingleFlight("test-cancel")
+    runs = []
+
+    async def fn():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        leader = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(main()) == ["answer", "answer"]
+    assert len(runs) == 3  # the leader, then each follower on its own
+
+
+def test_replay_gives_followers_the_leaders_frames():
+    streamed, leader_messages, messages = [], [], []
+
+    async def main():
+        recorder = RecordingSink(CallbackSink(leader_messages.append, on_delta=lambda agent, text: streamed.append(text)))
+        for piece in ("Hel", "lo"):
+            await recorder.delta("BotAgent", piece)
+        await recorder.end("BotAgent")
+        await recorder.message("ticket T-1")
+        await replay(recorder.frames, messages.append)  # a follower that doesn't stream
+
+    asyncio.run(main())
+    assert streamed == ["Hel", "lo"] and leader_messages == ["ticket T-1"]
+    assert messages == ["💬 (BotAgent): Hello", "ticket T-1"]
+
+
+def test_support_bot_coalesces_identical_questions(mock_model):
+    mock_model.latency = 0.05
+    before = bot.support_flight.stats()
+    replies = {f"CUST-C{i}": [] for i in range(4)}
+
+    async def main():
+        await asyncio.gather(
+            *(bot.handle_message("Kya aap gift wrapping karte hain?", c, send=r.append) for c, r in replies.items())
+        )
+
+    asyncio.run(main())
+    assert mock_model.calls == 1
+    assert all(r and r == replies["CUST-C0"] for r in replies.values())
+    stats = bot.support_flight.stats()
+    assert stats["followers"] - before["followers"] == 3
@@ -0,0 +1,60 @@
+import asyncio
+
+import agents
+from openai.types.responses import ResponseFunctionToolCall
+
+import customer_support_bot as bot
+from model_layer.mock_model import MockModel
+
+
+def test_runs_on_the_real_sdk():
+    # the import fallback must only kick in without the SDK, never for a config error
+    assert bot.Runner is agents.Runner
+    assert bot.Agent is agents.Agent
+
+
+def test_language_guardrail_blocks_the_support_word_list():
+    assert not bot.language_guardrail("Tum log bkwas ho")
+    assert not bot.language_guardrail("you IDIOT")
+    assert bot.language_guardrail("that was a dumb question, sorry")  # not on the support bot's list
+
+
+def test_model_reply_comes_from_mock_model(mock_model):
+    replies = []
+    asyncio.run(bot.handle_message("Kya aap gift wrapping karte hain?", "CUST-T1", send=replies.append))
+    assert mock_model.calls == 1
+    assert any("(MOCK)" in r for r in replies)
+
+
+class HandoffModel(MockModel):
+    """BotAgent answers with a handoff call to HumanAgent; every other agent with text."""
+
+    def __init__(self):
+        super().__init__(reply=lambda prompt: "HANDOFF" if self.calls == 1 else "Human agent here.")
+        self.inputs = []
+
+    async def stream_response(self, system_instructions, input, *args, **kwargs):
+        self.inputs.append(input)
+        async for event in super().stream_response(system_instructions, input, *args, **kwargs):
+            yield event
+
+    def _message(self, text):
+        if text == "HANDOFF":
+            return ResponseFunctionToolCall(type="function_call", call_id="call_1", name="transfer_to_humanagent", arguments="{}")
+        return MockModel._message(text)
+
+
+def test_handoff_stops_the_bot_and_escalates_with_its_history():
+    model = HandoffModel()
+    saved = bot.run_config, bot.model_breaker
+    bot.use_model(model)
+    replies = []
+    try:
+        asyncio.run(bot.handle_message("Mujhe is masle me madad chahiye", "CUST-T2", send=replies.append))
+    finally:
+        bot.run_config, bot.model_breaker = saved
+    assert model.calls == 2
+    assert replies == ["💬 (HumanAgent): Human agent here."]
+    # the human run gets the customer's text, not the bot's dangling handoff call
+    assert isinstance(model.inputs[1], list)
+    assert not any(isinstance(item, dict) and item.get("type") == "function_call" for item in model.inputs[1])
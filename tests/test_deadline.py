@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+import customer_support_bot as bot
+from model_layer.mock_model import MockModel
+from serving.deadline import FALLBACK_RESERVE_S, StageTimeout, current_deadline, message_deadline, stage
+from serving.server import SupportServer
+from tests.test_server import post
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_stage_is_a_no_op_without_a_deadline():
+    async def main():
+        async with stage("agent") as d:
+            return d
+
+    assert run(main()) is None
+
+
+def test_stage_budget_is_its_share_of_what_is_left():
+    async def main():
+        with message_deadline(11.0) as d:
+            budget = d.budget("guardrails")
+            assert budget == pytest.approx((11.0 - FALLBACK_RESERVE_S) * 0.2, abs=0.05)
+            assert d.budget("agent") == pytest.approx(11.0 - FALLBACK_RESERVE_S, abs=0.05)
+
+    run(main())
+
+
+def test_outer_deadline_wins():
+    with message_deadline(5.0) as outer:
+        with message_deadline(60.0) as inner:
+            assert inner is outer
+            assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_stage_raises_stage_timeout_when_its_budget_runs_out():
+    async def main():
+        with message_deadline(FALLBACK_RESERVE_S + 0.05):
+            async with stage("agent"):
+                await asyncio.sleep(1)
+
+    with pytest.raises(StageTimeout) as e:
+        run(main())
+    assert e.value.stage == "agent"
+
+
+def test_stage_reraises_timeouts_raised_by_the_body():
+    async def main():
+        with message_deadline(30.0):
+            async with stage("agent"):
+                await asyncio.wait_for(asyncio.sleep(1), 0.01)  # e.g. CircuitBreakerModel's call timeout
+
+    with pytest.raises(TimeoutError) as e:
+        run(main())
+    assert not isinstance(e.value, StageTimeout)
+
+
+def test_timeout_inside_bot_stream_hands_off_instead_of_crashing():
+    def timing_out(text):
+        raise TimeoutError("model call timed out")
+
+    saved = bot.run_config
+    bot.use_model(MockModel(reply=timing_out))
+    try:
+        replies = []
+        queued = len(bot.HUMAN_QUEUE)
+        run(bot.handle_message("Kya aap gift wrapping karte hain?", "CUST-DL1", send=replies.append))
+    finally:
+        bot.run_config = saved
+    assert len(bot.HUMAN_QUEUE) == queued + 1
+    assert bot.HUMAN_QUEUE[-1]["reason"] == "agent_failed"
+    assert any("human agent" in r for r in replies)
+
+
+def test_server_deadline_counts_queue_wait():
+    seen = []
+
+    async def slow_app(text, customer_id, send):
+        seen.append(current_deadline().remaining())
+        await asyncio.sleep(0.3)
+        await send("ok")
+
+    async def main():
+        server = SupportServer({"slow": slow_app}, max_concurrency=1, deadline_s=10.0, drain_timeout=1.0)
+        await server.start("127.0.0.1", 0)
+        try:
+            body = {"text": "hi"}
+            return await asyncio.gather(
+                post(server.port, "/v1/slow/messages", {**body, "customer_id": "A"}),
+                post(server.port, "/v1/slow/messages", {**body, "customer_id": "B"}),
+            )
+        finally:
+            await server.shutdown()
+
+    results = run(main())
+    assert all(status == 200 for status, _ in results)
+    first, second = sorted(seen, reverse=True)
+    assert first > 9.5
+    assert second < 9.8  # waited ~0.3s for the slot out of its own budget
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from guardrail.pipeline import FAIL_CLOSED_REPLY, LOCAL, MODEL, Guard, GuardrailPipeline
+from guardrail.word_lists import MATH_OFFENSIVE_WORDS
+from serving.deadline import FALLBACK_RESERVE_S, message_deadline
+
+_names = iter(range(10_000))
+
+
+def pipeline(guards, **kwargs):
+    return GuardrailPipeline(guards, name=f"test-{next(_names)}", **kwargs)
+
+
+def run(p, text="hello"):
+    return asyncio.run(p.run(text))
+
+
+def boom(text):
+    raise RuntimeError("classifier down")
+
+
+async def model_boom(text):
+    raise RuntimeError("classifier down")
+
+
+def test_local_guards_run_cheapest_first_and_stop_at_first_trip():
+    order = []
+
+    def guard(name, result=None):
+        def check(text):
+            order.append(name)
+            return result
+        return check
+
+    async def expensive(text):
+        order.append("model")
+
+    p = pipeline([
+        Guard("model", expensive, cost=MODEL),
+        Guard("regex", guard("regex", "blocked"), cost=5),
+        Guard("words", guard("words"), cost=LOCAL),
+    ])
+    verdict = run(p)
+    assert not verdict and verdict.guard == "regex" and verdict.message == "blocked"
+    assert order == ["words", "regex"]
+
+
+def test_expensive_guards_run_concurrently_and_first_trip_cancels_the_rest():
+    cancelled = []
+
+    async def slow(text):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def quick_trip(text):
+        await asyncio.sleep(0.01)
+        return "nope"
+
+    p = pipeline([Guard("slow", slow, cost=MODEL), Guard("quick", quick_trip, cost=MODEL)])
+    verdict = run(p)
+    assert verdict.guard == "quick"
+    assert cancelled == ["slow"]
+
+
+def test_dependencies_are_respected():
+    order = []
+
+    async def first(text):
+        await asyncio.sleep(0.02)
+        order.append("first")
+
+    async def second(text):
+        order.append("second")
+
+    p = pipeline([Guard("second", second, cost=MODEL, depends_on=["first"]), Guard("first", first, cost=MODEL)])
+    assert run(p)
+    assert order == ["first", "second"]
+    with pytest.raises(ValueError):
+        pipeline([Guard("a", first, depends_on=["missing"])])
+    with pytest.raises(ValueError):
+        pipeline([Guard("a", first, depends_on=["b"]), Guard("b", first, depends_on=["a"])])
+
+
+def test_model_guards_fail_closed_and_local_guards_fail_open():
+    closed = run(pipeline([Guard("classifier", model_boom, cost=MODEL)]))
+    assert not closed and closed.message == FAIL_CLOSED_REPLY
+    assert run(pipeline([Guard("words", boom, cost=LOCAL)]))
+    # explicit choices win over the cost-based default
+    assert run(pipeline([Guard("classifier", model_boom, cost=MODEL, fail_closed=False)]))
+    assert not run(pipeline([Guard("words", boom, cost=LOCAL, fail_closed=True)]))
+    assert run(pipeline([Guard("classifier", model_boom, cost=MODEL)], fail_closed=False))
+
+
+def test_guardrail_timeout_blocks_when_a_model_guard_is_pending():
+    async def hang(text):
+        await asyncio.sleep(5)
+
+    async def main(p):
+        with message_deadline(FALLBACK_RESERVE_S + 0.1):
+            return await p.run("hello")
+
+    verdict = asyncio.run(main(pipeline([Guard("classifier", hang, cost=MODEL)])))
+    assert not verdict and verdict.guard == "timeout"
+    assert asyncio.run(main(pipeline([Guard("classifier", hang, cost=MODEL, fail_closed=False)])))
+
+
+def test_math_input_guardrail_uses_its_word_list():
+    from guardrail.input_guardrail import input_guardrails, offensive_language
+
+    for word in MATH_OFFENSIVE_WORDS:
+        assert offensive_language(f"you are {word.upper()}")
+    assert offensive_language("you are dumb")
+    assert offensive_language("bkwas sawal hai") is None  # Roman-Urdu insults are the support bot's list
+    assert offensive_language("what is 2 + 2?") is None
+    assert input_guardrails.guards["policies"].fail_closed
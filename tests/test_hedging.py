@@ -0,0 +1,88 @@
+import asyncio
+
+from agents import Agent, RunConfig, Runner
+
+from model_layer.hedging import HedgeBudget, HedgedModel
+from model_layer.mock_model import MockModel
+
+CONFIG = RunConfig(tracing_disabled=True)
+
+
+def slow_first(slow: float = 0.5, fast: float = 0.01):
+    """Latency for MockModel: the 1st, 3rd, ... call is slow, the one after it fast."""
+    n = [0]
+
+    def latency():
+        n[0] += 1
+        return slow if n[0] % 2 else fast
+
+    return latency
+
+
+def hedged(mock, **kwargs):
+    model = HedgedModel(mock, agent="test", min_delay=0.02, min_samples=5, **kwargs)
+    model._latencies.extend([0.02] * 5)  # warm history: p95 = 20ms
+    return model
+
+
+def test_budget_earns_per_call_and_caps_at_burst():
+    budget = HedgeBudget(ratio=0.5, burst=2.0)
+    assert budget.spend() and budget.spend() and not budget.spend()
+    budget.earn()
+    assert not budget.spend()
+    budget.earn()
+    assert budget.spend()
+    for _ in range(10):
+        budget.earn()
+    assert budget.credit == 2.0
+
+
+def test_no_hedge_without_history():
+    mock = MockModel(latency=slow_first(slow=0.05))
+    model = HedgedModel(mock, agent="test", min_samples=5)
+    agent = Agent(name="Bot", instructions="answer", model=model)
+    asyncio.run(Runner.run(agent, "hi", run_config=CONFIG))
+    assert mock.calls == 1 and model.hedges == 0
+    assert len(model._latencies) == 1
+
+
+def test_slow_call_is_hedged_and_the_faster_answer_wins():
+    mock = MockModel(latency=slow_first())
+    model = hedged(mock)
+    agent = Agent(name="Bot", instructions="answer", model=model)
+
+    async def timed():
+        started = asyncio.get_running_loop().time()
+        result = await Runner.run(agent, "hi", run_config=CONFIG)
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(timed())
+    assert result.final_output == "(MOCK) hi"
+    assert elapsed < 0.3
+    assert mock.calls == 2
+    assert (model.hedges, model.wins) == (1, 1)
+
+
+def test_budget_caps_hedges():
+    mock = MockModel(latency=slow_first(slow=0.1))
+    model = hedged(mock, budget_ratio=0.0, budget_burst=1.0)
+    agent = Agent(name="Bot", instructions="answer", model=model)
+    for _ in range(2):
+        asyncio.run(Runner.run(agent, "hi", run_config=CONFIG))
+    assert model.hedges == 1  # the second slow call waits it out
+    assert mock.calls == 3
+
+
+def test_streams_hedge_on_first_event():
+    mock = MockModel(latency=slow_first())
+    model = hedged(mock)
+    agent = Agent(name="Bot", instructions="answer", model=model)
+
+    async def main():
+        result = Runner.run_streamed(agent, "hi", run_config=CONFIG)
+        async for _ in result.stream_events():
+            pass
+        return result.final_output
+
+    assert asyncio.run(main()) == "(MOCK) hi"
+    assert (model.hedges, model.wins) == (1, 1)
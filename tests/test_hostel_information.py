@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import pytest
+
+import config.config
+from model_layer.mock_model import MockModel
+from my_agent import hostel_information as hi
+
+
+@pytest.fixture
+def classifier_model(monkeypatch):
+    """The model run_with_escalation gets for every tier: answers Hotel Pearl as JSON."""
+    model = MockModel(reply=lambda text: json.dumps(
+        {"hotel_name": "Hotel Pearl", "is_query_about_hotel": True, "is_query_about_hotel_sannata": False, "reason": "model"}
+    ))
+    monkeypatch.setattr(config.config, "model_for", lambda *args, **kwargs: model)
+    return model
+
+
+def test_matcher_finds_known_names_case_and_space_insensitively():
+    assert hi.match_hotels("Is HOTEL  sannata open?") == ["Hotel Sannata"]
+    assert hi.match_hotels("compare hotel pearl with hotel serena") == ["Hotel Pearl", "Hotel Serena"]
+    assert hi.match_hotels("hotelsannata") == []
+
+
+@pytest.mark.parametrize(
+    "query, context, hotel, path",
+    [
+        ("Check-in time at Hotel Sannata?", {}, "Hotel Sannata", "query"),
+        ("What time is breakfast?", {"hotel_name": "Hotel Serena"}, "Hotel Serena", "context"),
+        ("What is the weather today?", {}, None, "no_hotel"),
+        ("Hotel Pearl or Hotel Serena, which is cheaper?", {}, None, "model"),
+        ("Is Hotel Mehran any good?", {}, None, "model"),
+    ],
+)
+def test_classify_locally(query, context, hotel, path):
+    output, got_path = hi.classify_locally(query, context)
+    assert got_path == path
+    if path == "model":
+        assert output is None
+    else:
+        assert output.hotel_name == hotel
+        assert output.is_query_about_hotel == (hotel is not None)
+
+
+def test_model_only_runs_when_inconclusive(classifier_model):
+    context = {}
+    out = asyncio.run(hi.guardrial_agent.run("Is Hotel Sannata near the beach?", context))
+    assert out.hotel_name == "Hotel Sannata" and classifier_model.calls == 0
+    assert context["hotel_name"] == "Hotel Sannata"
+
+    out = asyncio.run(hi.guardrial_agent.run("Hotel Pearl ya Hotel Serena?", context))
+    assert classifier_model.calls == 1
+    assert out.hotel_name == "Hotel Pearl" and out.reason == "model"
+    assert context["hotel_name"] == "Hotel Pearl"
+    assert hi.guardrial_agent.instructions == ""  # the clone got the instructions, not the shared agent
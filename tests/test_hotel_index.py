@@ -0,0 +1,111 @@
+import asyncio
+import json
+import random
+
+from agents.tool_context import ToolContext
+
+from dynamic_assign.catalogue import HotelCatalogue
+from dynamic_assign.hotel_index import SORTS, HotelIndex, amenity_tag, city_of
+
+AMENITIES = ["Free Wi-Fi", "Wi‑Fi", "Pool", "Swimming Pool", "Gym", "Spa", "Breakfast", "Sea View", "Parking"]
+CITIES = ["Karachi", "Lahore", "Islamabad", "Quetta"]
+
+
+def random_hotel(rng, i):
+    rec = {"name": f"Hotel {i:04d}", "address": f"Street {i}, {rng.choice(CITIES)}"}
+    if rng.random() < 0.9:
+        rec["total_rooms"] = rng.randint(0, 300)
+        rec["blocked_rooms"] = rng.randint(0, 30)
+    rec["amenities"] = rng.sample(AMENITIES, rng.randint(0, 4))
+    return rec
+
+
+def brute_force(cat, city, amenities, lo, hi, match_all):
+    need = {amenity_tag(a) for a in amenities}
+    rows = []
+    for row in range(len(cat)):
+        tags = {amenity_tag(cat.amenity_vocab[a]) for a in cat.amenity_ids_at(row)}
+        if match_all and not need <= tags:
+            continue
+        if not match_all and need and not need & tags:
+            continue
+        if city and city_of(cat.str_at("address", row)) != city_of(city):
+            continue
+        cap = cat.public_capacity_at(row)
+        if (lo is not None or hi is not None) and (cap is None or cap < (lo or 0) or (hi is not None and cap > hi)):
+            continue
+        rows.append((cat.name_at(row), -1 if cap is None else cap, len(need & tags)))
+    return rows
+
+
+def sort_key(sort_by, overlap):
+    def key(r):
+        name, cap, hits = r
+        primary = {"capacity": -cap, "capacity_asc": cap, "name": name.lower()}[sort_by]
+        return (-hits, primary) if overlap else (primary,)
+
+    return key
+
+
+def check(cat, index, rng):
+    city = rng.choice(CITIES + [None, None])
+    amenities = rng.sample(AMENITIES, rng.randint(0, 2))
+    lo = rng.choice([None, 50, 150])
+    hi = rng.choice([None, 120, 250])
+    match_all = rng.random() < 0.6
+    sort_by = rng.choice(SORTS)
+    limit = rng.randint(1, 12)
+
+    got = index.search(city, amenities, lo, hi, match_all, sort_by, limit)
+    expected = brute_force(cat, city, amenities, lo, hi, match_all)
+    overlap = bool(amenities) and not match_all
+    key = sort_key(sort_by, overlap)
+    expected.sort(key=key)
+    by_name = {r[0]: r for r in expected}
+
+    names = [r["name"] for r in got["results"]]
+    assert len(names) == min(limit, len(expected))
+    assert got["more"] == (len(expected) > limit)
+    assert all(n in by_name for n in names)
+    # ties may come back in any order: compare the sort keys, not the names
+    assert [key(by_name[n]) for n in names] == [key(r) for r in expected[:limit]]
+
+
+def test_search_matches_brute_force_through_upserts():
+    rng = random.Random(7)
+    cat = HotelCatalogue(random_hotel(rng, i) for i in range(300))
+    index = HotelIndex(cat)
+    for step in range(600):
+        check(cat, index, rng)
+        if step % 3 == 0:
+            # updates move hotels between cities / capacities / amenity sets; inserts append rows
+            i = rng.randint(0, len(cat) + 20)
+            cat.upsert(random_hotel(rng, i))
+
+
+def test_amenity_spellings_share_a_tag():
+    assert amenity_tag("Free Wi-Fi") == amenity_tag("Wi‑Fi") == amenity_tag("wifi")
+    assert amenity_tag("Swimming Pool") == amenity_tag("pool")
+    assert city_of("Clifton, Karachi") == city_of(" karachi ") == "karachi"
+
+
+def test_unknown_amenity_matches_nothing_when_all_required():
+    cat = HotelCatalogue([{"name": "A", "amenities": ["Pool"], "total_rooms": 10}])
+    index = HotelIndex(cat)
+    assert index.search(amenities=["Helipad"]) == {"results": [], "more": False}
+    assert [r["name"] for r in index.search(amenities=["Helipad", "pool"], match_all_amenities=False)["results"]] == ["A"]
+
+
+def test_search_hotels_tool_sees_upserts():
+    from dynamic_assign import dynamic
+
+    def search(**args):
+        ctx = ToolContext(context={}, tool_name="search_hotels", tool_call_id="c")
+        return asyncio.run(dynamic.search_hotels.on_invoke_tool(ctx, json.dumps(args)))
+
+    before = search(city="Quetta", amenities=["Pool"])
+    assert before["results"] == []
+    dynamic.HOTEL_DB.upsert({"name": "Hotel Test Quetta", "address": "Jinnah Road, Quetta", "amenities": ["Pool"], "total_rooms": 40})
+    after = search(city="Quetta", amenities=["swimming pool"])  # cached "hotels" entries dropped by the upsert
+    assert [r["name"] for r in after["results"]] == ["Hotel Test Quetta"]
+    assert "error" in search(sort_by="price")
@@ -0,0 +1,77 @@
+import json
+import logging
+
+from router.local_router import LocalRouter, features, log_triage_decision, read_triage_log
+from router.train_router import evaluate, split
+
+SAMPLES = [
+    ("what is your return policy", "BotAgent"),
+    ("how long does shipping take", "BotAgent"),
+    ("do you offer gift wrapping", "BotAgent"),
+    ("where is my order ORD123", "BotAgent"),
+    ("kya aap gift wrapping karte hain", "BotAgent"),
+    ("this is terrible I want a refund now", "HumanAgent"),
+    ("I am very angry with your service", "HumanAgent"),
+    ("worst experience ever, talk to a manager", "HumanAgent"),
+    ("bohat bura service hai, manager se baat karao", "HumanAgent"),
+    ("you people are useless and I am furious", "HumanAgent"),
+] * 5
+
+
+def trained(threshold=0.9):
+    return LocalRouter(["BotAgent", "HumanAgent"], dims=1 << 12, threshold=threshold).fit(SAMPLES)
+
+
+def test_features_are_normalised_and_stable():
+    f = features("Where is my ORDER?", dims=1 << 12)
+    assert f == features("where is my order", dims=1 << 12)
+    assert abs(sum(v * v for v in f.values()) - 1.0) < 1e-9
+    assert features("", dims=16) == {}
+
+
+def test_learns_the_training_routes_and_falls_back_below_threshold():
+    router = trained()
+    assert router.route("do you offer gift wrapping") == "BotAgent"
+    assert router.route("I am very angry with your service") == "HumanAgent"
+    assert router.predict("what is the return policy for shoes")[0] == "BotAgent"
+    assert router.predict("I am furious, get me a manager")[0] == "HumanAgent"
+    assert evaluate(router, SAMPLES)["accuracy"] == 1.0
+
+    unsure = trained(threshold=0.999)
+    assert unsure.route("hello") is None
+
+
+def test_save_load_round_trip(tmp_path):
+    router = trained()
+    path = str(tmp_path / "router.json")
+    router.save(path)
+    loaded = LocalRouter.load(path)
+    assert loaded.classes == router.classes and loaded.threshold == router.threshold
+    for text in ("gift wrapping?", "worst service, refund now"):
+        assert loaded.predict(text)[0] == router.predict(text)[0]
+        assert abs(loaded.predict(text)[1] - router.predict(text)[1]) < 1e-4
+    assert LocalRouter.load_if_exists(str(tmp_path / "missing.json")) is None
+
+
+def test_triage_log_round_trip():
+    logger = logging.getLogger("test_local_router")
+    lines = []
+    handler = logging.Handler()
+    handler.emit = lambda record: lines.append(f"2026-01-01 INFO {record.getMessage()}")
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    log_triage_decision(logger, "C1", "return policy?", "BotAgent")
+    log_triage_decision(logger, "C2", "I'm angry", "HumanAgent")
+    log_triage_decision(logger, "C3", "??", "TriageAgent")
+    lines += ["unrelated line", "triage_decision {not json"]
+
+    assert read_triage_log(lines) == [("return policy?", "BotAgent"), ("I'm angry", "HumanAgent"), ("??", "TriageAgent")]
+    assert read_triage_log(lines, ["BotAgent", "HumanAgent"])[-1] == ("I'm angry", "HumanAgent")
+    assert json.loads(lines[0].split("triage_decision ", 1)[1])["customer_id"] == "C1"
+
+
+def test_split_keeps_duplicates_together():
+    train, test = split(SAMPLES, 0.3)
+    assert len(train) + len(test) == len(SAMPLES)
+    assert not {t for t, _ in train} & {t for t, _ in test}
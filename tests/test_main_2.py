@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+import main_2
+from model_layer.mock_model import MockModel
+
+
+class StubRouter:
+    def __init__(self, route):
+        self._route = route
+
+    def route(self, text):
+        return self._route
+
+
+@pytest.fixture
+def models(monkeypatch):
+    """MockModel per agent, so a test can tell which agent answered."""
+    mocks = {}
+    for agent in (main_2.triage_agent, main_2.bot_agent, main_2.human_agent):
+        mocks[agent.name] = MockModel(reply=lambda text, name=agent.name: f"({name}) {text}", latency=0.05)
+        monkeypatch.setattr(agent, "model", mocks[agent.name])
+    monkeypatch.setattr(main_2, "local_router", None)
+    return mocks
+
+
+def test_guardrail_blocks_without_a_model_call(models):
+    reply = asyncio.run(main_2.handle_message("you stupid bot", "C1"))
+    assert "izzat" in reply
+    assert all(m.calls == 0 for m in models.values())
+
+
+def test_offensive_guard_uses_the_triage_word_list():
+    assert asyncio.run(main_2.check_for_offensive_language("this is DUMB"))
+    assert asyncio.run(main_2.check_for_offensive_language("bkwas band karo")) is None  # support bot's list only
+
+
+def test_faq_is_answered_locally(models):
+    reply = asyncio.run(main_2.handle_message("Return policy kya hai?", "C1"))
+    assert reply == main_2.FAQS["return policy"]
+    assert all(m.calls == 0 for m in models.values())
+
+
+def test_unrouted_message_goes_through_triage(models):
+    reply = asyncio.run(main_2.handle_message("Mere account mein complex masla hai.", "C1"))
+    assert reply.startswith("(TriageAgent)")
+    assert models["TriageAgent"].calls == 1
+
+
+def test_confident_local_route_skips_triage(models, monkeypatch):
+    monkeypatch.setattr(main_2, "local_router", StubRouter("HumanAgent"))
+    reply = asyncio.run(main_2.handle_message("Mere account mein complex masla hai.", "C1"))
+    assert reply.startswith("(HumanAgent)")
+    assert models["TriageAgent"].calls == 0
+
+
+def test_identical_concurrent_messages_share_one_run(models):
+    async def main():
+        return await asyncio.gather(*(main_2.handle_message("Gift wrapping milti hai?", f"C{i}") for i in range(5)))
+
+    replies = asyncio.run(main())
+    assert len(set(replies)) == 1
+    assert models["TriageAgent"].calls == 1
@@ -0,0 +1,87 @@
+import gc
+import io
+import logging
+import os
+import types
+
+from agents import Agent
+
+from metrics.memory import MemoryMonitor, count_live_objects, group_by_module, rss_bytes
+
+_kept = []
+
+
+def test_rss_is_reported():
+    current, peak = rss_bytes()
+    if os.path.exists("/proc/self/statm"):
+        assert current > 0
+    assert peak >= current
+
+
+def test_live_objects_count_agents_and_logging_handlers():
+    before = count_live_objects()
+    agents = [Agent(name=f"leak-{i}") for i in range(25)]
+    logger = logging.getLogger("test_memory.leaky")
+    handlers = [logging.NullHandler() for _ in range(3)]
+    for h in handlers:
+        logger.addHandler(h)
+    try:
+        after = count_live_objects()
+        assert after["Agent"] - before["Agent"] >= 25
+        assert after["logging.Handler"] - before["logging.Handler"] == 3
+    finally:
+        for h in handlers:
+            logger.removeHandler(h)
+    del agents
+
+
+def test_group_by_module_sums_per_module():
+    def stat(filename, size_diff, count_diff=1):
+        return types.SimpleNamespace(
+            traceback=[types.SimpleNamespace(filename=filename)], size_diff=size_diff, size=size_diff, count_diff=count_diff
+        )
+
+    index = [("/app/pkg/sub/", "pkg.sub"), ("/app/pkg/", "pkg"), ("/app/main.py", "main")]
+    rows = group_by_module(
+        [stat("/app/pkg/sub/a.py", 10), stat("/app/pkg/sub/b.py", 5), stat("/app/main.py", 20), stat("/elsewhere.py", 1)],
+        index,
+    )
+    assert [(r["module"], r["size_diff"]) for r in rows] == [("main", 20), ("pkg.sub", 15), ("/elsewhere.py", 1)]
+
+
+def test_tracing_points_growth_at_the_allocating_module():
+    monitor = MemoryMonitor(interval=0)
+    monitor.start_tracing(1)
+    try:
+        monitor.sample()  # baseline
+        _kept.append([str(i) * 100 for i in range(5_000)])
+        stats = monitor.sample()
+        top = stats["growth_since_last"][0]
+        assert top["module"] == __name__ and top["size_diff"] > 500_000
+        assert stats["growth_since_start"][0]["module"] == __name__
+        assert monitor.top_allocators(5)
+    finally:
+        monitor.stop_tracing()
+        _kept.clear()
+    assert monitor.stats()["growth_since_last"] == []
+
+
+def test_gc_pauses_are_timed_between_start_and_stop():
+    monitor = MemoryMonitor(interval=0)
+    monitor.start(tracing_frames=0)
+    try:
+        assert monitor._thread is None  # interval 0: no background sampling
+        gc.collect()
+        assert monitor._gc_pause_total > 0
+        assert monitor.stats()["gc"]["pause_max_s"] >= 0
+    finally:
+        monitor.stop()
+    paused = monitor._gc_pause_total
+    gc.collect()
+    assert monitor._gc_pause_total == paused
+
+
+def test_dump_without_tracing_says_how_to_turn_it_on():
+    report = io.StringIO()
+    MemoryMonitor(interval=0).dump(file=report)
+    assert "tracemalloc off" in report.getvalue()
@@ -0,0 +1,83 @@
+import asyncio
+import gc
+
+import pytest
+from agents import Agent, ModelBehaviorError
+from pydantic import BaseModel
+
+import config.config
+from config import model_tiers
+from config.model_tiers import looks_uncertain, run_with_escalation, tier_for
+from model_layer.mock_model import MockModel
+
+
+class Answer(BaseModel):
+    value: int
+
+
+@pytest.fixture
+def tier_models(monkeypatch):
+    """model_for(..., tier=t) -> one MockModel per tier; replies set per test."""
+    replies = {}
+    models = {}
+    built = []
+
+    def model_for(label, priority="default", hedge=False, tier=None):
+        built.append(tier)
+        if tier not in models:
+            models[tier] = MockModel(reply=lambda prompt, tier=tier: replies[tier])
+        return models[tier]
+
+    monkeypatch.setattr(config.config, "model_for", model_for)
+    return replies, models, built
+
+
+def test_tier_for():
+    assert tier_for("TriageAgent") == "fast"
+    assert tier_for("BotAgent") == "default"
+    assert tier_for("HumanAgent") == "default"
+    assert tier_for("escalation") == "strong"
+    assert tier_for("strong") == "strong"
+    assert tier_for("whatever") == "default"
+
+
+def test_looks_uncertain():
+    assert looks_uncertain("I'm not sure, maybe")
+    assert looks_uncertain("  ")
+    assert not looks_uncertain("Your order shipped.")
+
+
+def test_uncertain_answer_escalates_one_tier(tier_models):
+    replies, models, _ = tier_models
+    replies.update(fast="I don't know", default="It is 4.")
+    agent = Agent(name="classifier", instructions="answer")
+    result = asyncio.run(run_with_escalation(agent, "2+2?", label="TriageAgent"))
+    assert result.final_output == "It is 4."
+    assert models["fast"].calls == 1 and models["default"].calls == 1
+    assert "strong" not in models
+
+
+def test_validation_failure_escalates_and_strongest_raises(tier_models):
+    replies, models, _ = tier_models
+    replies.update(fast="not json", default='{"value": 4}', strong="still not json")
+    agent = Agent(name="classifier", instructions="answer", output_type=Answer)
+    result = asyncio.run(run_with_escalation(agent, "2+2?", label="TriageAgent"))
+    assert result.final_output == Answer(value=4)
+
+    with pytest.raises(ModelBehaviorError):
+        asyncio.run(run_with_escalation(agent, "2+2?", tier="strong"))
+
+
+def test_tier_clones_are_reused_and_dropped_with_the_agent(tier_models):
+    replies, _, built = tier_models
+    replies.update(fast="I don't know", default="It is 4.")
+    agent = Agent(name="classifier", instructions="answer")
+    for _ in range(3):
+        asyncio.run(run_with_escalation(agent, "2+2?", label="TriageAgent"))
+    assert built == ["fast", "default"]  # one clone per tier, not per call
+    assert len(model_tiers._clones[id(agent)]) == 2
+
+    key = id(agent)
+    del agent
+    gc.collect()
+    assert key not in model_tiers._clones
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+from agents import Agent, ModelBehaviorError, OutputGuardrailTripwireTriggered, RunConfig, Runner
+
+from guardrail.policy_classifier import ALL_POLICIES, Policy, PolicyClassifier, parse_mask
+from model_layer.mock_model import MockModel
+
+
+def verdicts(is_math=True, is_political=False, is_offensive=False, is_negative=False, reason="ok"):
+    return json.dumps(
+        {"is_math": is_math, "is_political": is_political, "is_offensive": is_offensive, "is_negative": is_negative, "reason": reason}
+    )
+
+
+def classifier(reply, latency=0.0, **kwargs):
+    model = MockModel(reply=reply, latency=latency)
+    return model, PolicyClassifier(model, name="test", **kwargs)
+
+
+def test_parse_mask():
+    assert parse_mask("math_topic, political") == Policy.MATH_TOPIC | Policy.POLITICAL
+    assert parse_mask("") == ALL_POLICIES
+    with pytest.raises(ValueError, match="unknown guardrail policy"):
+        parse_mask("math,weather")
+
+
+def test_model_and_tier_label_are_exclusive():
+    with pytest.raises(ValueError, match="not both"):
+        PolicyClassifier(MockModel(), name="test", label="guardrail")
+    with pytest.raises(ValueError):
+        PolicyClassifier(name="test")
+
+
+def test_one_call_answers_every_policy_and_is_cached():
+    model, c = classifier(lambda text: verdicts(is_math=False, is_offensive=True, reason="insult"))
+    result = asyncio.run(c.classify("you idiot"))
+    assert model.calls == 1
+    assert result.violations == [Policy.MATH_TOPIC, Policy.OFFENSIVE]
+    assert result.message == "Not math related: insult"  # first violated policy answers
+    assert not result
+
+    again = asyncio.run(c.classify("you idiot"))
+    assert again is result and model.calls == 1
+    assert c.stats()["cache_hits"] == 1
+
+    only_offensive = asyncio.run(c.classify("you idiot", Policy.OFFENSIVE))
+    assert only_offensive.message == "Please keep the conversation respectful."
+    assert model.calls == 2  # another mask is another question
+
+
+def test_prompt_only_asks_about_the_mask():
+    _, c = classifier(lambda text: verdicts())
+    prompt = c.agent_for(Policy.POLITICAL).instructions
+    assert "political topics" in prompt and "is_math: not checked" in prompt
+    assert c.agent_for(Policy.POLITICAL) is c.agent_for(Policy.POLITICAL)
+
+
+def test_disabled_policies_are_never_asked():
+    model, c = classifier(lambda text: verdicts(), enabled=Policy.MATH_TOPIC)
+    result = asyncio.run(c.classify("who won the election", Policy.POLITICAL))
+    assert result and model.calls == 0
+
+
+def test_concurrent_identical_texts_share_one_call():
+    model, c = classifier(lambda text: verdicts(), latency=0.02)
+
+    async def main():
+        return await asyncio.gather(*(c.classify("2 + 2") for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert model.calls == 1 and all(r for r in results)
+    assert c.stats()["shared_inflight"] == 4
+
+
+def test_errors_are_not_cached():
+    replies = iter(["not json", verdicts()])
+    model, c = classifier(lambda text: next(replies))
+    with pytest.raises(ModelBehaviorError):
+        asyncio.run(c.classify("2 + 2"))
+    assert asyncio.run(c.classify("2 + 2"))
+    assert model.calls == 2
+
+
+def test_output_guardrail_trips_on_a_violation():
+    _, c = classifier(lambda text: verdicts(is_political=True, reason="election"))
+    agent = Agent(
+        name="Writer",
+        instructions="answer",
+        model=MockModel(reply=lambda text: "Vote for X"),
+        output_guardrails=[c.as_output_guardrail(Policy.POLITICAL)],
+    )
+    with pytest.raises(OutputGuardrailTripwireTriggered):
+        asyncio.run(Runner.run(agent, "who should I vote for", run_config=RunConfig(tracing_disabled=True)))
@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+import json
+import pstats
+import sys
+import threading
+import time
+
+import pytest
+
+from metrics import profiler as profiler_module
+from metrics.metrics import metrics
+from metrics.profiler import Profiler, collapse, flamegraph_svg
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    p = Profiler()
+    p.configure(rate=0.0, mode="sample", directory=str(tmp_path), interval_ms=1)
+    return p
+
+
+def index(profiler):
+    with open(f"{profiler.directory}/index.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def burn_profiled(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(200))
+
+
+def burn_other(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(200))
+
+
+def test_off_by_default_and_config_is_validated(profiler, tmp_path):
+    with profiler.profile("handle_message", customer="C1") as p:
+        assert p is None
+    assert not list(tmp_path.iterdir())
+    with pytest.raises(ValueError):
+        profiler.configure(rate=2)
+    with pytest.raises(ValueError):
+        profiler.configure(mode="perf")
+
+
+def test_sampled_request_only_sees_its_own_tasks(profiler):
+    async def request(burn, profiled):
+        ctx = profiler.profile("handle_message", force=profiled, customer="C/1", agent="support")
+        with ctx:
+            for _ in range(20):
+                burn(0.01)
+                await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(request(burn_profiled, True), request(burn_other, False))
+
+    asyncio.run(main())
+    [entry] = index(profiler)
+    assert entry["kind"] == "handle_message" and entry["tags"] == {"customer": "C/1", "agent": "support"}
+    assert entry["samples"] > 0
+    folded_path, svg_path = entry["files"]
+    assert "C_1" in folded_path  # tags are made filename-safe
+    with open(folded_path, encoding="utf-8") as f:
+        folded = f.read()
+    assert "burn_profiled" in folded
+    assert "burn_other" not in folded
+    with open(svg_path, encoding="utf-8") as f:
+        assert f.read().startswith("<svg")
+
+
+def test_cprofile_mode_writes_pstats(profiler):
+    profiler.configure(mode="cprofile")
+    with profiler.profile("batch", force=True):
+        burn_profiled(0.01)
+    [entry] = index(profiler)
+    stats = pstats.Stats(entry["files"][0])
+    assert any(name == "burn_profiled" for (_, _, name) in stats.stats)
+
+
+def test_nested_and_busy_profiles_are_skipped(profiler):
+    profiler.max_active = 1
+    with profiler.profile("outer", force=True) as outer:
+        assert outer is not None
+        with profiler.profile("inner", force=True) as inner:
+            assert inner is None  # nested: no-op
+
+    async def main():
+        async def other():
+            with profiler.profile("other", force=True) as p:
+                return p
+
+        with profiler.profile("first", force=True):
+            # another request (own context, so not nested) while max_active are running
+            return await asyncio.create_task(other(), context=contextvars.Context())
+
+    assert asyncio.run(main()) is None
+    assert profiler.skipped == 1
+    assert [e["kind"] for e in index(profiler)] == ["outer", "first"]
+
+
+def test_files_are_written_off_the_loop_and_write_errors_never_reach_the_request(profiler, monkeypatch, capsys):
+    writers = []
+
+    def broken_svg(stacks, title=""):
+        writers.append(threading.get_ident())
+        raise RuntimeError("dictionary changed size during iteration")
+
+    monkeypatch.setattr(profiler_module, "flamegraph_svg", broken_svg)
+    errors = metrics.snapshot()["counters"].get("profiler_write_errors_total", 0)
+
+    async def request():
+        with profiler.profile("handle_message", force=True):
+            burn_profiled(0.01)
+        return "reply"
+
+    assert asyncio.run(request()) == "reply"
+    assert writers and writers[0] != threading.get_ident()
+    assert metrics.snapshot()["counters"]["profiler_write_errors_total"] == errors + 1
+    assert "RuntimeError" in capsys.readouterr().err
+
+
+def test_collapse_and_flamegraph():
+    stack = collapse(sys._getframe())
+    assert stack.endswith("test_collapse_and_flamegraph")
+    svg = flamegraph_svg({"a;b": 3, "a;c": 1}, title="t <x>")
+    assert "(4 samples)" in svg and "t &lt;x&gt;" in svg
+    assert svg.count("<rect") == 3
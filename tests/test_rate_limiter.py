@@ -0,0 +1,99 @@
+import asyncio
+import types
+
+import pytest
+from agents import Agent, RunConfig, Runner
+
+from model_layer import rate_limiter
+from model_layer.mock_model import MockModel
+from model_layer.rate_limiter import AdaptiveLimiter, AIMDConcurrency, RateLimitedModel, TokenBucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float = 0):
+        super().__init__("429")
+        self.response = types.SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_token_bucket_refills_adjusts_and_pauses(clock):
+    bucket = TokenBucket(per_minute=60)  # 1 token/s, burst 60
+    bucket.tokens = 0.0
+    assert bucket.wait_time(5) == pytest.approx(5.0)
+    clock[0] += 5
+    assert bucket.wait_time(5) == 0.0
+    bucket.adjust(100)
+    assert bucket.tokens == 60  # never above capacity
+    bucket.pause(10)
+    assert bucket.wait_time(1) == pytest.approx(11.0)
+
+
+def test_aimd_grows_on_success_and_halves_once_per_cooldown(clock):
+    c = AIMDConcurrency(initial=8, cooldown=2.0)
+    for _ in range(8):
+        c.on_success("bot", 0.1)
+    assert 8.9 < c.limit < 9.1  # about +1 per `limit` clean calls
+    c.decrease("429")
+    halved = c.limit
+    c.decrease("429")  # inside the cooldown: ignored
+    assert c.limit == halved
+    clock[0] += 2
+    c.decrease("429")
+    assert c.limit == pytest.approx(halved / 2)
+
+
+def test_weighted_fair_queuing_between_classes():
+    order = []
+
+    async def main():
+        c = AIMDConcurrency(initial=1, minimum=1, maximum=1)
+        await c.acquire("hold")
+
+        async def one(priority, weight):
+            await c.acquire(priority, weight)
+            order.append(priority)
+            c.release()
+
+        tasks = [asyncio.create_task(one("chat", 1.0)) for _ in range(4)]
+        tasks += [asyncio.create_task(one("guardrail", 3.0)) for _ in range(6)]
+        await asyncio.sleep(0)
+        c.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    # guardrail (weight 3) gets ~3 slots per chat slot while both are waiting
+    assert order[:4].count("guardrail") == 3
+    assert order[:8].count("guardrail") == 6
+
+
+def test_model_retries_429_under_the_limiter(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_backoff", lambda attempt, error: 0.0)
+    failures = [2]
+
+    def reply(prompt):
+        if failures[0]:
+            failures[0] -= 1
+            raise RateLimited()
+        return "ok"
+
+    mock = MockModel(reply=reply)
+    limiter = AdaptiveLimiter(initial_concurrency=8)
+    agent = Agent(name="Bot", instructions="answer", model=RateLimitedModel(mock, limiter, agent="bot", max_retries=2))
+    result = asyncio.run(Runner.run(agent, "hi", run_config=RunConfig(tracing_disabled=True)))
+    assert result.final_output == "ok"
+    assert mock.calls == 3
+    assert limiter.concurrency.limit == 4.0 + 1 / 4  # halved once (cooldown), then one clean call
+    assert limiter.concurrency.in_flight == 0
+
+    failures[0] = 5
+    with pytest.raises(RateLimited):
+        asyncio.run(Runner.run(agent, "hi", run_config=RunConfig(tracing_disabled=True)))
+    assert limiter.concurrency.in_flight == 0
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from serving.scheduler import BATCH, ESCALATION, LIVE, Draining, FairScheduler, Overloaded
+
+
+async def _hold(scheduler, release, customer="holder", priority=LIVE):
+    async with scheduler.slot(customer, priority):
+        await release.wait()
+
+
+async def _queue(scheduler, requests, order):
+    """Start one task per (customer, priority) behind a held slot; return (release, tasks)."""
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, release))
+    await asyncio.sleep(0)
+
+    async def one(customer, priority, label):
+        async with scheduler.slot(customer, priority):
+            order.append(label)
+            await asyncio.sleep(0)
+
+    tasks = []
+    for customer, priority, label in requests:
+        tasks.append(asyncio.create_task(one(customer, priority, label)))
+        await asyncio.sleep(0)  # enqueue in this order
+    return release, [holder, *tasks]
+
+
+def test_customers_take_turns_inside_a_class():
+    order = []
+
+    async def main():
+        s = FairScheduler(max_concurrency=1)
+        requests = [("A", LIVE, "A1"), ("A", LIVE, "A2"), ("A", LIVE, "A3"), ("B", LIVE, "B1"), ("C", LIVE, "C1")]
+        release, tasks = await _queue(s, requests, order)
+        assert s.stats()["queued"][LIVE] == 5
+        release.set()
+        await asyncio.gather(*tasks)
+        assert s.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+    assert order == ["A1", "B1", "C1", "A2", "A3"]
+
+
+def test_higher_class_goes_first():
+    order = []
+
+    async def main():
+        s = FairScheduler(max_concurrency=1)
+        requests = [("A", BATCH, "batch"), ("B", LIVE, "live"), ("C", ESCALATION, "escalation")]
+        release, tasks = await _queue(s, requests, order)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["escalation", "live", "batch"]
+
+
+def test_full_queues_reject_or_shed_lower_classes():
+    async def main():
+        s = FairScheduler(max_concurrency=1, max_queue={LIVE: 1, BATCH: 1}, max_per_customer=1)
+        release, tasks = await _queue(s, [("A", LIVE, "a"), ("B", BATCH, "b")], [])
+
+        with pytest.raises(Overloaded) as e:
+            async with s.slot("A", LIVE):
+                pass
+        assert e.value.reason == "customer_queue_full"
+
+        # live is full but a batch waiter can make room
+        newcomer = asyncio.create_task(_hold(s, release, "C", LIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as e:
+            await tasks[2]
+        assert e.value.reason == "preempted"
+
+        with pytest.raises(Overloaded) as e:
+            async with s.slot("D", LIVE):
+                pass
+        assert e.value.reason == "queue_full"  # nothing lower left to shed
+        assert s.stats()["shed"] == {ESCALATION: 0, LIVE: 2, BATCH: 1}
+
+        release.set()
+        await asyncio.gather(tasks[0], tasks[1], newcomer)
+
+    asyncio.run(main())
+
+
+def test_waiters_past_max_wait_are_shed():
+    async def main():
+        s = FairScheduler(max_concurrency=1, max_wait={LIVE: 0.01})
+        release, tasks = await _queue(s, [("A", LIVE, "a")], [])
+        await asyncio.sleep(0.02)
+        late = asyncio.create_task(_hold(s, release, "B", LIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as e:
+            await tasks[1]
+        assert e.value.reason == "max_wait"
+        release.set()
+        await asyncio.gather(tasks[0], late)
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_gives_up_its_place_and_drain_waits():
+    order = []
+
+    async def main():
+        s = FairScheduler(max_concurrency=1)
+        release, tasks = await _queue(s, [("A", LIVE, "A"), ("B", LIVE, "B")], order)
+        tasks[1].cancel()
+        await asyncio.sleep(0)
+        assert s.stats()["queued"][LIVE] == 1
+
+        drained = asyncio.create_task(s.drain(timeout=1.0))
+        await asyncio.sleep(0)
+        with pytest.raises(Draining):
+            async with s.slot("C", LIVE):
+                pass
+        release.set()
+        assert await drained
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+    assert order == ["B"]
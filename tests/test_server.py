@@ -0,0 +1,86 @@
+import asyncio
+import json
+from typing import Optional
+
+from agents import RunConfig
+
+from model_layer.mock_model import MockModel
+from serving.server import SupportServer, default_apps
+
+
+async def post(port: int, path: str, body: dict, length: Optional[str] = None) -> tuple:
+    """(status, NDJSON rows) for one POST against the local server."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode()
+    length = len(payload) if length is None else length
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {length}\r\n\r\n".encode() + payload
+    )
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, rest = raw.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    if b"chunked" not in head.lower():
+        return status, [json.loads(rest)]
+    rows, data = [], rest
+    while data:
+        size, _, data = data.partition(b"\r\n")
+        n = int(size, 16)
+        if n == 0:
+            break
+        rows.append(json.loads(data[:n]))
+        data = data[n + 2:]
+    return status, rows
+
+
+def serve_and(fn):
+    async def main():
+        mock = MockModel()
+        server = SupportServer(default_apps(RunConfig(model=mock, tracing_disabled=True)), drain_timeout=1.0)
+        await server.start("127.0.0.1", 0)
+        try:
+            return await fn(server.port)
+        finally:
+            await server.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_every_app_answers_one_message(mock_model):
+    async def run(port):
+        return {
+            "support": await post(port, "/v1/support/messages", {"text": "Kya aap gift wrapping karte hain?", "customer_id": "C1"}),
+            "hotel": await post(port, "/v1/hotel/messages", {"text": "Tell me about Hotel Sannata", "customer_id": "C2"}),
+        }
+
+    replies = serve_and(run)
+    for app, (status, rows) in replies.items():
+        assert status == 200, app
+        assert rows[-1]["type"] == "done", (app, rows)
+        text = "".join(r.get("text", "") for r in rows if r["type"] in ("message", "delta"))
+        assert "(MOCK)" in text, (app, rows)
+
+
+def test_hotel_guardrail_block_is_a_reply_not_an_error(mock_model):
+    status, rows = serve_and(lambda port: post(port, "/v1/hotel/messages", {"text": "you stupid hotel bot"}))
+    assert status == 200
+    assert rows[-1]["type"] == "done"
+    assert any(r["type"] == "message" and "respectful" in r["text"] for r in rows)
+
+
+def test_unknown_app_and_bad_body():
+    async def run(port):
+        return await post(port, "/v1/nope/messages", {"text": "hi"}), await post(port, "/v1/support/messages", {})
+
+    (missing, _), (bad, rows) = serve_and(run)
+    assert missing == 404
+    assert bad == 400 and "text" in rows[0]["error"]
+
+
+def test_bad_content_length_is_a_400():
+    async def run(port):
+        return [await post(port, path, {"text": "hi"}, length="abc") for path in ("/v1/support/messages", "/admin/profiling")]
+
+    for status, rows in serve_and(run):
+        assert status == 400 and rows[0]["error"] == "invalid Content-Length"
@@ -0,0 +1,75 @@
+import asyncio
+import io
+
+import customer_support_bot as bot
+from serving.sinks import CallbackSink, StdoutSink, StreamStats, WebSocketSink, as_sink, emit
+
+
+def test_stdout_sink_prints_a_streamed_line_per_agent():
+    out = io.StringIO()
+    sink = StdoutSink(out)
+
+    async def main():
+        await sink.delta("BotAgent", "Hel")
+        await sink.delta("BotAgent", "lo")
+        await sink.delta("HumanAgent", "Hi")
+        await sink.message("ticket T-1")  # closes the open line first
+
+    asyncio.run(main())
+    assert out.getvalue() == "💬 (BotAgent): Hello\n💬 (HumanAgent): Hi\nticket T-1\n"
+
+
+def test_as_sink_wraps_plain_and_async_callables():
+    got = []
+
+    async def on_message(text):
+        got.append(("async", text))
+
+    async def main():
+        await emit(got.append, "plain")
+        await emit(on_message, "awaited")
+        sink = as_sink(CallbackSink(got.append, on_delta=lambda agent, text: got.append((agent, text))))
+        assert sink.streams_deltas
+        await sink.delta("BotAgent", "d")
+        await sink.end("BotAgent")  # no on_end: ignored
+
+    asyncio.run(main())
+    assert got == ["plain", ("async", "awaited"), ("BotAgent", "d")]
+    assert not as_sink(got.append).streams_deltas
+    assert isinstance(as_sink(None), StdoutSink)
+
+
+def test_websocket_sink_frames():
+    frames = []
+
+    class WS:
+        async def send_json(self, data):
+            frames.append(data)
+
+    async def main():
+        sink = WebSocketSink(WS())
+        await sink.delta("BotAgent", "Hi")
+        await sink.end("BotAgent")
+        await sink.message("done")
+
+    asyncio.run(main())
+    assert [f["type"] for f in frames] == ["delta", "message_end", "message"]
+
+
+def test_stream_stats():
+    stats = StreamStats("BotAgent")
+    assert stats.finish() == {}  # nothing streamed
+    stats.on_delta("x" * 40)
+    assert stats.finish()["tokens"] == 10  # chars/4 without provider usage
+    stats.on_usage(25)
+    assert stats.finish()["tokens"] == 25
+
+
+def test_bot_reply_streams_as_deltas(mock_model):
+    deltas, ends, messages = [], [], []
+    sink = CallbackSink(messages.append, on_delta=lambda agent, text: deltas.append((agent, text)), on_end=ends.append)
+    asyncio.run(bot.handle_message("Kya aap gift wrapping karte hain?", "CUST-S1", send=sink))
+    assert len(deltas) > 1  # more than one chunk
+    assert {agent for agent, _ in deltas} == {"BotAgent"}
+    assert "".join(text for _, text in deltas).startswith("(MOCK)")
+    assert ends == ["BotAgent"]
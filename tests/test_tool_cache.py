@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+from agents import RunContextWrapper
+from agents.tool_context import ToolContext
+
+from tools.tool_cache import ToolCache
+
+
+def test_invalidate_drops_exactly_the_dependent_entries():
+    cache = ToolCache()
+    calls = []
+
+    @cache.cached(depends_on=lambda order_id: [f"order:{order_id}", "orders"])
+    def order(order_id: str) -> str:
+        calls.append(order_id)
+        return f"status of {order_id}"
+
+    @cache.cached(depends_on=lambda customer_id: [f"customer:{customer_id}"])
+    def customer(customer_id: str) -> str:
+        calls.append(customer_id)
+        return customer_id
+
+    for key in ("1", "2", "3"):
+        order(key)
+    customer("C1")
+    assert cache.stats()["entries"] == 4
+
+    assert cache.invalidate("order:2") == 1
+    assert cache.stats()["entries"] == 3
+    order("1"), order("3"), customer("C1")
+    assert calls == ["1", "2", "3", "C1"]  # untouched entries still hit
+    order("2")
+    assert calls[-1] == "2"  # dropped entry recomputed
+
+    assert cache.invalidate("orders") == 3
+    assert cache.invalidate("order:2", "orders") == 0
+    assert cache.stats()["entries"] == 1
+
+
+def test_bypass_ttl_errors_and_bound():
+    cache = ToolCache(max_entries=2)
+    calls = []
+
+    @cache.cached(depends_on=lambda x: None if x < 0 else [f"x:{x}"], ttl=0.05)
+    def f(x: int) -> int:
+        calls.append(x)
+        if x == 99:
+            raise ValueError("boom")
+        return x
+
+    f(-1), f(-1)
+    assert calls == [-1, -1]  # depends_on None: never cached
+    f(1), f(1)
+    assert calls.count(1) == 1
+    time.sleep(0.06)
+    f(1)
+    assert calls.count(1) == 2  # expired
+    for _ in range(2):
+        try:
+            f(99)
+        except ValueError:
+            pass
+    assert calls.count(99) == 2  # exceptions are not cached
+    f(2), f(3)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["tools"]["f"]["bypassed"] == 2
+
+
+def test_context_argument_is_not_part_of_the_key():
+    cache = ToolCache()
+    calls = []
+
+    @cache.cached(depends_on=["hotels"])
+    async def g(ctx: RunContextWrapper, name: str) -> str:
+        calls.append(name)
+        return name
+
+    asyncio.run(g(RunContextWrapper({"a": 1}), "x"))
+    asyncio.run(g(RunContextWrapper({"b": 2}), "x"))
+    assert calls == ["x"]
+
+
+def test_order_tool_is_cached_and_invalidated_through_the_sdk():
+    from tools import my_tools
+    from tools.tool_cache import tool_cache
+
+    tool = my_tools.get_order_status
+
+    def invoke(order_id):
+        ctx = ToolContext(context={"user_text": f"order {order_id}"}, tool_name=tool.name, tool_call_id="c")
+        return asyncio.run(tool.on_invoke_tool(ctx, f'{{"order_id": "{order_id}"}}'))
+
+    assert tool.is_enabled(RunContextWrapper({"user_text": "where is my order?"}), None)
+    assert not tool.is_enabled(RunContextWrapper({"user_text": "hello"}), None)
+
+    assert "Shipped" in invoke("ORD123")
+    my_tools.ORDERS_DB["ORD123"] = "Delivered"
+    assert "Shipped" in invoke("ORD123")  # served from cache
+    try:
+        tool_cache.invalidate("order:ORD123")
+        assert "Delivered" in invoke("ORD123")
+    finally:
+        my_tools.ORDERS_DB["ORD123"] = "Shipped - Expected delivery in 3 days"
+        tool_cache.invalidate("order:ORD123")
+    assert "couldn’t find" in invoke("NOPE")
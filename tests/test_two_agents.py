@@ -0,0 +1,29 @@
+import asyncio
+
+from agents import RunContextWrapper
+from agents.tool_context import ToolContext
+
+from my_agent import two_agents
+
+
+def invoke(tool, context, args):
+    ctx = ToolContext(context=context, tool_name=tool.name, tool_call_id="call-1")
+    return asyncio.run(tool.on_invoke_tool(ctx, args))
+
+
+def test_order_tool_enabled_only_for_order_messages():
+    tool = two_agents.get_order_status
+    enabled = lambda text: tool.is_enabled(RunContextWrapper({"user_text": text}), two_agents.bot_agent)
+    assert enabled("Order ORD123 ka status?")
+    assert not enabled("Return policy kya hai?")
+
+
+def test_unknown_order_gets_the_failure_message():
+    tool = two_agents.get_order_status
+    assert "ORD123" in invoke(tool, {"user_text": "order ORD123"}, '{"order_id": "ORD123"}')
+    assert "nahi mila" in invoke(tool, {"user_text": "order X1"}, '{"order_id": "X1"}')
+
+
+def test_offensive_guard_uses_the_triage_word_list():
+    assert asyncio.run(two_agents.check_for_offensive_language("this is DUMB"))
+    assert asyncio.run(two_agents.check_for_offensive_language("bkwas band karo")) is None  # support bot's list only
@@ -0,0 +1,106 @@
+import asyncio
+import types
+
+import pytest
+from agents import Agent, RunConfig, Runner
+
+from metrics import usage
+from metrics.usage import HARD, OK, SOFT, BudgetExceeded, UsageLedger, usage_scope
+from model_layer.mock_model import MockModel
+from model_layer.usage import UsageModel
+
+DAY = 86400.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(usage, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def charge(ledger, customer, tokens):
+    ledger.record({"agent": "bot", "customer": customer}, "mock", tokens, 0, 0, 0.0)
+
+
+def test_budget_goes_soft_then_hard(clock):
+    ledger = UsageLedger(budget=1000, budget_window_s=DAY, soft_ratio=0.8, log_path="")
+    charge(ledger, "c1", 700)
+    assert ledger.budget_status("c1") == OK
+    assert ledger.budget_status("c1", estimate=100) == SOFT
+    charge(ledger, "c1", 200)
+    assert ledger.spent("c1") == 900
+    assert ledger.budget_status("c1") == SOFT
+    ledger.check("c1", estimate=100)  # exactly at the limit still passes
+    with pytest.raises(BudgetExceeded) as e:
+        ledger.check("c1", estimate=101)
+    assert (e.value.used, e.value.limit) == (900, 1000)
+    assert ledger.rejected == 1
+    ledger.check("c2", estimate=500)  # other customers untouched
+
+
+def test_per_customer_override_and_unlimited(clock):
+    ledger = UsageLedger(budget=100, budget_window_s=DAY, log_path="")
+    charge(ledger, "vip", 5000)
+    assert ledger.budget_status("vip") == HARD
+    ledger.set_budget("vip", 0)
+    assert ledger.budget_status("vip") == OK
+    ledger.set_budget("vip", None)
+    assert ledger.budget_status("vip") == HARD
+
+
+def test_spend_expires_with_the_window(clock):
+    ledger = UsageLedger(budget=1000, budget_window_s=DAY, log_path="")
+    charge(ledger, "c1", 900)
+    clock[0] += DAY / 2
+    charge(ledger, "c1", 50)
+    assert ledger.spent("c1") == 950
+    clock[0] += DAY / 2 + ledger._bucket_s
+    assert ledger.spent("c1") == 50
+    clock[0] += DAY
+    assert ledger.spent("c1") == 0
+
+
+def test_spend_map_only_keeps_customers_active_in_the_window(clock):
+    ledger = UsageLedger(budget=1000, budget_window_s=DAY, log_path="")
+    for i in range(500):
+        charge(ledger, f"c{i}", 10)
+    assert len(ledger._spend) == 500
+    clock[0] += DAY / 2
+    charge(ledger, "c0", 10)  # still inside its window: stays
+    assert len(ledger._spend) == 500
+    clock[0] += DAY / 2 + ledger._bucket_s
+    charge(ledger, "late", 10)
+    assert set(ledger._spend) == {"c0", "late"}
+    assert ledger.spent("c0") == 10
+
+
+def test_customer_totals_are_lru_bounded(clock):
+    ledger = UsageLedger(max_customers=3, log_path="")
+    for customer in ("a", "b", "c"):
+        charge(ledger, customer, 10)
+    charge(ledger, "a", 10)  # a is now the most recent
+    charge(ledger, "d", 10)
+    assert list(ledger._customers) == ["c", "a", "d"]
+    assert ledger._customers["a"].tokens == 20
+
+
+def test_usage_model_books_and_refuses_past_budget():
+    ledger = UsageLedger(budget=0, log_path="")
+    mock = MockModel()
+    agent = Agent(name="Bot", instructions="answer", model=UsageModel(mock, agent="bot", ledger=ledger))
+    config = RunConfig(tracing_disabled=True)
+
+    async def run():
+        with usage_scope(customer="c1"):
+            await Runner.run(agent, "hello there", run_config=config)
+
+    asyncio.run(run())
+    assert mock.calls == 1
+    assert ledger.spent("c1") > 0
+    assert ledger._customers["c1"].calls == 1
+
+    ledger.set_budget("c1", ledger.spent("c1"))
+    with pytest.raises(BudgetExceeded):
+        asyncio.run(run())
+    assert mock.calls == 1  # refused before the model was called
@@ -0,0 +1,91 @@
+import asyncio
+import time
+import types
+import zlib
+
+import pytest
+
+from workers.pool import WorkerCrashed, WorkerError, WorkerPool
+
+
+def test_customers_stick_to_one_worker_and_the_rest_go_to_the_least_loaded():
+    pool = WorkerPool(3)
+    assert pool.route("CUST-7") == zlib.crc32(b"CUST-7") % 3
+    assert {pool.route("CUST-7") for _ in range(5)} == {pool.route("CUST-7")}
+    pool._load = [4, 1, 2]
+    assert pool.route(None) == 1
+    assert pool.route("") == 1
+    assert pool.route("CUST-7") == zlib.crc32(b"CUST-7") % 3  # load never moves a customer
+
+
+def test_pool_runs_jobs_and_restarts_a_dead_worker():
+    async def main():
+        async with WorkerPool(2, "support", concurrency_per_worker=4, mock=True) as pool:
+            replies = await asyncio.gather(*(pool.submit("Return policy kya hai?", f"CUST-{i}") for i in range(6)))
+            assert len(replies) == 6 and all(isinstance(r, str) and r for r in replies)
+
+            report = await pool.collect_metrics()
+            assert report["counters"]["worker_jobs_total{status=ok}"] == 6
+            assert report["pool"]["alive"] == 2 and report["pool"]["outstanding"] == [0, 0]
+
+            # kill the owner without yielding, so the job lands on the dead worker's inbox
+            worker = pool.route("CUST-0")
+            pool._procs[worker].terminate()
+            pool._procs[worker].join()
+            with pytest.raises(WorkerCrashed):
+                await pool.submit("Order ID 123 ka status?", "CUST-0")
+
+            while pool.stats()["alive"] < 2:
+                await asyncio.sleep(0.1)
+            await pool._ready[worker]
+            assert pool.stats()["restarts"] == 1
+            assert await pool.submit("Order ID 123 ka status?", "CUST-0")
+
+    asyncio.run(main())
+
+
+def test_a_worker_that_dies_on_startup_fails_start():
+    async def main():
+        pool = WorkerPool(1, "no_such_module:agent", mock=True)
+        started = time.monotonic()
+        with pytest.raises(WorkerError, match="during startup"):
+            await pool.start()
+        assert time.monotonic() - started < pool.start_timeout
+
+    asyncio.run(main())
+
+
+def test_crash_looping_worker_backs_off_then_is_given_up():
+    pool = WorkerPool(1, max_restarts=2)
+    pool._procs = [types.SimpleNamespace(is_alive=lambda: False, exitcode=1)]
+    pool._inboxes = [None]
+    pool._ctx = types.SimpleNamespace(Queue=lambda: None)
+    spawned = []
+    now = 100.0
+
+    def spawn(i):
+        spawned.append(i)
+        pool._spawned_at[i] = now
+
+    pool._spawn = spawn
+    pool._check_workers(now)
+    assert pool._respawn_at == {0: 100.5} and not spawned
+    pool._check_workers(now + 0.2)
+    assert not spawned  # still backing off
+    now += 0.5
+    pool._check_workers(now)
+    assert spawned == [0]
+
+    pool._check_workers(now)  # died again straight away: twice the wait
+    assert pool._respawn_at == {0: now + 1.0}
+    now += 1.0
+    pool._check_workers(now)
+    pool._check_workers(now)
+    assert pool.stats()["given_up"] == [0] and spawned == [0, 0]
+
+    async def submit():
+        pool._loop = asyncio.get_running_loop()
+        await pool.submit("hi", "CUST-1")
+
+    with pytest.raises(WorkerCrashed, match="gave up after 2 restarts"):
+        asyncio.run(submit())
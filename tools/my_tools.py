@@ -1,5 +1,8 @@
 from agents import function_tool
 
+from serving.deadline import budgeted
+from tools.tool_cache import tool_cache
+
 # Fake order database
 ORDERS_DB = {
     "ORD123": "Shipped - Expected delivery in 3 days",
@@ -7,10 +10,14 @@ ORDERS_DB = {
     "ORD789": "Delivered - Thank you for shopping!"
 }
 
+# SDK: is_enabled(ctx, agent) -- the user's text is expected in the run context -- and
+# failure_error_function(ctx, error) answers when the tool raises
 @function_tool(
-    is_enabled=lambda query, **kwargs: "order" in query.lower(),
-    error_function=lambda **kwargs: "Sorry, I couldn’t find that order. Please check your order ID."
+    is_enabled=lambda ctx, agent: "order" in ((ctx.context or {}).get("user_text") or "").lower(),
+    failure_error_function=lambda ctx, error: "Sorry, I couldn’t find that order. Please check your order ID."
 )
+@budgeted("tool")
+@tool_cache.cached(depends_on=lambda order_id: [f"order:{order_id}"], ttl=30.0)
 async def get_order_status(order_id: str) -> str:
     """
     Fetch order status by order_id from a fake database.
@@ -19,5 +26,5 @@ async def get_order_status(order_id: str) -> str:
     if status:
         return f"Order {order_id} status: {status}"
     else:
-        # Trigger error_function
-        return None
+        # Trigger failure_error_function (exceptions are never cached)
+        raise LookupError(order_id)
@@ -0,0 +1,187 @@
+import functools
+import inspect
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple, Union
+
+from metrics.metrics import metrics
+
+# ----------------------------
+# Tool-result cache
+# ----------------------------
+# Put it under @function_tool:
+#
+#   @function_tool
+#   @tool_cache.cached(depends_on=lambda order_id: [f"order:{order_id}"])
+#   def get_order_status(order_id: str) -> str: ...
+#
+# Entries are keyed on (module:tool name, arguments). Each entry remembers the data
+# keys it was computed from; a write calls tool_cache.invalidate("order:123")
+# and exactly the entries built from that key are dropped. depends_on is a
+# list of keys or a function of the tool's arguments; returning None from it
+# means "don't cache this call". Context/ToolContext arguments are never part
+# of the key. Exceptions are not cached.
+
+DependsOn = Union[Iterable[str], Callable[..., Optional[Iterable[str]]]]
+_CONTEXT_TYPES = ("RunContextWrapper", "ToolContext")
+
+
+def _is_context_param(param: inspect.Parameter) -> bool:
+    ann = param.annotation
+    name = getattr(ann, "__name__", None) or str(ann)
+    return any(t in name for t in _CONTEXT_TYPES) or param.name in ("ctx", "context", "wrapper")
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+class _ToolStats:
+    __slots__ = ("hits", "misses", "bypassed")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+
+class ToolCache:
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, Optional[float], Tuple[str, ...]]]" = OrderedDict()
+        self._by_dep: Dict[str, Set[Tuple[str, str]]] = {}
+        self._tools: Dict[str, _ToolStats] = {}
+        self.invalidated = 0
+        metrics.register_collector("tool_cache", self.stats)
+
+    # --- bookkeeping ---
+
+    def _drop(self, entry_key: Tuple[str, str]) -> None:
+        _, _, deps = self._entries.pop(entry_key)
+        for dep in deps:
+            keys = self._by_dep.get(dep)
+            if keys is not None:
+                keys.discard(entry_key)
+                if not keys:
+                    del self._by_dep[dep]
+
+    def _get(self, entry_key: Tuple[str, str]) -> Tuple[bool, Any]:
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return False, None
+        value, expires, _ = entry
+        if expires is not None and time.monotonic() >= expires:
+            self._drop(entry_key)
+            return False, None
+        self._entries.move_to_end(entry_key)
+        return True, value
+
+    def _put(self, entry_key: Tuple[str, str], value: Any, deps: Tuple[str, ...], ttl: Optional[float]) -> None:
+        if entry_key in self._entries:
+            self._drop(entry_key)
+        self._entries[entry_key] = (value, time.monotonic() + ttl if ttl else None, deps)
+        for dep in deps:
+            self._by_dep.setdefault(dep, set()).add(entry_key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, *dep_keys: str) -> int:
+        """Drop every entry computed from any of ``dep_keys``. Returns how many were dropped."""
+        dropped = 0
+        for dep in dep_keys:
+            for entry_key in list(self._by_dep.get(dep, ())):
+                self._drop(entry_key)
+                dropped += 1
+        if dropped:
+            self.invalidated += dropped
+            metrics.incr("tool_cache_invalidations_total", dropped)
+        return dropped
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_dep.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        tools = {}
+        for name, s in self._tools.items():
+            lookups = s.hits + s.misses
+            tools[name] = {
+                "hits": s.hits,
+                "misses": s.misses,
+                "bypassed": s.bypassed,
+                "hit_rate": round(s.hits / lookups, 4) if lookups else 0.0,
+            }
+        return {"entries": len(self._entries), "invalidated": self.invalidated, "tools": tools}
+
+    # --- decorator ---
+
+    def cached(self, depends_on: DependsOn = (), name: Optional[str] = None, ttl: Optional[float] = None):
+        """Cache a tool function's results. Apply *under* @function_tool so the SDK sees the real signature."""
+
+        def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+            tool = name or fn.__name__
+            # entries are per defining module: same-named tools elsewhere may return different text
+            scope = f"{fn.__module__}:{tool}"
+            stats = self._tools.setdefault(tool, _ToolStats())
+            sig = inspect.signature(fn)
+            key_params = [p for p in sig.parameters.values() if not _is_context_param(p)]
+
+            def lookup(args: Tuple[Any, ...], kwargs: Dict[str, Any]):
+                bound = sig.bind(*args, **kwargs)
+                bound.apply_defaults()
+                values = {p.name: bound.arguments[p.name] for p in key_params}
+                deps = depends_on(**values) if callable(depends_on) else depends_on
+                if deps is None:
+                    stats.bypassed += 1
+                    return None, ()
+                arg_key = json.dumps(values, sort_keys=True, default=_jsonable)
+                return (scope, arg_key), tuple(deps)
+
+            def hit(entry_key) -> Tuple[bool, Any]:
+                found, value = self._get(entry_key)
+                if found:
+                    stats.hits += 1
+                    metrics.incr("tool_cache_hits_total", tool=tool)
+                else:
+                    stats.misses += 1
+                    metrics.incr("tool_cache_misses_total", tool=tool)
+                return found, value
+
+            if inspect.iscoroutinefunction(fn):
+
+                @functools.wraps(fn)
+                async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                    entry_key, deps = lookup(args, kwargs)
+                    if entry_key is None:
+                        return await fn(*args, **kwargs)
+                    found, value = hit(entry_key)
+                    if found:
+                        return value
+                    value = await fn(*args, **kwargs)
+                    self._put(entry_key, value, deps, ttl)
+                    return value
+
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                entry_key, deps = lookup(args, kwargs)
+                if entry_key is None:
+                    return fn(*args, **kwargs)
+                found, value = hit(entry_key)
+                if found:
+                    return value
+                value = fn(*args, **kwargs)
+                self._put(entry_key, value, deps, ttl)
+                return value
+
+            return wrapper
+
+        return deco
+
+
+# One cache per process, shared by every tool module
+tool_cache = ToolCache()
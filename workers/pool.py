@@ -0,0 +1,408 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing as mp
+import queue
+import threading
+import time
+import zlib
+from multiprocessing.connection import Connection, wait
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from metrics.memory import memory_monitor
+from metrics.metrics import merge_snapshots, metrics
+
+# ----------------------------
+# Multi-process worker pool
+# ----------------------------
+# One supervisor (this process) + N worker processes. Every worker runs its
+# own asyncio loop and imports its own copy of the agents, so CPU-bound local
+# work (guardrail scans, pydantic validation, JSON, prompt rendering) spreads
+# across cores instead of sharing one GIL.
+#
+# Routing: jobs with a customer_id always go to the same worker (crc32 of the
+# id), so per-customer session state stays local. Jobs without one go to the
+# least-loaded worker. Each worker answers on its own pipe: a worker killed
+# mid-send can't leave a shared queue lock held and stall the others. The
+# supervisor knows which worker owns every job, so
+# when a worker dies its jobs fail fast and the worker is restarted, with
+# exponential backoff; after ``max_restarts`` quick deaths in a row the pool
+# gives up on that worker and its jobs fail with WorkerCrashed.
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerCrashed(WorkerError):
+    pass
+
+
+def make_handler(spec: str, mock: bool = False):
+    """Build the per-process handler: "support" or an Agent as "module:attribute".
+
+    ``mock`` swaps Gemini for MockModel; config.config is still imported, so GEMINI_API_KEY must be set.
+    """
+    from agents import RunConfig
+
+    import customer_support_bot
+    from batch.batch_runner import agent_handler, support_handler
+
+    run_config = None
+    if mock:
+        from model_layer.mock_model import MockModel
+
+        from model_layer.usage import UsageModel
+
+        model = UsageModel(MockModel())
+        customer_support_bot.use_model(model)
+        run_config = RunConfig(model=model, tracing_disabled=True)
+    return support_handler if spec == "support" else agent_handler(spec, run_config)
+
+
+# ----------------------------
+# Worker process
+# ----------------------------
+def _worker_main(worker_id: int, inbox: mp.Queue, results: Connection, spec: str, concurrency: int, mock: bool) -> None:
+    memory_monitor.start()  # MEMORY_INTERVAL_S / MEMORY_TRACEMALLOC; kill -USR1 <worker pid> dumps
+    memory_monitor.install_signal()
+    asyncio.run(_worker_loop(worker_id, inbox, results, spec, concurrency, mock))
+
+
+async def _worker_loop(worker_id: int, inbox: mp.Queue, results: Connection, spec: str, concurrency: int, mock: bool) -> None:
+    handler = make_handler(spec, mock)
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def run(job_id: int, text: str, customer_id: str) -> None:
+        started = time.perf_counter()
+        try:
+            output = await handler(text, customer_id)
+            results.send(("result", job_id, True, output))
+            metrics.incr("worker_jobs_total", status="ok")
+        except Exception as e:
+            results.send(("result", job_id, False, f"{type(e).__name__}: {e}"))
+            metrics.incr("worker_jobs_total", status="error")
+        finally:
+            metrics.observe("worker_job_latency_s", time.perf_counter() - started)
+            slots.release()
+
+    def drain_inbox() -> List[Any]:
+        # one blocking get, then whatever else is already queued: one thread hop per burst
+        batch = [inbox.get()]
+        while len(batch) < concurrency and batch[-1] is not None:
+            try:
+                batch.append(inbox.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    # every send happens on this (the loop) thread, so the pipe needs no lock
+    results.send(("ready", worker_id, os.getpid()))
+    running = True
+    while running:
+        for msg in await loop.run_in_executor(None, drain_inbox):
+            if msg is None:
+                running = False
+                break
+            kind = msg[0]
+            if kind == "job":
+                await slots.acquire()
+                task = asyncio.create_task(run(*msg[1:]))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            elif kind == "metrics":
+                results.send(("metrics", worker_id, metrics.snapshot()))
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    results.send(("stopped", worker_id, os.getpid()))
+
+
+# ----------------------------
+# Supervisor
+# ----------------------------
+class WorkerPool:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        handler: str = "support",
+        concurrency_per_worker: int = 8,
+        mock: bool = False,
+        start_method: str = "spawn",
+        start_timeout: float = 60.0,
+        max_restarts: int = 5,
+    ):
+        self.size = workers or os.cpu_count() or 1
+        self.spec = handler
+        self.concurrency = concurrency_per_worker
+        self.mock = mock
+        self.start_timeout = start_timeout
+        self.max_restarts = max_restarts
+        self._ctx = mp.get_context(start_method)
+        self._readers: Dict[int, Connection] = {}
+        # wakes the collector thread when a pipe is added, None stops it
+        self._wake_reader, self._wake = self._ctx.Pipe(duplex=False)
+        self._inboxes: List[mp.Queue] = []
+        self._procs: List[Any] = []
+        self._load: List[int] = [0] * self.size
+        self._restarts = 0
+        self._crashes: List[int] = [0] * self.size  # quick deaths in a row, per worker
+        self._spawned_at: List[float] = [0.0] * self.size
+        self._respawn_at: Dict[int, float] = {}
+        self._given_up: Dict[int, str] = {}
+        self._pending: Dict[int, Tuple[asyncio.Future, int]] = {}
+        self._ready: Dict[int, asyncio.Future] = {}
+        self._metric_waiters: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._collector: Optional[threading.Thread] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._closing = False
+
+    # --- lifecycle ---
+
+    async def start(self) -> "WorkerPool":
+        self._loop = asyncio.get_running_loop()
+        self._collector = threading.Thread(target=self._collect, name="pool-results", daemon=True)
+        self._collector.start()
+        for i in range(self.size):
+            self._inboxes.append(self._ctx.Queue())
+            self._procs.append(None)
+            self._spawn(i)
+        try:
+            await asyncio.gather(*(self._wait_ready(i) for i in range(self.size)))
+        except BaseException:
+            await self.close(timeout=0)
+            raise
+        self._monitor = asyncio.create_task(self._watch())
+        metrics.register_collector("worker_pool", self.stats)
+        return self
+
+    def _spawn(self, i: int) -> None:
+        self._ready[i] = self._loop.create_future()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(i, self._inboxes[i], writer, self.spec, self.concurrency, self.mock),
+            name=f"support-worker-{i}",
+            daemon=True,
+        )
+        proc.start()
+        writer.close()  # the worker holds the only write end: its exit is EOF here
+        self._procs[i] = proc
+        self._readers[i] = reader
+        self._wake.send(i)
+        self._spawned_at[i] = time.monotonic()
+
+    async def _wait_ready(self, i: int) -> None:
+        # a worker that dies while importing (bad handler spec, missing key) never says "ready"
+        deadline = time.monotonic() + self.start_timeout
+        ready = self._ready[i]
+        while not ready.done():
+            proc = self._procs[i]
+            if not proc.is_alive():
+                raise WorkerError(f"worker {i} exited with code {proc.exitcode} during startup")
+            if time.monotonic() >= deadline:
+                raise WorkerError(f"worker {i} not ready after {self.start_timeout}s")
+            await asyncio.wait([ready], timeout=0.1)
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """Let workers finish what they hold, then stop them."""
+        self._closing = True
+        if self._monitor:
+            self._monitor.cancel()
+        for inbox in self._inboxes:
+            inbox.put(None)
+        deadline = time.monotonic() + timeout
+        for proc in self._procs:
+            await asyncio.to_thread(proc.join, max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.terminate()
+        self._fail_pending(None, WorkerError("pool closed"))
+        self._wake.send(None)
+        metrics.unregister_collector("worker_pool")
+
+    async def __aenter__(self) -> "WorkerPool":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    # --- routing / submit ---
+
+    def route(self, customer_id: Optional[str]) -> int:
+        if customer_id:
+            return zlib.crc32(customer_id.encode()) % self.size
+        return min(range(self.size), key=self._load.__getitem__)
+
+    async def submit(self, text: str, customer_id: Optional[str] = None) -> Any:
+        """Run one message on a worker; returns the handler output or raises WorkerError."""
+        worker = self.route(customer_id)
+        if worker in self._given_up:
+            raise WorkerCrashed(self._given_up[worker])
+        job_id = next(self._ids)
+        fut = self._loop.create_future()
+        self._pending[job_id] = (fut, worker)
+        self._load[worker] += 1
+        self._inboxes[worker].put(("job", job_id, text, customer_id or "anonymous"))
+        metrics.incr("pool_jobs_submitted_total", worker=worker)
+        return await fut
+
+    # --- results ---
+
+    def _collect(self) -> None:
+        # Runs in a thread: pipe reads block, so hand every message to the loop.
+        readers: Set[Connection] = set()
+        while True:
+            for conn in wait([self._wake_reader, *readers]):
+                if conn is self._wake_reader:
+                    if self._wake_reader.recv() is None:
+                        for c in readers:
+                            c.close()
+                        return
+                    readers.update(c for c in self._readers.values() if not c.closed)
+                    continue
+                try:
+                    msg = conn.recv()
+                except Exception:
+                    # EOF: the worker exited (or died mid-send); _watch restarts it on a new pipe
+                    readers.discard(conn)
+                    conn.close()
+                    continue
+                self._loop.call_soon_threadsafe(self._on_message, msg)
+
+    def _on_message(self, msg: Tuple) -> None:
+        kind = msg[0]
+        if kind == "result":
+            _, job_id, ok, payload = msg
+            entry = self._pending.pop(job_id, None)
+            if entry is None:
+                return
+            fut, worker = entry
+            self._load[worker] -= 1
+            if not fut.done():
+                if ok:
+                    fut.set_result(payload)
+                else:
+                    fut.set_exception(WorkerError(payload))
+        elif kind == "ready":
+            fut = self._ready.get(msg[1])
+            if fut and not fut.done():
+                fut.set_result(msg[2])
+        elif kind == "metrics":
+            fut = self._metric_waiters.pop(msg[1], None)
+            if fut and not fut.done():
+                fut.set_result(msg[2])
+
+    def _fail_pending(self, worker: Optional[int], exc: Exception) -> None:
+        for job_id, (fut, w) in list(self._pending.items()):
+            if worker is None or w == worker:
+                del self._pending[job_id]
+                self._load[w] -= 1
+                if not fut.done():
+                    fut.set_exception(exc)
+
+    async def _watch(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(0.5)
+            self._check_workers(time.monotonic())
+
+    def _check_workers(self, now: float) -> None:
+        for i, proc in enumerate(self._procs):
+            if self._closing:
+                return
+            if i in self._given_up:
+                continue
+            if i in self._respawn_at:
+                if now >= self._respawn_at[i]:
+                    del self._respawn_at[i]
+                    metrics.incr("pool_worker_restarts_total", worker=i)
+                    self._restarts += 1
+                    self._spawn(i)
+                continue
+            if proc.is_alive():
+                continue
+            reason = f"worker {i} exited with code {proc.exitcode}"
+            self._fail_pending(i, WorkerCrashed(reason))
+            # a worker that ran for a while crashed on a job, not on startup: the streak restarts
+            if now - self._spawned_at[i] >= 60.0:
+                self._crashes[i] = 0
+            self._crashes[i] += 1
+            if self._crashes[i] > self.max_restarts:
+                metrics.incr("pool_worker_given_up_total", worker=i)
+                self._given_up[i] = f"{reason}; gave up after {self.max_restarts} restarts"
+                continue
+            # fresh inbox: the old one may hold jobs we just failed
+            self._inboxes[i] = self._ctx.Queue()
+            self._respawn_at[i] = now + min(30.0, 0.5 * 2 ** (self._crashes[i] - 1))
+
+    # --- metrics ---
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.size,
+            "alive": sum(1 for p in self._procs if p is not None and p.is_alive()),
+            "outstanding": list(self._load),
+            "restarts": self._restarts,
+            "given_up": sorted(self._given_up),
+        }
+
+    async def collect_metrics(self, timeout: float = 5.0) -> Dict[str, Any]:
+        """Merged metrics snapshot from every live worker plus pool stats."""
+        waiters = []
+        for i, proc in enumerate(self._procs):
+            if proc.is_alive():
+                self._metric_waiters[i] = fut = self._loop.create_future()
+                self._inboxes[i].put(("metrics",))
+                waiters.append(fut)
+        done, _ = await asyncio.wait(waiters, timeout=timeout) if waiters else (set(), set())
+        merged = merge_snapshots(f.result() for f in done)
+        merged["pool"] = self.stats()
+        return merged
+
+
+# ----------------------------
+# CLI / benchmark: python workers/pool.py --workers 8 --messages 2000 --mock
+# ----------------------------
+async def bench(args: argparse.Namespace) -> None:
+    texts = ["Kya aap gift wrapping provide karte hain?", "Return policy kya hai?", "Order ID 123 ka status?"]
+    async with WorkerPool(args.workers, args.handler, args.concurrency, mock=args.mock) as pool:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(pool.submit(texts[i % len(texts)], f"CUST-{i % args.customers}") for i in range(args.messages)),
+            return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - started
+        report = await pool.collect_metrics()
+    print(json.dumps({
+        "workers": args.workers,
+        "messages": args.messages,
+        "elapsed_s": round(elapsed, 3),
+        "msgs_per_s": round(args.messages / elapsed, 1),
+        "jobs": {k: v for k, v in report["counters"].items() if k.startswith("worker_jobs_total")},
+        "pool": report["pool"],
+    }, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run support messages across a pool of worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--handler", default="support", help='"support" or an Agent as "module:attribute"')
+    parser.add_argument("--concurrency", type=int, default=8, help="in-flight messages per worker")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=100)
+    parser.add_argument(
+        "--mock", action="store_true", help="use MockModel instead of Gemini (no network; GEMINI_API_KEY must still be set, any value)"
+    )
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()